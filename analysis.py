@@ -1,56 +1,694 @@
+"""
+Анализ данных и визуализация.
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import networkx as nx
-from db import get_all_orders, get_all_customers #  Предполагаем, что эти функции есть в db.py
+numpy, pandas, scipy, matplotlib и networkx импортируются внутри функций:
+они нужны только при открытии статистики, а их загрузка занимает
+заметную долю времени запуска приложения.
 
-def top_customers_by_orders(n=5):
+Расчёты по исходным таблицам (за период, корзины, граф покупок) делятся на куски
+по диапазонам дат или order_id и выполняются в пуле процессов (configure_parallel);
+каждый процесс читает БД своим соединением только для чтения, частичные агрегаты
+сливаются в вызывающем процессе. Процессы видят только зафиксированные данные.
+
+Функции с параметром source вместо SQLite могут читать колоночный снимок
+(db.export_snapshot): source - каталог снимка или открытый db.Snapshot.
+Снимок считается в текущем процессе векторно по колонкам, workers не нужен.
+"""
+
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+from itertools import repeat
+from typing import Optional
+
+import db
+from db import connection
+
+PARALLEL_MIN_ROWS = 200_000  # меньше строк заказов - запуск процессов дороже самого расчёта
+SHARDS_PER_WORKER = 4  # несколько кусков на процесс выравнивают нагрузку при неравных кусках
+
+_workers = os.cpu_count() or 1
+_executor = None
+_executor_lock = threading.Lock()
+_worker_state = {}  # в процессе пула: соединения по файлу БД, загруженная матрица графа
+
+
+def read_sql(sql: str, params=(), parse_dates=None, dtype=None):
+    """
+    Читает результат запроса сразу в pandas.DataFrame, минуя объекты моделей.
+
+    dtype = типы колонок (например {'client_id': 'int64'}) dict
+    parse_dates = колонки, которые нужно разобрать как даты list
+    """
+    import pandas as pd
+
+    with connection() as conn:
+        return pd.read_sql_query(sql, conn, params=params, parse_dates=parse_dates, dtype=dtype)
+
+
+def configure_parallel(workers: Optional[int] = None):
+    """
+    Число процессов для расчётов по исходным таблицам (None - по числу ядер).
+    workers=1 - последовательный режим для отладки: те же функции кусков
+    выполняются по очереди в текущем процессе через общий пул соединений.
+    """
+    global _workers
+    close_parallel()
+    _workers = max(1, workers or os.cpu_count() or 1)
+
+
+def close_parallel():
+    """Останавливает процессы пула (при выходе из приложения или смене настроек)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+def _worker_count(workers: Optional[int], rows: Optional[int] = None) -> int:
+    """Явное число процессов или настройка configure_parallel; на малых БД (rows строк заказов) - 1."""
+    if workers is not None:
+        return max(1, workers)
+    if _workers == 1 or (db.count_rows("order_products") if rows is None else rows) < PARALLEL_MIN_ROWS:
+        return 1
+    return _workers
+
+
+def _get_executor(workers: int):
+    """Пул процессов, создаётся при первом параллельном расчёте и переиспользуется."""
+    global _executor
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _executor_lock:
+        if _executor is not None and _executor._max_workers != workers:
+            _executor.shutdown()
+            _executor = None
+        if _executor is None:
+            # spawn: процессы не наследуют потоки и открытые соединения приложения (fork с ними небезопасен)
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _run_in_worker(func, database: str, args: tuple):
+    """Выполняет кусок в процессе пула; соединение только для чтения открывается один раз на процесс."""
+    connections = _worker_state.setdefault("connections", {})
+    conn = connections.get(database)
+    if conn is None:
+        conn = connections[database] = db._read_only_connection(database)
+    return func(conn, *args)
+
+
+def _map_shards(func, shards, workers: int) -> list:
+    """func(conn, *shard) для каждого куска: в пуле процессов или, при workers=1, по очереди здесь."""
+    if workers == 1:
+        with connection() as conn:
+            return [func(conn, *shard) for shard in shards]
+    database = os.path.abspath(db.database_name)
+    return list(_get_executor(workers).map(_run_in_worker, repeat(func), repeat(database), shards))
+
+
+def _period_bound(value) -> Optional[str]:
+    """
+    Граница периода в виде ISO-строки (как order_date): str, date, datetime или pandas.Timestamp.
+    Все функции сравнивают её с order_date целиком: datetime с временем делит день на части.
+    """
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _day_ceil(bound: str) -> str:
+    """Первый день, начинающийся не раньше bound (ISO-дата): для полуночи - тот же день, иначе следующий."""
+    moment = datetime.fromisoformat(bound)
+    return (moment.date() + timedelta(days=0 if moment.time() == time() else 1)).isoformat()
+
+
+def _split_period(since: Optional[str], until: Optional[str]):
+    """
+    Делит период [since, until) на полные дни [first, last) - их можно брать из daily_order_counts -
+    и неполные крайние куски [start, end), которые считаются по order_date.
+    Returns (days, partial): days = (first, last) или None, если полных дней нет; None в first/last - без границы.
+    """
+    first = _day_ceil(since) if since is not None else None
+    last = until[:10] if until is not None else None
+    if first is not None and last is not None and first > last:
+        return None, [(since, until)]  # период внутри одного дня
+    partial = []
+    if since is not None and first != since[:10]:
+        partial.append((since, first))
+    if until is not None and _day_ceil(until) != last:
+        partial.append((last, until))
+    return (first, last), partial
+
+
+def _date_shards(parts: int, since: Optional[str], until: Optional[str]) -> list:
+    """
+    Диапазоны [начало, конец) дат заказов с примерно равным числом заказов:
+    границы выбираются по накопленным счётчикам daily_order_counts.
+    """
+    import numpy as np
+
+    with connection() as conn:
+        rows = conn.execute("SELECT day, order_count FROM daily_order_counts ORDER BY day").fetchall()
+    rows = [(day, count) for day, count in rows
+            if (since is None or day >= since[:10]) and (until is None or day < _day_ceil(until))]
+    if not rows:
+        return []
+    days = [day for day, _ in rows]
+    cumulative = np.cumsum([count for _, count in rows])
+    targets = cumulative[-1] * np.arange(1, parts) / parts
+    # граница - день после того, на котором набралась очередная доля заказов
+    bounds = sorted({(date.fromisoformat(days[i]) + timedelta(days=1)).isoformat()
+                     for i in np.searchsorted(cumulative, targets)})
+    last = until or (date.fromisoformat(days[-1]) + timedelta(days=1)).isoformat()
+    edges = [since or days[0], *(bound for bound in bounds if bound < last), last]
+    return [(start, end) for start, end in zip(edges, edges[1:]) if start < end]
+
+
+def _order_id_shards(parts: int) -> list:
+    """Равные диапазоны [начало, конец) order_id строк заказов (первичный ключ order_products)."""
+    with connection() as conn:
+        low, high = conn.execute("SELECT MIN(order_id), MAX(order_id) FROM order_products").fetchone()
+    if low is None:
+        return []
+    step = max(1, -(-(high - low + 1) // parts))
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+def _shard_order_stats(conn, start: str, end: str):
+    """Частичные агрегаты заказов с order_date в [start, end): по клиентам, по дням, по товарам."""
+    import numpy as np
+
+    clients = conn.execute("""
+        SELECT client_id, COUNT(*) FROM orders
+        WHERE order_date >= ? AND order_date < ?
+        GROUP BY client_id
+    """, (start, end)).fetchall()
+    daily = conn.execute("""
+        SELECT date(order_date) AS day, COUNT(*) FROM orders
+        WHERE order_date >= ? AND order_date < ?
+        GROUP BY day
+    """, (start, end)).fetchall()
+    products = conn.execute("""
+        SELECT op.product_id, SUM(op.quantity), COALESCE(SUM(op.quantity * op.price), 0)
+        FROM orders o
+        JOIN order_products op ON op.order_id = o.order_id
+        WHERE o.order_date >= ? AND o.order_date < ?
+        GROUP BY op.product_id
+    """, (start, end)).fetchall()
+    return (np.array(clients, dtype=np.int64).reshape(-1, 2), daily,
+            np.array(products, dtype=np.float64).reshape(-1, 3))
+
+
+def _snapshot_source(source):
+    """None - читать SQLite; каталог снимка открывается, db.Snapshot используется как есть."""
+    if source is None or isinstance(source, db.Snapshot):
+        return source
+    return db.open_snapshot(source)
+
+
+def _snapshot_orders(snapshot, since: Optional[str], until: Optional[str]):
+    """Таблица orders снимка, отфильтрованная по order_date в [since, until)."""
+    import pyarrow.compute as pc
+
+    orders = snapshot.table('orders')
+    if since is not None:
+        orders = orders.filter(pc.greater_equal(orders.column('order_date'), since))
+    if until is not None:
+        orders = orders.filter(pc.less(orders.column('order_date'), until))
+    return orders
+
+
+def _snapshot_order_stats(snapshot, since: Optional[str], until: Optional[str],
+                          parts=('clients', 'daily', 'products')) -> dict:
+    """order_stats по снимку (только нужные parts): подсчёт np.bincount по колонкам ID, без SQL и объектов."""
+    import numpy as np
+    import pandas as pd
+    import pyarrow.compute as pc
+
+    orders = _snapshot_orders(snapshot, since, until)
+    stats = {}
+    if 'clients' in parts:
+        order_count = np.bincount(orders.column('client_id').to_numpy())
+        client_ids = np.flatnonzero(order_count)
+        stats['clients'] = pd.DataFrame({'client_id': client_ids, 'order_count': order_count[client_ids]})
+    if 'daily' in parts:
+        days = pc.value_counts(pc.utf8_slice_codeunits(orders.column('order_date'), 0, 10))
+        stats['daily'] = pd.Series(days.field('counts').to_numpy().astype('int64'), name='orders', index=pd.DatetimeIndex(
+            days.field('values').to_numpy(zero_copy_only=False), name='day')).sort_index()
+    if 'products' not in parts:
+        return stats
+
+    lines = snapshot.table('order_products')
+    if since is not None or until is not None:
+        lines = lines.filter(pc.is_in(lines.column('order_id'), value_set=orders.column('order_id').combine_chunks()))
+    product_ids = lines.column('product_id').to_numpy()
+    quantity = lines.column('quantity').to_numpy()
+    units = np.bincount(product_ids, weights=quantity).astype(np.int64)
+    # цена NULL (не заполнена) - выручка 0, как COALESCE в запросах
+    revenue = np.bincount(product_ids, weights=np.nan_to_num(quantity * lines.column('price').to_numpy()),
+                          minlength=len(units))
+    sold = np.flatnonzero(units)
+    stats['products'] = pd.DataFrame({'product_id': sold, 'units': units[sold], 'revenue': revenue[sold]})
+    return stats
+
+
+def order_stats(since=None, until=None, workers: Optional[int] = None, source=None) -> dict:
+    """
+    Статистика заказов за период [since, until) по исходным таблицам, параллельно по диапазонам дат.
+
+    Сводные таблицы хранят итоги за всё время; за период считается заново:
+    каждый кусок даёт частичные суммы, которые складываются здесь.
+    since, until = границы (str ISO, date, datetime); None - без ограничения
+    workers = число процессов (None - configure_parallel, 1 - последовательно) int
+    source = снимок вместо SQLite (см. описание модуля)
+    Returns dict:
+        'clients' - pandas.DataFrame client_id, order_count;
+        'daily' - pandas.Series числа заказов с DatetimeIndex по дням;
+        'products' - pandas.DataFrame product_id, units, revenue.
+    """
+    import numpy as np
+    import pandas as pd
+
+    since, until = _period_bound(since), _period_bound(until)
+    snapshot = _snapshot_source(source)
+    if snapshot is not None:
+        return _snapshot_order_stats(snapshot, since, until)
+    workers = _worker_count(workers)
+    parts = _map_shards(_shard_order_stats, _date_shards(workers * SHARDS_PER_WORKER, since, until), workers)
+
+    clients = np.concatenate([part[0] for part in parts]) if parts else np.zeros((0, 2), dtype=np.int64)
+    # клиент может встретиться в нескольких кусках - складываем его счётчики
+    client_ids, inverse = np.unique(clients[:, 0], return_inverse=True)
+    order_count = np.bincount(inverse, weights=clients[:, 1], minlength=len(client_ids)).astype(np.int64)
+
+    days = [day for part in parts for day, _ in part[1]]
+    daily = pd.Series([count for part in parts for _, count in part[1]], index=pd.DatetimeIndex(days, name='day'),
+                      name='orders', dtype='int64')
+    daily = daily.groupby(level=0).sum()
+
+    products = np.concatenate([part[2] for part in parts]) if parts else np.zeros((0, 3))
+    product_ids, inverse = np.unique(products[:, 0].astype(np.int64), return_inverse=True)
+    units = np.bincount(inverse, weights=products[:, 1], minlength=len(product_ids)).astype(np.int64)
+    revenue = np.bincount(inverse, weights=products[:, 2], minlength=len(product_ids))
+    return {
+        'clients': pd.DataFrame({'client_id': client_ids, 'order_count': order_count}),
+        'daily': daily,
+        'products': pd.DataFrame({'product_id': product_ids, 'units': units, 'revenue': revenue}),
+    }
+
+
+def top_customers_by_orders(n=5, since=None, until=None, workers: Optional[int] = None, source=None):
     """
     Определяет топ-N клиентов по количеству заказов.Returns
     -------
     pandas.DataFrame
         DataFrame с информацией о топ-N клиентах и количестве их заказов.
+
+    since, until = период [since, until); с ним заказы считаются по исходным таблицам (order_stats)
+    source = снимок вместо SQLite (см. описание модуля)
     """
-    orders = pd.DataFrame([(order.customer_id, order.order_date) for order in get_all_orders()], columns=['customer_id', 'order_date'])
-    customers = pd.DataFrame([(customer.customer_id, customer.first_name, customer.last_name) for customer in get_all_customers()], columns=['customer_id', 'first_name', 'last_name'])
-    
-    order_counts = orders['customer_id'].value_counts().nlargest(n)
-    top_customers = pd.DataFrame({'customer_id': order_counts.index, 'order_count': order_counts.values})
-    
-    #  Объединяем с таблицей клиентов для получения имен
-    top_customers = pd.merge(top_customers, customers, on='customer_id')
-    
-    return top_customers
+    snapshot = _snapshot_source(source)
+    if since is not None or until is not None or snapshot is not None:
+        if snapshot is not None:
+            counts = _snapshot_order_stats(snapshot, _period_bound(since), _period_bound(until), ('clients',))['clients']
+        else:
+            counts = order_stats(since, until, workers)['clients']
+        top = counts.sort_values(['order_count', 'client_id'], ascending=[False, True]).head(n)
+        if snapshot is not None:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+
+            clients = snapshot.table('clients').select(['client_id', 'first_name', 'last_name'])
+            names = clients.filter(pc.is_in(clients.column('client_id'),
+                                            value_set=pa.array(top['client_id'].to_numpy()))).to_pandas()
+        else:
+            names = read_sql(f"""
+                SELECT client_id, first_name, last_name FROM clients
+                WHERE client_id IN ({", ".join("?" * len(top))})
+            """, tuple(top['client_id'].tolist()), dtype={'client_id': 'int64'})
+        return top.merge(names, on='client_id').rename(columns={'client_id': 'customer_id'})[
+            ['customer_id', 'order_count', 'first_name', 'last_name']]
+    # сводная таблица client_stats читается с начала индекса idx_client_stats_orders - O(N), а не O(заказов)
+    return read_sql("""
+        SELECT c.client_id AS customer_id, t.order_count, c.first_name, c.last_name
+        FROM (
+            SELECT client_id, order_count
+            FROM client_stats
+            ORDER BY order_count DESC, client_id
+            LIMIT ?
+        ) t
+        JOIN clients c ON c.client_id = t.client_id
+        ORDER BY t.order_count DESC, c.client_id
+    """, (n,), dtype={'customer_id': 'int64', 'order_count': 'int64'})
 
 
-def plot_order_dynamics():
+def order_counts(freq: str = 'D', since=None, until=None, source=None):
+    """
+    Количество заказов по периодам.
+
+    freq = частота pandas: 'D' - по дням, 'W' - по неделям, 'MS' - по месяцам
+    since, until = период [since, until) по order_date, как в order_stats (datetime - с точностью до времени)
+    source = снимок вместо SQLite (см. описание модуля)
+    Returns pandas.Series с DatetimeIndex; периоды без заказов заполняются нулями.
+    """
+    import pandas as pd
+
+    since, until = _period_bound(since), _period_bound(until)
+    snapshot = _snapshot_source(source)
+    if snapshot is not None:
+        return _snapshot_order_stats(snapshot, since, until, ('daily',))['daily'].resample(freq).sum()
+    # дневные счётчики полных дней уже посчитаны в daily_order_counts, неполные крайние дни -
+    # по индексу idx_orders_date, более крупные периоды - resample
+    days, partial = _split_period(since, until)
+    frames = []
+    if days is not None:
+        first, last = days
+        frames.append(read_sql("""
+            SELECT day, order_count AS orders
+            FROM daily_order_counts
+            WHERE day >= ? AND (? IS NULL OR day < ?)
+            ORDER BY day
+        """, (first or "", last, last), parse_dates=['day'], dtype={'orders': 'int64'}))
+    for start, end in partial:
+        frames.append(read_sql("""
+            SELECT date(order_date) AS day, COUNT(*) AS orders
+            FROM orders
+            WHERE order_date >= ? AND order_date < ?
+            GROUP BY day
+        """, (start, end), parse_dates=['day'], dtype={'orders': 'int64'}))
+    daily = pd.concat(frames).set_index('day')['orders'].groupby(level=0).sum()
+    return daily.resample(freq).sum()
+
+
+def revenue_per_product(since=None, until=None, workers: Optional[int] = None, source=None):
+    """
+    Выручка и число проданных единиц по товарам.
+
+    since, until = период [since, until); с ним продажи считаются по исходным таблицам (order_stats)
+    source = снимок вместо SQLite (см. описание модуля)
+    Returns pandas.DataFrame: product_id, name, units, revenue - по убыванию выручки.
+    """
+    snapshot = _snapshot_source(source)
+    if since is not None or until is not None or snapshot is not None:
+        if snapshot is not None:
+            sales = _snapshot_order_stats(snapshot, _period_bound(since), _period_bound(until), ('products',))['products']
+        else:
+            sales = order_stats(since, until, workers)['products']
+        if snapshot is not None:
+            names = snapshot.to_pandas('products', ['product_id', 'name'])
+        else:
+            names = read_sql("SELECT product_id, name FROM products", dtype={'product_id': 'int64'})
+        return sales.merge(names, on='product_id')[['product_id', 'name', 'units', 'revenue']].sort_values(
+            'revenue', ascending=False, kind='stable', ignore_index=True)
+    return read_sql("""
+        SELECT p.product_id, p.name, s.units, s.revenue
+        FROM product_sales s
+        JOIN products p ON p.product_id = s.product_id
+        ORDER BY s.revenue DESC
+    """, dtype={'product_id': 'int64', 'units': 'int64', 'revenue': 'float64'})
+
+
+def _shard_basket_sizes(conn, start: int, end: int):
+    """Число позиций заказов с order_id в [start, end) - группировка идёт по первичному ключу без сортировки."""
+    import numpy as np
+
+    rows = conn.execute("""
+        SELECT order_id, COUNT(*) FROM order_products
+        WHERE order_id >= ? AND order_id < ?
+        GROUP BY order_id
+    """, (start, end)).fetchall()
+    return np.array(rows, dtype=np.int64).reshape(-1, 2)
+
+
+def basket_sizes(workers: Optional[int] = None, source=None):
+    """
+    Размер корзины (число позиций) каждого заказа.
+
+    workers = число процессов (None - configure_parallel, 1 - последовательно) int
+    source = снимок вместо SQLite (см. описание модуля)
+    Returns pandas.Series: индекс order_id, значение - число позиций.
+    """
+    import numpy as np
+    import pandas as pd
+
+    snapshot = _snapshot_source(source)
+    if snapshot is not None:
+        counts = np.bincount(snapshot.column('order_products', 'order_id'))
+        present = np.flatnonzero(counts)
+        return pd.Series(counts[present], index=pd.Index(present, name='order_id'), name='basket_size')
+    workers = _worker_count(workers)
+    # куски не пересекаются по order_id и идут по возрастанию - достаточно склеить
+    parts = _map_shards(_shard_basket_sizes, _order_id_shards(workers * SHARDS_PER_WORKER), workers)
+    sizes = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.int64)
+    return pd.Series(sizes[:, 1], index=pd.Index(sizes[:, 0], name='order_id'), name='basket_size')
+
+
+def basket_size_distribution(workers: Optional[int] = None, source=None):
+    """Сколько заказов имеет корзину каждого размера: pandas.Series размер -> число заказов."""
+    return basket_sizes(workers, source).value_counts().sort_index()
+
+
+def plot_order_dynamics(freq: str = 'D'):
     """
     Строит график динамики количества заказов по датам.
     """
-    orders = pd.DataFrame([(order.order_id, order.order_date) for order in get_all_orders()], columns=['order_id', 'order_date'])
-    # Преобразуем столбец order_date в datetime
-    orders['order_date'] = pd.to_datetime(orders['order_date'])# Группируем по дате и считаем количество заказов
-    order_counts = orders.groupby('order_date')['order_id'].count()
+    import matplotlib.pyplot as plt
+
+    counts = order_counts(freq)
 
     # Строим график
     plt.figure(figsize=(10, 6))
-    order_counts.plot(kind='line')
+    counts.plot(kind='line')
     plt.title('Order Dynamics Over Time')
     plt.xlabel('Date')
     plt.ylabel('Number of Orders')
     plt.grid(True)
     plt.show()
-    
-def create_customer_network():
+
+NETWORK_BLOCK_NNZ = 20_000_000  # верхняя оценка ненулевых элементов блока произведения A @ A.T
+
+
+def _shard_purchase_pairs(conn, start: int, end: int):
+    """Пары (клиент, товар) заказов с order_id в [start, end), без повторов внутри куска."""
+    import numpy as np
+
+    rows = conn.execute("""
+        SELECT DISTINCT o.client_id, op.product_id
+        FROM order_products op
+        JOIN orders o ON o.order_id = op.order_id
+        WHERE op.order_id >= ? AND op.order_id < ?
+    """, (start, end)).fetchall()
+    return np.array(rows, dtype=np.int64).reshape(-1, 2)
+
+
+def _snapshot_purchase_pairs(snapshot):
+    """Пары (клиент, товар) строк заказов снимка: client_id берётся по order_id из массива-справочника."""
+    import numpy as np
+
+    order_ids, client_ids = snapshot.column('orders', 'order_id'), snapshot.column('orders', 'client_id')
+    line_orders = snapshot.column('order_products', 'order_id')
+    size = max(order_ids.max(initial=0), line_orders.max(initial=0)) + 1
+    client_of = np.full(size, -1, dtype=np.int64)
+    client_of[order_ids] = client_ids
+    clients = client_of[line_orders]
+    known = clients >= 0  # строки без заказа не попадают в пары, как при JOIN
+    return np.column_stack((clients[known], snapshot.column('order_products', 'product_id')[known]))
+
+
+def purchase_incidence(workers: Optional[int] = None, source=None):
+    """
+    Разреженная матрица инцидентности клиенты x товары (1 - клиент покупал товар).
+
+    workers = число процессов (None - configure_parallel, 1 - последовательно) int
+    source = снимок вместо SQLite (см. описание модуля)
+    Returns (client_ids, product_ids, matrix): numpy-массивы ID, соответствующие строкам
+    и столбцам, и scipy.sparse.csr_matrix формы (клиентов, товаров).
+    Столбцы той же матрицы в формате CSC (matrix.tocsc()) - инвертированные списки товар -> клиенты.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    snapshot = _snapshot_source(source)
+    if snapshot is not None:
+        pairs = _snapshot_purchase_pairs(snapshot)
+    else:
+        workers = _worker_count(workers)
+        parts = _map_shards(_shard_purchase_pairs, _order_id_shards(workers * SHARDS_PER_WORKER), workers)
+        pairs = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.int64)
+    client_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    product_ids, cols = np.unique(pairs[:, 1], return_inverse=True)
+    # клиент мог купить товар в разных заказах (и кусках): повторы схлопываются в 1
+    matrix = sparse.csr_matrix((np.ones(len(pairs), dtype=np.int32), (rows, cols)),
+                               shape=(len(client_ids), len(product_ids)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return client_ids, product_ids, matrix
+
+
+def product_client_lists(workers: Optional[int] = None, source=None):
+    """Инвертированные списки: dict product_id -> numpy-массив client_id покупателей товара."""
+    client_ids, product_ids, matrix = purchase_incidence(workers, source)
+    by_product = matrix.tocsc()
+    return {int(product_id): client_ids[by_product.indices[by_product.indptr[i]:by_product.indptr[i + 1]]]
+            for i, product_id in enumerate(product_ids)}
+
+
+def _top_k_per_row(rows, cols, weights, k):
+    """Оставляет в каждой строке k рёбер с наибольшим весом (при равенстве - с меньшим номером столбца)."""
+    import numpy as np
+
+    order = np.lexsort((cols, -weights, rows))
+    rows, cols, weights = rows[order], cols[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    keep = rank < k
+    return rows[keep], cols[keep], weights[keep]
+
+
+def _row_blocks(matrix, max_nnz: int, popularity=None):
+    """
+    Делит строки матрицы инцидентности на блоки, произведение которых на A.T
+    содержит не больше max_nnz элементов (оценка сверху: сумма популярностей товаров строки).
+    popularity = число покупателей каждого товара, если matrix - только часть строк
+    """
+    import numpy as np
+
+    if popularity is None:
+        popularity = np.asarray(matrix.sum(axis=0)).ravel().astype(np.int64)
+    work = np.cumsum(matrix @ popularity)
+    start = 0
+    while start < matrix.shape[0]:
+        done = work[start - 1] if start else 0
+        end = max(start + 1, int(np.searchsorted(work, done + max_nnz, side='right')))
+        yield start, end
+        start = end
+
+
+def _edges_in_rows(matrix, by_product, start: int, end: int, min_weight: int, top_k, max_block_nnz: int):
+    """Рёбра строк [start, end) матрицы инцидентности: произведение блоками по max_block_nnz элементов."""
+    import numpy as np
+
+    rows_part = matrix if (start, end) == (0, matrix.shape[0]) else matrix[start:end]
+    popularity = np.diff(by_product.indptr).astype(np.int64)
+    parts = []
+    for block_start, block_end in _row_blocks(rows_part, max_block_nnz, popularity):
+        block_start, block_end = block_start + start, block_end + start
+        block = matrix[block_start:block_end] @ by_product
+        rows = np.repeat(np.arange(block_start, block_end, dtype=np.int64), np.diff(block.indptr))
+        cols = block.indices.astype(np.int64)
+        weights = block.data
+        # каждая пара считается один раз на своей стороне: без петель, выше порога
+        keep = (rows != cols) & (weights >= min_weight)
+        if top_k is None:
+            keep &= rows < cols
+        rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        del block
+        if top_k is not None:
+            rows, cols, weights = _top_k_per_row(rows, cols, weights, top_k)
+        parts.append((rows, cols, weights))
+    return parts
+
+
+def _edges_task(path: str, start: int, end: int, min_weight: int, top_k, max_block_nnz: int):
+    """Рёбра диапазона строк в процессе пула; матрица читается из файла один раз на расчёт."""
+    from scipy import sparse
+
+    if _worker_state.get("matrix_path") != path:
+        matrix = sparse.load_npz(path).tocsr()
+        _worker_state.update(matrix_path=path, matrix=matrix, by_product=matrix.T.tocsr())
+    return _edges_in_rows(_worker_state["matrix"], _worker_state["by_product"], start, end,
+                          min_weight, top_k, max_block_nnz)
+
+
+def co_purchase_edges(min_weight: int = 1, top_k=None, max_product_share=None,
+                      max_block_nnz: int = NETWORK_BLOCK_NNZ, workers: Optional[int] = None, source=None):
+    """
+    Рёбра графа совместных покупок: клиенты связаны, если покупали одни и те же товары.
+
+    Вес ребра - число общих товаров. Веса получаются умножением разреженной матрицы
+    инцидентности на транспонированную (A @ A.T) блоками строк, размер которых
+    подбирается так, чтобы блок произведения не превышал max_block_nnz элементов:
+    в памяти держится только блок и уже отобранные рёбра, а не все пары клиентов.
+    Параллельно строки делятся между процессами по оценке объёма работы,
+    матрица передаётся им через временный файл .npz.
+
+    min_weight = минимальный вес ребра int
+    top_k = сколько самых сильных соседей оставить каждому клиенту (None - всех) int
+    max_product_share = не учитывать товары, которые купила большая доля клиентов (например 0.05):
+        такие товары связывают почти всех со всеми и делают работу квадратичной float
+    workers = число процессов (None - configure_parallel, 1 - последовательно) int
+    source = снимок вместо SQLite (см. описание модуля); произведение матриц при этом тоже параллельное
+    Returns pandas.DataFrame: client_a < client_b, weight - по убыванию веса.
+    Ребро остаётся, если проходит top_k хотя бы у одного из двух клиентов.
+    """
+    import tempfile
+
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+
+    snapshot = _snapshot_source(source)
+    workers = _worker_count(workers, snapshot.table('order_products').num_rows if snapshot is not None else None)
+    client_ids, _, matrix = purchase_incidence(workers, snapshot)
+    if max_product_share is not None:
+        popularity = np.asarray(matrix.sum(axis=0)).ravel()
+        matrix = matrix[:, np.flatnonzero(popularity <= max_product_share * matrix.shape[0])]
+    if workers == 1:
+        parts = _edges_in_rows(matrix, matrix.T.tocsr(), 0, matrix.shape[0], min_weight, top_k, max_block_nnz)
+    else:
+        popularity = np.asarray(matrix.sum(axis=0)).ravel().astype(np.int64)
+        total_work = int((matrix @ popularity).sum())
+        ranges = list(_row_blocks(matrix, max(1, total_work // (workers * SHARDS_PER_WORKER))))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "incidence.npz")
+            sparse.save_npz(path, matrix, compressed=False)
+            chunks = _get_executor(workers).map(_edges_task, repeat(path), *zip(*ranges), repeat(min_weight),
+                                                repeat(top_k), repeat(max_block_nnz))
+            parts = [part for chunk in chunks for part in chunk]
+
+    if parts:
+        rows, cols, weights = (np.concatenate(column) for column in zip(*parts))
+    else:
+        rows = cols = weights = np.zeros(0, dtype=np.int64)
+
+    # пара (a, b) и (b, a) - одно неориентированное ребро
+    a, b = np.minimum(rows, cols), np.maximum(rows, cols)
+    _, first = np.unique(a * len(client_ids) + b, return_index=True)
+    edges = pd.DataFrame({
+        'client_a': client_ids[a[first]],
+        'client_b': client_ids[b[first]],
+        'weight': weights[first].astype('int64'),
+    })
+    return edges.sort_values(['weight', 'client_a', 'client_b'], ascending=[False, True, True],
+                             ignore_index=True)
+
+
+def create_customer_network(min_weight: int = 1, top_k=10, max_product_share=None, as_networkx: bool = False,
+                            workers: Optional[int] = None, source=None):
     """
     Создает граф связей клиентов на основе общих товаров в заказах.
+
+    Returns pandas.DataFrame рёбер (см. co_purchase_edges); as_networkx=True - networkx.Graph
+    с весами рёбер в атрибуте weight (networkx нужен только в этом случае).
     """
-    #  !!!  Здесь нужна более сложная логика анализа заказов и товаров для построения графа
-    #  Это упрощенный пример, его нужно доработать
-    G = nx.Graph()
-    #  Пример добавления нескольких узлов и ребер
-    G.add_node("Customer A")
-    G.add_node("Customer B")
-    G.add_edge("Customer A", "Customer B")nx.draw(G, with_labels=True)
-plt.show()
+    edges = co_purchase_edges(min_weight=min_weight, top_k=top_k, max_product_share=max_product_share,
+                              workers=workers, source=source)
+    if not as_networkx:
+        return edges
+
+    import networkx as nx
+
+    return nx.from_pandas_edgelist(edges, 'client_a', 'client_b', edge_attr='weight')
+
+
+def plot_customer_network(min_weight: int = 2, top_k=5):
+    """Рисует граф совместных покупок (для небольших выборок - раскладка графа квадратична)."""
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
+    G = create_customer_network(min_weight=min_weight, top_k=top_k, as_networkx=True)
+    nx.draw(G, with_labels=True, width=[G[a][b]['weight'] for a, b in G.edges()])
+    plt.show()
@@ -0,0 +1,85 @@
+"""
+Бенчмарк записи заказов: add_order по одному (транзакция на заказ)
+против пакетного add_orders (одна транзакция, executemany).
+
+Цель - больше 50 000 заказов в секунду для add_orders.
+
+Запуск из корня проекта:
+    python bench/bench_add_orders.py [кол-во заказов]   # по умолчанию 200 000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client, Order, Product
+
+TARGET_PER_SEC = 50_000
+SINGLE_LIMIT = 20_000  # по одному заказу дольше этого не меряем
+N_CLIENTS = 1000
+N_PRODUCTS = 500
+LINES_PER_ORDER = 3
+
+
+def seed():
+    clients = [Client(f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва")
+               for i in range(N_CLIENTS)]
+    products = [Product(f"Товар{i}", "", float(i % 100 + 1)) for i in range(N_PRODUCTS)]
+    with db.connection():
+        for client in clients:
+            db.add_client(client)
+        for product in products:
+            db.add_product(product)
+    return clients, products
+
+
+def make_orders(n_orders: int, clients, products):
+    rnd = random.Random(42)
+    orders = []
+    for _ in range(n_orders):
+        order = Order(rnd.choice(clients), [])
+        for product in rnd.sample(products, LINES_PER_ORDER):
+            order.add_product(product, rnd.randint(1, 3))
+        orders.append(order)
+    return orders
+
+
+def timed(func, orders):
+    start = time.perf_counter()
+    func(orders)
+    return time.perf_counter() - start
+
+
+def one_by_one(orders):
+    for order in orders:
+        db.add_order(order)
+
+
+def main(n_orders: int = 200_000) -> int:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bench.db"))
+        clients, products = seed()
+
+        single = min(n_orders, SINGLE_LIMIT)
+        results["add_order по одному"] = (single, timed(one_by_one, make_orders(single, clients, products)))
+        results["add_orders пакетом"] = (n_orders, timed(db.add_orders, make_orders(n_orders, clients, products)))
+
+        mismatches = sum(len(rows) for rows in db.check_aggregates().values())
+        db.close_pool()
+
+    for name, (count, elapsed) in results.items():
+        print(f"  {name:<25}{count:>9} заказов за {elapsed:7.2f} с  ({count / elapsed:>9.0f} заказов/с)")
+    rate = n_orders / results["add_orders пакетом"][1]
+    print(f"Цель {TARGET_PER_SEC} заказов/с: {'достигнута' if rate >= TARGET_PER_SEC else 'НЕ достигнута'}")
+    print(f"Расхождений в сводных таблицах: {mismatches}")
+    return 0 if rate >= TARGET_PER_SEC and not mismatches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
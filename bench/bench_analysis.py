@@ -0,0 +1,94 @@
+"""
+Бенчмарк аналитики analysis.py на больших объёмах.
+
+Сравнивает прежний способ (объекты Order через get_all_orders -> DataFrame)
+с агрегацией в SQL / колоночной загрузкой. Прежний способ запускается
+только до OBJECT_BASELINE_LIMIT строк заказов - дальше он занимает минуты.
+
+Нужны pandas и numpy. Запуск из корня проекта:
+    python bench/bench_analysis.py [кол-во строк order_products]   # по умолчанию 10 000 000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+import db
+
+OBJECT_BASELINE_LIMIT = 1_000_000
+LINES_PER_ORDER = 4
+BATCH = 100_000
+
+
+def seed(n_lines: int):
+    rnd = random.Random(42)
+    n_orders = n_lines // LINES_PER_ORDER
+    n_clients = max(1, n_orders // 20)
+    n_products = 5000
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        db.drop_count_triggers(cursor)
+        db.drop_aggregate_triggers(cursor)
+        cursor.executemany("INSERT INTO products (product_id, name, description, price) VALUES (?, ?, '', ?)",
+                           ((i, f"Товар{i}", float(i % 500 + 1)) for i in range(1, n_products + 1)))
+        cursor.executemany("""
+            INSERT INTO clients (client_id, first_name, last_name, email, phone, address, registration_date)
+            VALUES (?, 'Имя', ?, ?, '+79123456789', 'Москва', '2023-01-01T00:00:00')
+        """, ((i, f"Фамилия{i}", f"user{i}@mail.ru") for i in range(1, n_clients + 1)))
+        for start in range(1, n_orders + 1, BATCH):
+            ids = range(start, min(start + BATCH, n_orders + 1))
+            cursor.executemany("INSERT INTO orders (order_id, client_id, order_date, status) VALUES (?, ?, ?, 'Создан!')",
+                               ((i, rnd.randint(1, n_clients), f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T12:00:00")
+                                for i in ids))
+            cursor.executemany("INSERT INTO order_products (order_id, product_id, quantity, price) VALUES (?, ?, 1, ?)",
+                               ((i, p, float(p % 500 + 1))
+                                for i in ids for p in rnd.sample(range(1, n_products + 1), LINES_PER_ORDER)))
+        db.create_count_triggers(cursor)
+        db.refresh_row_counts(cursor)
+        db.create_aggregate_triggers(cursor)
+        db.refresh_aggregates(cursor)
+
+
+def top_customers_objects(n=5):
+    """Прежняя реализация top_customers_by_orders: DataFrame из списка объектов Order."""
+    import pandas as pd
+    orders = pd.DataFrame([(order.client.client_id, order.order_date) for order in db.get_all_orders()],
+                          columns=['customer_id', 'order_date'])
+    return orders['customer_id'].value_counts().nlargest(n)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(n_lines: int = 10_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        seed(n_lines)
+        print(f"{n_lines} строк order_products сгенерировано за {time.perf_counter() - start:.1f} с")
+
+        scenarios = [
+            ("top_customers_by_orders", analysis.top_customers_by_orders, 5),
+            ("order_counts (дни)", analysis.order_counts, 'D'),
+            ("order_counts (недели)", analysis.order_counts, 'W'),
+            ("revenue_per_product", analysis.revenue_per_product),
+            ("basket_sizes", analysis.basket_sizes),
+        ]
+        if n_lines <= OBJECT_BASELINE_LIMIT:
+            scenarios.insert(0, ("top customers через объекты", top_customers_objects, 5))
+        for name, func, *args in scenarios:
+            print(f"  {name:<30}{timed(func, *args):8.2f} с")
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
@@ -0,0 +1,68 @@
+"""
+Бенчмарк массового удаления и изменения (db.delete_orders, delete_clients,
+delete_products, update_clients) на копии синтетической БД, с проверкой,
+что счётчики строк и сводные таблицы после операций верны.
+
+Данные - bench/datagen.py. Время удаления определяется перестройкой индексов
+order_products и orders (несколько микросекунд на строку в SQLite), сводные
+таблицы обновляются набором UPDATE ... FROM, а не триггером на каждую строку.
+
+Нужен numpy (для генератора). Запуск из корня проекта:
+    python bench/bench_bulk_delete.py [кол-во строк заказов]   # по умолчанию 1 000 000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datagen
+import db
+
+
+def timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    rows = sum(result.values()) if isinstance(result, dict) else result
+    print(f"{label:<34} {seconds:7.3f} с  {rows:>8} строк  {rows / seconds:>10.0f} строк/с  {result}")
+
+
+def check():
+    with db.connection() as conn:
+        real = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in db.TABLES}
+    counts_ok = real == {table: db.count_rows(table) for table in db.TABLES}
+    aggregates_ok = not any(db.check_aggregates().values())
+    if not (counts_ok and aggregates_ok):
+        print(f"  РАСХОЖДЕНИЕ: счётчики {'верны' if counts_ok else 'неверны'}, "
+              f"сводные таблицы {'верны' if aggregates_ok else 'неверны'}")
+
+
+def main(n_lines: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bulk.db"))
+        db.configure_cache(max_bytes=0)
+        counts = datagen.generate(n_lines)
+        print(counts)
+        n_orders, n_clients, n_products = counts["orders"], counts["clients"], counts["products"]
+
+        timed("delete_orders 30% заказов", lambda: db.delete_orders(range(1, int(n_orders * 0.3) + 1)))
+        check()
+        timed("delete_clients cascade 10%", lambda: db.delete_clients(range(1, n_clients // 10 + 1), cascade=True))
+        check()
+        timed("delete_products cascade 10%",
+              lambda: db.delete_products(range(1, n_products // 10 + 1), cascade=True))
+        check()
+        timed("update_clients 50%", lambda: db.update_clients(range(1, n_clients // 2 + 1), address="Новый адрес"))
+        timed("update_products 50%", lambda: db.update_products(range(1, n_products // 2 + 1), price=1.0))
+        timed("delete_client по одному x100",
+              lambda: sum(sum(db.delete_clients([client_id], cascade=True).values())
+                          for client_id in range(n_clients - 100, n_clients)))
+        check()
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
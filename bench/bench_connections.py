@@ -0,0 +1,60 @@
+"""
+Бенчмарк: соединение на каждый вызов (старый db.py) против пула соединений.
+
+Запуск из корня проекта:
+    python bench/bench_connections.py [кол-во операций]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client
+
+
+def get_client_by_id_connect_per_call(client_id: int):
+    """Поведение db.get_client_by_id до введения пула."""
+    conn = sqlite3.connect(db.database_name)
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM clients WHERE client_id = ?", (client_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+def ops_per_sec(func, ops: int, n_clients: int) -> float:
+    start = time.perf_counter()
+    for i in range(ops):
+        func(i % n_clients + 1)
+    return ops / (time.perf_counter() - start)
+
+
+def main(ops: int = 20000, n_clients: int = 1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_pool(database=os.path.join(tmp, "bench.db"))
+        db.create_tables()
+        for i in range(n_clients):
+            db.add_client(Client(f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва"))
+
+        before = ops_per_sec(get_client_by_id_connect_per_call, ops, n_clients)
+        db.configure_cache(max_bytes=0)
+        after = ops_per_sec(db.get_client_by_id, ops, n_clients)
+        db.configure_cache()
+        cached = ops_per_sec(db.get_client_by_id, ops, n_clients)
+        stats = db.cache_stats()
+        db.close_pool()
+
+    print(f"get_client_by_id, {ops} операций")
+    print(f"  connect на вызов: {before:12.0f} ops/sec")
+    print(f"  пул соединений:   {after:12.0f} ops/sec  (x{after / before:.1f})")
+    print(f"  пул + кэш чтения: {cached:12.0f} ops/sec  (x{cached / before:.1f}), "
+          f"попаданий {stats['hits']}, промахов {stats['misses']}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
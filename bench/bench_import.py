@@ -0,0 +1,91 @@
+"""
+Бенчмарк импорта CSV: построчный execute (старый import_from_csv) против
+потокового executemany.
+
+Запуск из корня проекта:
+    python bench/bench_import.py [кол-во клиентов]
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+
+def write_csv(base: str, n_clients: int):
+    rnd = random.Random(42)
+    n_products, n_orders = 1000, n_clients * 2
+    with open(f"{base}_clients.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["client_id", "first_name", "last_name", "email", "phone", "address", "registration_date"])
+        writer.writerows((i, f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва",
+                          "2024-01-01T00:00:00") for i in range(1, n_clients + 1))
+    with open(f"{base}_products.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["product_id", "name", "description", "price"])
+        writer.writerows((i, f"Товар{i}", "", i % 100 + 1) for i in range(1, n_products + 1))
+    with open(f"{base}_orders.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["order_id", "client_id", "order_date", "status"])
+        writer.writerows((i, rnd.randint(1, n_clients), "2024-01-01T00:00:00", "Создан!")
+                         for i in range(1, n_orders + 1))
+    with open(f"{base}_order_products.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["order_id", "product_id"])
+        writer.writerows((i, p) for i in range(1, n_orders + 1) for p in rnd.sample(range(1, n_products + 1), 2))
+
+
+def import_row_by_row(base: str):
+    """Поведение import_from_csv до потокового импорта (с сохранением ID для честного сравнения)."""
+    with db.connection() as conn:
+        for table in db.TABLES:
+            with open(f"{base}_{table}.csv", newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                sql = f"INSERT INTO {table} ({', '.join(header)}) VALUES ({', '.join('?' * len(header))})"
+                for row in reader:
+                    conn.execute(sql, row)
+
+
+def measure(func, base: str, db_path: str):
+    """Время считается отдельно от пика памяти: tracemalloc сильно замедляет Python-код."""
+    db.configure_pool(database=db_path + ".time")
+    db.create_tables()
+    start = time.perf_counter()
+    func(base)
+    elapsed = time.perf_counter() - start
+
+    db.configure_pool(database=db_path + ".mem")
+    db.create_tables()
+    tracemalloc.start()
+    func(base)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main(n_clients: int = 200000):
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "data")
+        write_csv(base, n_clients)
+        rows = sum(1 for table in db.TABLES for _ in open(f"{base}_{table}.csv", encoding="utf-8")) - len(db.TABLES)
+
+        results = {}
+        for name, func in (("построчно", import_row_by_row), ("executemany", db.import_from_csv)):
+            results[name] = measure(func, base, os.path.join(tmp, f"{name}.db"))
+        db.close_pool()
+
+    print(f"Импорт {rows} строк")
+    for name, (elapsed, peak_mb) in results.items():
+        print(f"  {name:<12} {elapsed:7.2f} с  {rows / elapsed:10.0f} строк/с  пик памяти {peak_mb:6.1f} МБ")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
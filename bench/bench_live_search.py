@@ -0,0 +1,89 @@
+"""
+Бенчмарк живого поиска клиентов: задержка от нажатия клавиши до готовых строк таблицы.
+
+Запрос "печатается" по символу. Если новый запрос уточняет предыдущий и прошлый
+результат полный, строки фильтруются в памяти (IncrementalSearch.refine),
+иначе выполняется запрос к БД, как в MainApplication.live_search. При наличии
+дисплея замеряется и обновление VirtualTreeview.
+
+Запуск из корня проекта:
+    python bench/bench_live_search.py [кол-во клиентов] [запрос]   # по умолчанию 100 000, "фамилия1234"
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from gui import IncrementalSearch, client_row
+from widgets import VirtualTreeview
+
+TARGET_MS = 50
+COLUMNS = ["ID", "Имя", "Фамилия", "Email", "Телефон", "Адрес", "Дата регистрации"]
+
+
+def seed(n_clients: int, batch: int = 50000):
+    with db.connection() as conn:
+        for start in range(0, n_clients, batch):
+            conn.executemany("""
+                INSERT INTO clients (first_name, last_name, email, phone, address, registration_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, ((f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва", "2024-01-01T00:00:00")
+                  for i in range(start, min(start + batch, n_clients))))
+
+
+def make_tree():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None, None
+    tree = VirtualTreeview(root, COLUMNS)
+    tree.pack()
+    root.update()
+    return root, tree
+
+
+def type_query(query: str, tree=None, root=None):
+    search = IncrementalSearch()
+    results = []
+    for length in range(1, len(query) + 1):
+        text = query[:length]
+        start = time.perf_counter()
+        if search.can_refine(text):
+            source = "память"
+            rows = search.refine(text)
+        else:
+            source = "БД"
+            clients = db.search_clients_ranked(text, limit=search.limit + 1, fuzzy=False)
+            search.load(text, [client_row(client) for client in clients])
+            rows = search.rows
+        if tree is not None:
+            tree.set_rows(rows, keep_selection=True)
+            root.update_idletasks()
+        results.append((text, source, len(rows), (time.perf_counter() - start) * 1000))
+    return results
+
+
+def main(n_clients: int = 100_000, query: str = "фамилия1234"):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bench.db"))
+        seed(n_clients)
+        root, tree = make_tree()
+        print(f"{n_clients} клиентов, обновление таблицы: {'да' if tree is not None else 'пропущено (нет дисплея)'}")
+        worst_memory = 0.0
+        for text, source, count, ms in type_query(query, tree, root):
+            print(f"  {text!r:<16}{source:<8}{count:>8} строк {ms:8.1f} мс")
+            if source == "память":
+                worst_memory = max(worst_memory, ms)
+        print(f"Худшее уточнение в памяти: {worst_memory:.1f} мс (цель < {TARGET_MS} мс)")
+        if root is not None:
+            root.destroy()
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000, sys.argv[2] if len(sys.argv) > 2 else "фамилия1234")
@@ -0,0 +1,80 @@
+"""
+Бенчмарк памяти представлений клиентов: обычный класс с __dict__ (как было
+в models.py), Client со __slots__ через from_row и колоночная ClientTable.
+
+Запуск из корня проекта:
+    python bench/bench_models.py [кол-во строк]   # по умолчанию 1 000 000
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Client, ClientTable
+
+
+class DictClient:
+    """Клиент в прежнем виде: атрибуты в __dict__, пустой список заказов и datetime.now() в __init__."""
+
+    def __init__(self, first_name, last_name, email, phone, address):
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.phone = phone
+        self.client_id = None
+        self.address = address
+        self.registration_date = datetime.now()
+        self.orders = []
+
+
+def hydrate_dict(rows):
+    clients = []
+    for client_id, first_name, last_name, email, phone, address, registration_date in rows:
+        client = DictClient(first_name, last_name, email, phone, address)
+        client.client_id = client_id
+        client.registration_date = datetime.fromisoformat(registration_date)
+        clients.append(client)
+    return clients
+
+
+def hydrate_slots(rows):
+    return [Client.from_row(row) for row in rows]
+
+
+def rows_from_db(n: int):
+    """Строки в том виде, в каком их отдаёт sqlite3 (каждая строка - новые объекты str)."""
+    for i in range(n):
+        yield (i + 1, "Иван", "Петров" + str(i % 1000), f"user{i}@mail.ru", f"+7912{i:07d}",
+               f"Москва, ул. Ленина, д. {i % 500}", "2024-03-01T12:00:00.123456")
+
+
+def measure(func, n: int):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(rows_from_db(n))
+    elapsed = time.perf_counter() - start
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, current
+
+
+def main(n: int = 1_000_000):
+    per_million = 1_000_000 / n
+    print(f"{n} клиентов; память пересчитана на 1 млн строк")
+    print(f"{'представление':<28}{'время, с':>10}{'МБ / 1 млн':>14}")
+    for name, func in (("класс с __dict__", hydrate_dict),
+                       ("Client.__slots__ + from_row", hydrate_slots),
+                       ("ClientTable (колонки)", ClientTable.from_rows)):
+        elapsed, memory = measure(func, n)
+        print(f"{name:<28}{elapsed:>10.2f}{memory * per_million / 2 ** 20:>14.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
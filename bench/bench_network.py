@@ -0,0 +1,115 @@
+"""
+Бенчмарк построения графа совместных покупок (analysis.co_purchase_edges).
+
+Популярность товаров распределена по Ципфу, как в реальных магазинах: немногие
+товары покупают почти все, поэтому попарный перебор покупателей каждого
+товара растёт квадратично. Попарный перебор и граф по всем товарам
+(через самые популярные связаны почти все пары клиентов) строятся только
+до PAIRWISE_LIMIT клиентов.
+
+Нужны numpy, scipy и pandas. Запуск из корня проекта:
+    python bench/bench_network.py [кол-во клиентов]   # по умолчанию 100 000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from itertools import combinations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+import db
+
+PAIRWISE_LIMIT = 5000
+N_PRODUCTS = 5000
+ORDERS_PER_CLIENT = 3
+LINES_PER_ORDER = 4
+ZIPF_S = 1.1
+TOP_K = 10
+MIN_WEIGHT = 2
+MAX_PRODUCT_SHARE = 0.01
+
+
+def seed(n_clients: int):
+    rnd = random.Random(42)
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, N_PRODUCTS + 1):
+        total += 1.0 / rank ** ZIPF_S
+        cum_weights.append(total)
+    product_ids = range(1, N_PRODUCTS + 1)
+
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        db.drop_count_triggers(cursor)
+        db.drop_aggregate_triggers(cursor)
+        cursor.executemany("INSERT INTO products (product_id, name, description, price) VALUES (?, ?, '', 1.0)",
+                           ((i, f"Товар{i}") for i in product_ids))
+        cursor.executemany("""
+            INSERT INTO clients (client_id, first_name, last_name, email, phone, address, registration_date)
+            VALUES (?, 'Имя', ?, ?, '+79123456789', 'Москва', '2023-01-01T00:00:00')
+        """, ((i, f"Фамилия{i}", f"user{i}@mail.ru") for i in range(1, n_clients + 1)))
+        n_orders = n_clients * ORDERS_PER_CLIENT
+        cursor.executemany("INSERT INTO orders (order_id, client_id, order_date, status) "
+                           "VALUES (?, ?, '2024-01-01T12:00:00', 'Создан!')",
+                           ((i, rnd.randint(1, n_clients)) for i in range(1, n_orders + 1)))
+        cursor.executemany("INSERT OR IGNORE INTO order_products (order_id, product_id, quantity, price) "
+                           "VALUES (?, ?, 1, 1.0)",
+                           ((i, p) for i in range(1, n_orders + 1)
+                            for p in rnd.choices(product_ids, cum_weights=cum_weights, k=LINES_PER_ORDER)))
+        db.create_count_triggers(cursor)
+        db.refresh_row_counts(cursor)
+        db.create_aggregate_triggers(cursor)
+        db.refresh_aggregates(cursor)
+
+
+def pairwise_edges(min_weight: int):
+    """Попарный перебор покупателей каждого товара по инвертированным спискам."""
+    weights = Counter()
+    for clients in analysis.product_client_lists().values():
+        weights.update(combinations(clients.tolist(), 2))
+    return {pair: weight for pair, weight in weights.items() if weight >= min_weight}
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(n_clients: int = 100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bench.db"))
+        seed(n_clients)
+        print(f"{n_clients} клиентов, {N_PRODUCTS} товаров, популярность по Ципфу (s={ZIPF_S}), "
+              f"min_weight={MIN_WEIGHT}")
+
+        scenarios = [
+            (f"A @ A.T, top_k={TOP_K}, без товаров > {MAX_PRODUCT_SHARE:.0%} клиентов",
+             lambda: analysis.co_purchase_edges(min_weight=MIN_WEIGHT, top_k=TOP_K,
+                                                max_product_share=MAX_PRODUCT_SHARE)),
+        ]
+        if n_clients <= PAIRWISE_LIMIT:
+            scenarios[:0] = [
+                ("попарный перебор", lambda: pairwise_edges(MIN_WEIGHT)),
+                ("A @ A.T", lambda: analysis.co_purchase_edges(min_weight=MIN_WEIGHT)),
+                (f"A @ A.T, top_k={TOP_K}", lambda: analysis.co_purchase_edges(min_weight=MIN_WEIGHT, top_k=TOP_K)),
+            ]
+        for name, func in scenarios:
+            edges, elapsed, peak = measure(func)
+            print(f"  {name:<50}{elapsed:8.2f} с  пик {peak / 2 ** 20:8.1f} МБ  рёбер {len(edges)}")
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
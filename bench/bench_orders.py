@@ -0,0 +1,73 @@
+"""
+Бенчмарк: get_all_orders с N+1 запросами (старый db.py) против пакетной загрузки.
+
+Запуск из корня проекта:
+    python bench/bench_orders.py [кол-во заказов]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client, Order, Product
+
+
+def get_all_orders_n_plus_one():
+    """Поведение db.get_all_orders до пакетного загрузчика."""
+    with db.connection() as conn:
+        rows = conn.execute("SELECT * FROM orders").fetchall()
+        orders = []
+        for order_id, client_id, order_date, status in rows:
+            order = Order(db.get_client_by_id(client_id), db.get_products_by_order_id(order_id), status)
+            order.order_id = order_id
+            order.order_date = datetime.fromisoformat(order_date)
+            orders.append(order)
+    return orders
+
+
+def seed(n_orders: int, n_clients: int, n_products: int):
+    rnd = random.Random(42)
+    clients = [Client(f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва")
+               for i in range(n_clients)]
+    products = [Product(f"Товар{i}", "", float(i % 100 + 1)) for i in range(n_products)]
+    with db.connection():
+        for client in clients:
+            db.add_client(client)
+        for product in products:
+            db.add_product(product)
+        for _ in range(n_orders):
+            db.add_order(Order(rnd.choice(clients), rnd.sample(products, 3)))
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main(n_orders: int = 20000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_pool(database=os.path.join(tmp, "bench.db"))
+        db.configure_cache(max_bytes=0)  # сравниваем запросы к БД, а не кэш
+        db.create_tables()
+        seed(n_orders, n_clients=max(1, n_orders // 10), n_products=500)
+
+        old, t_old = timed(get_all_orders_n_plus_one)
+        new, t_new = timed(db.get_all_orders)
+        db.close_pool()
+
+    distinct_old = len({id(order.client) for order in old})
+    distinct_new = len({id(order.client) for order in new})
+    print(f"get_all_orders, {n_orders} заказов")
+    print(f"  N+1 запросов:       {t_old:8.3f} с, объектов Client: {distinct_old}")
+    print(f"  пакетная загрузка:  {t_new:8.3f} с, объектов Client: {distinct_new}  (x{t_old / t_new:.1f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,71 @@
+"""
+Бенчмарк параллельной аналитики: одни и те же расчёты analysis.py
+последовательно (workers=1) и в пуле процессов, с проверкой совпадения результатов.
+
+Данные - bench/datagen.py (Ципф по товарам и клиентам). Ускорение ограничено
+числом ядер: на одном ядре параллельный режим только добавляет запуск процессов
+и передачу частичных агрегатов.
+
+Нужны numpy, scipy и pandas. Запуск из корня проекта:
+    python bench/bench_parallel_analysis.py [кол-во строк заказов] [процессов]   # по умолчанию 1 000 000, по числу ядер
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+import datagen
+import db
+
+PERIOD = ("2024-01-01", "2024-07-01")
+
+
+def same(a, b) -> bool:
+    if isinstance(a, dict):
+        return all(same(a[key], b[key]) for key in a)
+    if isinstance(a, tuple):
+        return all((x != y).nnz == 0 if hasattr(x, "nnz") else (x == y).all() for x, y in zip(a, b))
+    if "revenue" in a:  # суммы с плавающей точкой зависят от порядка сложения
+        return a.drop(columns="revenue").equals(b.drop(columns="revenue")) and \
+            (a["revenue"] - b["revenue"]).abs().max() < 1e-3
+    return a.equals(b)
+
+
+def main(n_lines: int, workers: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "parallel.db"))
+        db.configure_cache(max_bytes=0)
+        counts = datagen.generate(n_lines)
+        print(f"{counts}, процессов: {workers}, ядер: {os.cpu_count()}")
+
+        calls = {
+            "order_stats за полгода": lambda w: analysis.order_stats(*PERIOD, workers=w),
+            "order_stats за всё время": lambda w: analysis.order_stats(workers=w),
+            "top_customers_by_orders за полгода": lambda w: analysis.top_customers_by_orders(10, *PERIOD, workers=w),
+            "basket_sizes": lambda w: analysis.basket_sizes(w),
+            "purchase_incidence": lambda w: analysis.purchase_incidence(w),
+            "co_purchase_edges top_k=10": lambda w: analysis.co_purchase_edges(top_k=10, max_product_share=0.01,
+                                                                               workers=w),
+        }
+        analysis.basket_sizes(workers)  # запуск процессов пула не входит в замеры
+        print(f"{'расчёт':<38} {'1 процесс, с':>14} {f'{workers} процессов, с':>16} {'ускорение':>10}")
+        for name, call in calls.items():
+            start = time.perf_counter()
+            serial = call(1)
+            serial_time = time.perf_counter() - start
+            start = time.perf_counter()
+            parallel = call(workers)
+            parallel_time = time.perf_counter() - start
+            print(f"{name:<38} {serial_time:14.2f} {parallel_time:16.2f} {serial_time / parallel_time:9.2f}x"
+                  f"{'' if same(serial, parallel) else '  РЕЗУЛЬТАТЫ РАЗЛИЧАЮТСЯ'}")
+        analysis.close_parallel()
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else max(2, os.cpu_count() or 1))
@@ -0,0 +1,125 @@
+"""
+Бенчмарк накладных расходов профилировщика (profiler.py) на типичной нагрузке
+db.py: чтения по ключу, поиск, страницы, заказы клиента, запись.
+
+Сравнивается выключенный профилировщик с включённым (цель - меньше 2%),
+а также стоимость проверки флага в @profiled относительно функции без декоратора.
+
+Запуск из корня проекта:
+    python bench/bench_profiler.py [кол-во клиентов]   # по умолчанию 20 000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from statistics import median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client, Order, Product
+from profiler import profiled, profiler
+
+TARGET_OVERHEAD = 0.02
+ROUNDS = 11
+OPS_PER_ROUND = 3000
+N_PRODUCTS = 200
+
+
+def seed(n_clients: int):
+    rnd = random.Random(42)
+    products = [Product(f"Товар{i}", "", float(i % 100 + 1)) for i in range(N_PRODUCTS)]
+    with db.connection():
+        for product in products:
+            db.add_product(product)
+        clients = [Client(f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва")
+                   for i in range(n_clients)]
+        for client in clients:
+            db.add_client(client)
+    db.add_orders([Order(rnd.choice(clients), rnd.sample(products, 3)) for _ in range(n_clients * 2)])
+    return clients, products
+
+
+def workload(n_clients: int, clients, products, seed_value: int):
+    rnd = random.Random(seed_value)
+    for _ in range(OPS_PER_ROUND):
+        op = rnd.random()
+        client_id = rnd.randint(1, n_clients)
+        if op < 0.4:
+            db.get_client_by_id(client_id)
+        elif op < 0.55:
+            db.get_orders_by_client_id(client_id)
+        elif op < 0.7:
+            db.search_clients_ranked(f"Фамилия{client_id}", limit=20)
+        elif op < 0.8:
+            db.query_clients(page_size=100).page(after=(client_id,))
+        elif op < 0.9:
+            db.get_products_by_order_id(client_id)
+        elif op < 0.97:
+            db.count_rows("orders")
+        else:
+            # запись, не меняющая объём БД, чтобы раунды были сравнимы
+            db.update_client(client_id, "Имя", f"Фамилия{client_id}", f"user{client_id}@mail.ru",
+                             "+79123456789", "Москва")
+
+
+def timed_round(n_clients: int, clients, products, round_no: int, enabled: bool) -> float:
+    if enabled:
+        db.enable_profiling()
+    else:
+        db.disable_profiling()
+    start = time.perf_counter()
+    workload(n_clients, clients, products, round_no)
+    return time.perf_counter() - start
+
+
+def decorator_cost(calls: int = 1_000_000) -> float:
+    """Наносекунды на вызов, которые добавляет выключенный @profiled (на пустой функции)."""
+    db.disable_profiling()
+
+    def noop():
+        return None
+
+    timings = []
+    for func in (noop, profiled(noop)):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        timings.append(time.perf_counter() - start)
+    return (timings[1] - timings[0]) / calls * 1e9
+
+
+def main(n_clients: int = 20000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bench.db"))
+        db.configure_cache(max_bytes=0)  # иначе чтения по ключу не доходят до SQL
+        clients, products = seed(n_clients)
+
+        results = {False: [], True: []}
+        for round_no in range(ROUNDS):
+            # чередуем режимы, чтобы дрейф машины не попадал в разницу
+            for enabled in ((False, True) if round_no % 2 else (True, False)):
+                results[enabled].append(timed_round(n_clients, clients, products, round_no, enabled))
+        cost_ns = decorator_cost()
+        db.disable_profiling()
+        snapshot = profiler.snapshot()
+        db.close_pool()
+
+    off, on = median(results[False]), median(results[True])
+    overhead = on / off - 1
+    print(f"{ROUNDS} раундов по {OPS_PER_ROUND} операций, {n_clients} клиентов (медиана раундов)")
+    print(f"  выключен  {off:7.3f} с")
+    print(f"  включён   {on:7.3f} с  накладные расходы {overhead:+.2%} "
+          f"({'OK' if overhead < TARGET_OVERHEAD else 'выше цели'} {TARGET_OVERHEAD:.0%})")
+    print(f"  выключенный @profiled: {cost_ns:.0f} нс на вызов")
+    print(f"  собрано: {len(snapshot['functions'])} функций, {len(snapshot['statements'])} выражений, "
+          f"{snapshot['connections_opened']} соединений открыто")
+    slowest = sorted(snapshot["functions"].items(), key=lambda item: item[1]["sum"], reverse=True)[:5]
+    for name, stats in slowest:
+        print(f"    {name:<28} {stats['count']:6d} вызовов  p95 <= {stats['p95'] * 1000:7.2f} мс")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
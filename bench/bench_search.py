@@ -0,0 +1,76 @@
+"""
+Бенчмарк поиска клиентов: LIKE-цепочка (старый search_clients) против FTS5.
+
+Запуск из корня проекта:
+    python bench/bench_search.py [кол-во клиентов]   # по умолчанию 1 000 000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+FIRST_NAMES = ["Иван", "Пётр", "Анна", "Мария", "Олег", "Елена", "Сергей", "Ольга", "Дмитрий", "Наталья"]
+LAST_NAMES = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Волков", "Соколов", "Лебедев", "Козлов"]
+CITIES = ["Москва", "Казань", "Иннополис", "Самара", "Пермь", "Томск"]
+QUERIES = ["Лебедев", "user4242", "Иннопол", "Смирнв", "79001234"]
+
+
+def seed(n_clients: int, batch: int = 50000):
+    rnd = random.Random(42)
+    with db.connection() as conn:
+        for start in range(0, n_clients, batch):
+            rows = []
+            for i in range(start, min(start + batch, n_clients)):
+                rows.append((rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES) + str(i % 997), f"user{i}@mail.ru",
+                             f"+7900{rnd.randrange(10 ** 7):07d}", f"{rnd.choice(CITIES)}, д. {i % 200}",
+                             "2024-01-01T00:00:00"))
+            conn.executemany("""
+                INSERT INTO clients (first_name, last_name, email, phone, address, registration_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+
+
+def search_like(text: str, limit: int = 50):
+    pattern = f"%{text}%"
+    with db.connection() as conn:
+        return conn.execute("""
+            SELECT * FROM clients
+            WHERE first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ? OR address LIKE ?
+            ORDER BY last_name, first_name LIMIT ?
+        """, (pattern,) * 5 + (limit,)).fetchall()
+
+
+def timed_ms(func, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(n_clients: int = 1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_pool(database=os.path.join(tmp, "bench.db"))
+        db.create_tables()
+        start = time.perf_counter()
+        seed(n_clients)
+        print(f"{n_clients} клиентов загружено за {time.perf_counter() - start:.1f} с (включая FTS-триггеры)")
+
+        print(f"{'запрос':<12}{'LIKE, мс':>12}{'FTS5, мс':>12}{'найдено':>10}")
+        for query in QUERIES:
+            like_ms = timed_ms(search_like, query)
+            fts_ms = timed_ms(db.search_clients_ranked, query)
+            found = len(db.search_clients_ranked(query))
+            print(f"{query:<12}{like_ms:>12.1f}{fts_ms:>12.1f}{found:>10}")
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
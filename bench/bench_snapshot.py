@@ -0,0 +1,105 @@
+"""
+Бенчмарк колоночных снимков (db.export_snapshot): выгрузка, дозапись новых заказов
+и аналитика по снимку в сравнении с SQLite, с проверкой совпадения результатов.
+
+Данные - bench/datagen.py. Функции, которые в SQLite читают готовые сводные таблицы
+(топ клиентов, заказы по дням), по снимку считаются заново по колонкам, поэтому
+выигрыш снимка - на расчётах по исходным таблицам (за период, корзины, граф).
+
+Нужны numpy, scipy, pandas и pyarrow. Запуск из корня проекта:
+    python bench/bench_snapshot.py [кол-во строк заказов]   # по умолчанию 1 000 000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+import datagen
+import db
+from models import Client, Order, Product
+
+PERIOD = ("2024-01-01", "2024-07-01")
+NEW_ORDERS = 10_000
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def same(a, b) -> bool:
+    if isinstance(a, tuple):
+        return all((x != y).nnz == 0 if hasattr(x, "nnz") else (x == y).all() for x, y in zip(a, b))
+    if "revenue" in a:  # суммы с плавающей точкой зависят от порядка сложения
+        a, b = a.sort_values("product_id", ignore_index=True), b.sort_values("product_id", ignore_index=True)
+        return a.drop(columns="revenue").equals(b.drop(columns="revenue")) and \
+            (a["revenue"] - b["revenue"]).abs().max() < 1e-3
+    return a.equals(b)
+
+
+def add_orders(n: int):
+    rnd = random.Random(7)
+    n_clients, n_products = db.count_clients(), db.count_products()
+    products = [Product.from_row((i, "", "", 1.0)) for i in range(1, n_products + 1)]
+    orders = []
+    for _ in range(n):
+        order = Order(Client.from_row((rnd.randint(1, n_clients), "", "", "", "", "", "2024-01-01T00:00:00")), [])
+        for product in rnd.sample(products, 3):
+            order.add_product(product)
+        orders.append(order)
+    db.add_orders(orders)
+
+
+def main(n_lines: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "snapshot.db"))
+        db.configure_cache(max_bytes=0)
+        print(datagen.generate(n_lines))
+        analysis.configure_parallel(1)
+
+        for fmt in db.SNAPSHOT_FORMATS:
+            directory = os.path.join(tmp, fmt)
+            _, seconds = timed(lambda: db.export_snapshot(directory, fmt))
+            size = sum(os.path.getsize(os.path.join(root, name))
+                       for root, _, names in os.walk(directory) for name in names)
+            print(f"export_snapshot {fmt:<8} {seconds:6.2f} с, {size / 2 ** 20:6.1f} МБ")
+        _, seconds = timed(lambda: db.export_to_csv(os.path.join(tmp, "csv")))
+        print(f"export_to_csv для сравнения {seconds:6.2f} с")
+
+        add_orders(NEW_ORDERS)
+        counts, seconds = timed(lambda: db.export_snapshot(os.path.join(tmp, "arrow"), incremental=True))
+        print(f"дозапись {counts} {seconds:.3f} с")
+
+        snapshot, seconds = timed(lambda: db.open_snapshot(os.path.join(tmp, "arrow")))
+        _, load = timed(snapshot.row_counts)
+        print(f"открытие снимка {seconds * 1000:.1f} мс, чтение всех таблиц {load * 1000:.1f} мс")
+
+        calls = {
+            "top_customers_by_orders": lambda src: analysis.top_customers_by_orders(10, source=src),
+            "top_customers_by_orders за полгода": lambda src: analysis.top_customers_by_orders(10, *PERIOD, source=src),
+            "order_counts MS": lambda src: analysis.order_counts('MS', source=src),
+            "revenue_per_product": lambda src: analysis.revenue_per_product(source=src),
+            "revenue_per_product за полгода": lambda src: analysis.revenue_per_product(*PERIOD, source=src),
+            "basket_sizes": lambda src: analysis.basket_sizes(source=src),
+            "purchase_incidence": lambda src: analysis.purchase_incidence(source=src),
+            "co_purchase_edges top_k=10": lambda src: analysis.co_purchase_edges(top_k=10, max_product_share=0.01,
+                                                                                 source=src),
+        }
+        analysis.order_counts()  # импорт pandas не входит в замеры
+        print(f"{'расчёт':<38} {'SQLite, с':>10} {'снимок, с':>10}")
+        for name, call in calls.items():
+            expected, sqlite_time = timed(lambda: call(None))
+            result, snapshot_time = timed(lambda: call(snapshot))
+            print(f"{name:<38} {sqlite_time:10.3f} {snapshot_time:10.3f}"
+                  f"{'' if same(expected, result) else '  РЕЗУЛЬТАТЫ РАЗЛИЧАЮТСЯ'}")
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,95 @@
+"""
+Бенчмарк сортировки заказов: полная сортировка в Python (прежний sort_orders)
+против top-k через heapq и сортировки в SQL (db.sorted_order_ids).
+
+Время Python-вариантов не включает загрузку заказов (get_all_orders) -
+она выводится отдельно: именно её и избегает сортировка в SQL.
+
+Запуск из корня проекта:
+    python bench/bench_sort_orders.py [кол-во заказов]   # по умолчанию 1 000 000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from utils import sort_orders
+
+TOP_K = 10
+LINES_PER_ORDER = 3
+N_PRODUCTS = 5000
+BATCH = 100_000
+MULTI_KEY = [("amount", True), ("date", False)]
+
+
+def seed(n_orders: int):
+    rnd = random.Random(42)
+    n_clients = max(1, n_orders // 20)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        db.drop_count_triggers(cursor)
+        db.drop_aggregate_triggers(cursor)
+        cursor.executemany("INSERT INTO products (product_id, name, description, price) VALUES (?, ?, '', ?)",
+                           ((i, f"Товар{i}", float(i % 500 + 1)) for i in range(1, N_PRODUCTS + 1)))
+        cursor.executemany("""
+            INSERT INTO clients (client_id, first_name, last_name, email, phone, address, registration_date)
+            VALUES (?, 'Имя', ?, ?, '+79123456789', 'Москва', '2023-01-01T00:00:00')
+        """, ((i, f"Фамилия{i}", f"user{i}@mail.ru") for i in range(1, n_clients + 1)))
+        for start in range(1, n_orders + 1, BATCH):
+            ids = range(start, min(start + BATCH, n_orders + 1))
+            cursor.executemany("INSERT INTO orders (order_id, client_id, order_date, status) VALUES (?, ?, ?, 'Создан!')",
+                               ((i, rnd.randint(1, n_clients), f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T12:00:00")
+                                for i in ids))
+            cursor.executemany("INSERT INTO order_products (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+                               ((i, p, rnd.randint(1, 3), float(p % 500 + 1))
+                                for i in ids for p in rnd.sample(range(1, N_PRODUCTS + 1), LINES_PER_ORDER)))
+        db.create_count_triggers(cursor)
+        db.refresh_row_counts(cursor)
+        db.create_aggregate_triggers(cursor)
+        db.refresh_aggregates(cursor)
+
+
+def old_sort_by_amount(orders):
+    """Прежний sort_orders(key="amount") с исправленным ключом: сумма считается в каждом сравнении ключа."""
+    return sorted(orders, key=lambda order: order.calc_total(), reverse=True)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(n_orders: int = 1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bench.db"))
+        db.configure_cache(max_bytes=0)
+        seed(n_orders)
+        load_time, orders = timed(db.get_all_orders)
+        print(f"{n_orders} заказов, загрузка get_all_orders: {load_time:.2f} с")
+
+        scenarios = [
+            ("Python: sorted по calc_total", lambda: old_sort_by_amount(orders)[:TOP_K]),
+            ("Python: sort_orders amount", lambda: sort_orders(orders, "amount", True)[:TOP_K]),
+            (f"Python: sort_orders amount, limit={TOP_K}", lambda: sort_orders(orders, "amount", True, TOP_K)),
+            ("Python: sort_orders amount+date", lambda: sort_orders(orders, MULTI_KEY)[:TOP_K]),
+            (f"Python: sort_orders amount+date, limit={TOP_K}", lambda: sort_orders(orders, MULTI_KEY, limit=TOP_K)),
+            ("SQL: sorted_order_ids amount (все)", lambda: db.sorted_order_ids("amount", True)[:TOP_K]),
+            (f"SQL: sorted_order_ids amount, limit={TOP_K}", lambda: db.sorted_order_ids("amount", True, TOP_K)),
+            (f"SQL: get_orders_sorted amount, limit={TOP_K}", lambda: db.get_orders_sorted("amount", True, TOP_K)),
+            (f"SQL: sorted_order_ids date, limit={TOP_K}", lambda: db.sorted_order_ids("date", True, TOP_K)),
+        ]
+        for name, func in scenarios:
+            elapsed, _ = timed(func)
+            print(f"  {name:<45} {elapsed:8.3f} с")
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
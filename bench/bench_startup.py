@@ -0,0 +1,92 @@
+"""
+Бенчмарк и бюджет времени запуска.
+
+Проверяет в отдельных процессах:
+  - время импорта main (по python -X importtime) укладывается в IMPORT_BUDGET_MS;
+  - после импорта не загружены тяжёлые библиотеки аналитики (HEAVY_MODULES);
+  - импорт не создаёт файл БД (нет обращения к диску при импорте);
+  - время до первого окна укладывается в FIRST_WINDOW_BUDGET_MS (только если есть дисплей).
+Завершается с кодом 1, если бюджет нарушен.
+
+Запуск из корня проекта:
+    python bench/bench_startup.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 300
+FIRST_WINDOW_BUDGET_MS = 1500
+HEAVY_MODULES = ("pandas", "numpy", "scipy", "matplotlib", "networkx")
+
+FIRST_WINDOW_SCRIPT = """
+import time
+start = time.perf_counter()
+import db
+from gui import MainApplication
+db.init_db()
+app = MainApplication()
+app.update()
+print((time.perf_counter() - start) * 1000)
+app.on_close()
+"""
+
+
+def run_python(args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=env, capture_output=True, text=True)
+
+
+def import_time_ms(cwd) -> float:
+    """Суммарное время импорта main по выводу -X importtime (строка самого модуля, cumulative)."""
+    result = run_python(["-X", "importtime", "-c", "import main"], cwd)
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == "main":
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"Не удалось разобрать вывод importtime:\n{result.stderr[-2000:]}")
+
+
+def main() -> int:
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        import_ms = import_time_ms(tmp)
+        print(f"импорт main: {import_ms:.1f} мс (бюджет {IMPORT_BUDGET_MS} мс)")
+        if import_ms > IMPORT_BUDGET_MS:
+            failures.append("время импорта")
+
+        loaded = run_python(["-c", f"import sys, main; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"],
+                            tmp).stdout.strip()
+        print(f"тяжёлые модули после импорта: {loaded or 'нет'}")
+        if loaded:
+            failures.append("тяжёлые модули загружаются при импорте")
+
+        created = os.listdir(tmp)
+        print(f"файлы, созданные импортом: {created or 'нет'}")
+        if created:
+            failures.append("импорт обращается к диску")
+
+        if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+            result = run_python(["-c", FIRST_WINDOW_SCRIPT], tmp)
+            if result.returncode != 0:
+                print(result.stderr)
+                failures.append("окно не открылось")
+            else:
+                window_ms = float(result.stdout.strip().splitlines()[-1])
+                print(f"до первого окна: {window_ms:.1f} мс (бюджет {FIRST_WINDOW_BUDGET_MS} мс)")
+                if window_ms > FIRST_WINDOW_BUDGET_MS:
+                    failures.append("время до первого окна")
+        else:
+            print("до первого окна: пропущено (нет дисплея)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Бенчмарк времени до первой отрисовки таблицы клиентов:
+вставка всех строк в ttk.Treeview (старый load_clients) против VirtualTreeview.
+
+Нужен дисплей (на сервере - xvfb-run). Запуск из корня проекта:
+    python bench/bench_treeview.py [размеры через запятую]   # по умолчанию 10000,100000,1000000
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from gui import client_row
+from widgets import VirtualTreeview
+
+COLUMNS = ["ID", "Имя", "Фамилия", "Email", "Телефон", "Адрес", "Дата регистрации"]
+FULL_INSERT_LIMIT = 100000  # дальше полная вставка занимает минуты - пропускаем
+
+
+def seed(n_clients: int, batch: int = 50000):
+    with db.connection() as conn:
+        for start in range(0, n_clients, batch):
+            conn.executemany("""
+                INSERT INTO clients (first_name, last_name, email, phone, address, registration_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, ((f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва", "2024-01-01T00:00:00")
+                  for i in range(start, min(start + batch, n_clients))))
+
+
+def first_paint_full(root) -> float:
+    start = time.perf_counter()
+    tree = ttk.Treeview(root, columns=COLUMNS, show='headings', height=15)
+    tree.pack()
+    for client in db.get_all_clients():
+        tree.insert("", tk.END, values=client_row(client))
+    root.update()
+    elapsed = time.perf_counter() - start
+    tree.destroy()
+    return elapsed
+
+
+def first_paint_virtual(root) -> float:
+    start = time.perf_counter()
+    tree = VirtualTreeview(root, columns=COLUMNS, height=15)
+    tree.pack()
+    tree.set_source(db.count_clients(),
+                    lambda offset, limit: [client_row(client) for client in db.get_clients_page(offset, limit)])
+    root.update()
+    elapsed = time.perf_counter() - start
+    items = len(tree.tree.get_children())
+    tree.destroy()
+    return elapsed, items
+
+
+def main(sizes=(10000, 100000, 1000000)):
+    root = tk.Tk()
+    print(f"{'строк':>10}{'Treeview, с':>14}{'Virtual, с':>14}{'элементов Tk':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            db.configure_pool(database=os.path.join(tmp, f"bench_{size}.db"))
+            db.create_tables()
+            seed(size)
+            full = f"{first_paint_full(root):14.3f}" if size <= FULL_INSERT_LIMIT else f"{'пропущено':>14}"
+            virtual, items = first_paint_virtual(root)
+            print(f"{size:>10}{full}{virtual:>14.3f}{items:>14}")
+        db.close_pool()
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main(tuple(int(size) for size in sys.argv[1].split(",")) if len(sys.argv) > 1 else (10000, 100000, 1000000))
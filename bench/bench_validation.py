@@ -0,0 +1,106 @@
+"""
+Бенчмарк валидации: построчные проверки со строковым шаблоном (re.match на
+каждый вызов, как было в utils/models) против пакетной validate_rows
+с заранее скомпилированными шаблонами, плюс стоимость проверки в import_from_csv.
+
+Запуск из корня проекта:
+    python bench/bench_validation.py [кол-во строк]   # по умолчанию 1 000 000
+"""
+
+import csv
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from utils import validate_rows
+
+HEADER = ["client_id", "first_name", "last_name", "email", "phone", "address", "registration_date"]
+BAD_SHARE = 0.01  # доля строк с неверным email или телефоном
+IMPORT_ROWS = 200_000
+
+
+def make_rows(n: int):
+    rnd = random.Random(42)
+    rows = []
+    for i in range(1, n + 1):
+        email, phone = f"user{i}@mail.ru", "+79123456789"
+        if rnd.random() < BAD_SHARE:
+            if rnd.random() < 0.5:
+                email = f"user{i}mail.ru"
+            else:
+                phone = "12-34"
+        rows.append([str(i), f"Имя{i}", f"Фамилия{i}", email, phone, "Москва", "2024-01-01T00:00:00"])
+    return rows
+
+
+def row_by_row(rows):
+    """Прежнее поведение: шаблон передаётся строкой, re.match ищет его в кэше модуля re на каждый вызов."""
+    valid, rejected = [], []
+    for row in rows:
+        if (re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", row[3]) is not None
+                and re.match(r"^\+?[0-9]{10,12}$", row[4]) is not None):
+            valid.append(row)
+        else:
+            rejected.append((row, "неверный формат"))
+    return valid, rejected
+
+
+def batched(rows):
+    valid, rejected = [], []
+    for start in range(0, len(rows), db.IMPORT_BATCH_SIZE):
+        ok, bad = validate_rows(HEADER, rows[start:start + db.IMPORT_BATCH_SIZE], db.IMPORT_RULES["clients"])
+        valid += ok
+        rejected += bad
+    return valid, rejected
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def write_clients(base: str, rows):
+    with open(f"{base}_clients.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def bench_import(tmp: str, rows):
+    """Импорт без проверки (файл заранее очищен от неверных строк) против импорта с проверкой."""
+    clean, dirty = os.path.join(tmp, "clean"), os.path.join(tmp, "dirty")
+    write_clients(clean, batched(rows)[0])
+    write_clients(dirty, rows)
+    results = {}
+    for validate, base in ((False, clean), (True, dirty)):
+        db.configure_pool(database=os.path.join(tmp, f"import_{validate}.db"))
+        db.create_tables()
+        results[validate] = timed(db.import_from_csv, base, db.IMPORT_BATCH_SIZE, None, "REPLACE", validate)
+    db.close_pool()
+    return results
+
+
+def main(n: int = 1_000_000):
+    rows = make_rows(n)
+    print(f"Проверка {n} строк (email и телефон), неверных ~{BAD_SHARE:.0%}")
+    for name, func in (("построчно", row_by_row), ("validate_rows", batched)):
+        elapsed, (valid, rejected) = timed(func, rows)
+        print(f"  {name:<14} {elapsed:6.2f} с  {n / elapsed:10.0f} строк/с  отклонено {len(rejected)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = rows[:IMPORT_ROWS]
+        results = bench_import(tmp, sample)
+    print(f"import_from_csv, {len(sample)} клиентов")
+    for validate, (elapsed, counts) in results.items():
+        print(f"  validate={str(validate):<6} {elapsed:6.2f} с  {len(sample) / elapsed:10.0f} строк/с  {counts}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
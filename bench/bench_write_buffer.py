@@ -0,0 +1,60 @@
+"""
+Бенчмарк отложенной записи: db.add_client по одному (COMMIT на строку)
+против WriteBehindBuffer (групповой COMMIT).
+
+Запуск из корня проекта:
+    python bench/bench_write_buffer.py [кол-во клиентов]   # по умолчанию 20 000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client
+from write_buffer import WriteBehindBuffer
+
+
+def make_clients(n: int, prefix: str):
+    return [Client("Имя", f"{prefix}{i}", f"{prefix}{i}@mail.ru", "+79123456789", "Москва") for i in range(n)]
+
+
+def direct(clients):
+    for client in clients:
+        db.add_client(client)
+
+
+def buffered(clients, max_batch: int):
+    buffer = WriteBehindBuffer(max_batch=max_batch)
+    futures = [buffer.add_client(client) for client in clients]
+    for future in futures:
+        future.result()
+    buffer.close()
+    return buffer.metrics()
+
+
+def main(n: int = 20_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bench.db"))
+
+        start = time.perf_counter()
+        direct(make_clients(n, "direct"))
+        elapsed = time.perf_counter() - start
+        print(f"  {'add_client по одному':<30}{elapsed:7.2f} с  ({n / elapsed:>8.0f} строк/с)")
+
+        for max_batch in (100, 500, 2000):
+            clients = make_clients(n, f"batch{max_batch}_")
+            start = time.perf_counter()
+            metrics = buffered(clients, max_batch)
+            elapsed = time.perf_counter() - start
+            print(f"  {f'буфер, max_batch={max_batch}':<30}{elapsed:7.2f} с  ({n / elapsed:>8.0f} строк/с)  "
+                  f"пакетов {metrics['batches']}, макс. очередь {metrics['max_queue_depth']}, "
+                  f"COMMIT ср. {metrics['commit_ms_avg']:.1f} мс / макс. {metrics['commit_ms_max']:.1f} мс")
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
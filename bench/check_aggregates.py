@@ -0,0 +1,41 @@
+"""
+Проверка сводных таблиц статистики (client_stats, daily_order_counts, product_sales)
+против полного пересчёта по заказам.
+
+Запуск из корня проекта:
+    python bench/check_aggregates.py [файл БД] [--rebuild]
+
+Скрипт завершается с кодом 1, если найдены расхождения. С --rebuild
+сводные таблицы сначала перестраиваются с нуля.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+SHOW_MISMATCHES = 10
+
+
+def main(argv) -> int:
+    rebuild = "--rebuild" in argv
+    paths = [arg for arg in argv if arg != "--rebuild"]
+    db.init_db(paths[0] if paths else None)
+    if rebuild:
+        db.rebuild_aggregates()
+        print("Сводные таблицы перестроены")
+
+    failures = 0
+    for table, mismatches in db.check_aggregates().items():
+        print(f"{'FAIL' if mismatches else 'ok  '} {table}: расхождений {len(mismatches)}")
+        for key, stored, expected in mismatches[:SHOW_MISMATCHES]:
+            print(f"       {key}: в таблице {stored}, пересчёт {expected}")
+        failures += bool(mismatches)
+    db.close_pool()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
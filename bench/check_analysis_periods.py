@@ -0,0 +1,89 @@
+"""
+Проверка границ периода в analysis.py: order_counts (по daily_order_counts и по снимку)
+и order_stats должны одинаково понимать [since, until) - сравнение с order_date целиком,
+в том числе когда since/until - datetime с временем внутри дня.
+
+Эталон - прямой подсчёт заказов с since <= order_date < until по дням.
+
+Запуск из корня проекта:
+    python bench/check_analysis_periods.py
+
+Скрипт завершается с кодом 1, если какой-то путь расчёта разошёлся с эталоном.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+import db
+
+HOURS = (0, 6, 12, 18, 23)
+DAYS = 10
+
+PERIODS = [
+    (None, None),
+    (None, datetime(2024, 1, 5, 12, 0)),            # until в середине дня
+    (datetime(2024, 1, 3, 12, 0), None),            # since в середине дня
+    (datetime(2024, 1, 3, 6, 30), datetime(2024, 1, 7, 18, 0)),
+    (datetime(2024, 1, 4, 6, 0), datetime(2024, 1, 4, 18, 0)),  # внутри одного дня
+    (date(2024, 1, 2), date(2024, 1, 6)),
+    ("2024-01-02T00:00:00", "2024-01-06T00:00:00"),  # полночь - то же, что дата
+    (None, "2024-01-05T00:00:00.000001"),
+]
+
+
+def order_dates() -> list:
+    return [datetime(2024, 1, day, hour, 15).isoformat() for day in range(1, DAYS + 1) for hour in HOURS]
+
+
+def expected_counts(dates: list, since, until) -> dict:
+    since, until = analysis._period_bound(since), analysis._period_bound(until)
+    counts = {}
+    for order_date in dates:
+        if (since is None or order_date >= since) and (until is None or order_date < until):
+            counts[order_date[:10]] = counts.get(order_date[:10], 0) + 1
+    return counts
+
+
+def as_dict(series) -> dict:
+    return {day.date().isoformat(): int(count) for day, count in series.items() if count}
+
+
+def main() -> int:
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "periods.db"))
+        dates = order_dates()
+        with db.connection() as conn:
+            conn.execute("INSERT INTO clients (first_name, last_name, email, phone, address, registration_date) "
+                         "VALUES ('Имя', 'Фамилия', 'user@mail.ru', '+79123456789', 'Москва', '2024-01-01')")
+            conn.executemany("INSERT INTO orders (client_id, order_date, status) VALUES (1, ?, 'Создан!')",
+                             [(order_date,) for order_date in dates])
+        snapshot = os.path.join(tmp, "snapshot")
+        db.export_snapshot(snapshot)
+
+        for since, until in PERIODS:
+            expected = expected_counts(dates, since, until)
+            found = {
+                "order_counts": as_dict(analysis.order_counts(since=since, until=until)),
+                "order_counts(снимок)": as_dict(analysis.order_counts(since=since, until=until, source=snapshot)),
+                "order_stats": as_dict(analysis.order_stats(since, until, workers=1)['daily']),
+            }
+            for name, counts in found.items():
+                if counts != expected:
+                    failures.append(f"{name} [{since}, {until}): {counts} != {expected}")
+        analysis.close_parallel()
+        db.close_pool()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{'FAIL' if failures else 'ok  '} границы периода в analysis.py: расхождений {len(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Проверка пакетного add_orders: сводные таблицы после пакета от BULK_ORDERS_THRESHOLD
+заказов (изменения применяются одним набором запросов) и после построчной вставки
+(триггеры) должны совпадать с полным пересчётом - в том числе для order_date
+с часовым поясом, где день заказа считается SQLite-функцией date() в UTC.
+
+Запуск из корня проекта:
+    python bench/check_bulk_orders.py
+
+Скрипт завершается с кодом 1, если найдены расхождения.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client, Order, Product
+
+MSK = timezone(timedelta(hours=3))
+
+
+def make_orders(n: int, client: Client, product: Product) -> list:
+    orders = []
+    for i in range(n):
+        order = Order(client, [product])
+        # около полуночи по Москве - в UTC это предыдущий день
+        order.order_date = datetime(2024, 1, 1 + i % 5, 0, 30, tzinfo=MSK) + timedelta(minutes=i % 60)
+        orders.append(order)
+    return orders
+
+
+def main() -> int:
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "bulk_orders.db"))
+        client = Client("Имя", "Фамилия", "user@mail.ru", "+79123456789", "Москва")
+        db.add_client(client)
+        product = Product("Товар", None, 10.0)
+        db.add_product(product)
+
+        for name, n in (("пакет", db.BULK_ORDERS_THRESHOLD + 100), ("построчно", 10)):
+            db.add_orders(make_orders(n, client, product))
+            for table, mismatches in db.check_aggregates().items():
+                failures += [f"{name}: {table} {key}: в таблице {stored}, пересчёт {expected}"
+                             for key, stored, expected in mismatches]
+        db.close_pool()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{'FAIL' if failures else 'ok  '} сводные таблицы после add_orders: расхождений {len(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
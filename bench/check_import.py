@@ -0,0 +1,109 @@
+"""
+Проверка внешних ключей при импорте CSV: строки, ссылающиеся на ID, которых нет
+ни в БД, ни среди принятых строк CSV, должны попасть в {filename}_{table}.rejected.csv
+с причиной, а не обрушить весь импорт на COMMIT.
+
+Набор данных: клиент 1 уже есть в БД, клиенты 2-3 приходят из CSV, клиент 4 отклоняется
+по формату email. Заказы ссылаются на клиента из БД, из CSV, на несуществующего (сирота)
+и на отклонённого; строки заказов - на принятые, отклонённые и несуществующие заказы и товары.
+
+Запуск из корня проекта:
+    python bench/check_import.py
+
+Скрипт завершается с кодом 1, если результат импорта не совпал с ожидаемым.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client
+
+CSV_ROWS = {
+    "clients": (["client_id", "first_name", "last_name", "email", "phone", "address", "registration_date"], [
+        [2, "Имя2", "Фамилия2", "user2@mail.ru", "+79123456789", "Москва", "2024-01-01T00:00:00"],
+        [3, "Имя3", "Фамилия3", "user3@mail.ru", "+79123456789", "Москва", "2024-01-01T00:00:00"],
+        [4, "Имя4", "Фамилия4", "не email", "+79123456789", "Москва", "2024-01-01T00:00:00"],
+    ]),
+    "products": (["product_id", "name", "description", "price"], [
+        [1, "Товар1", "", 10],
+        [2, "Товар2", "", 20],
+    ]),
+    "orders": (["order_id", "client_id", "order_date", "status"], [
+        [10, 1, "2024-01-01T00:00:00", "Создан!"],   # клиент из БД
+        [11, 2, "2024-01-01T00:00:00", "Создан!"],   # клиент из CSV
+        [12, 99, "2024-01-01T00:00:00", "Создан!"],  # сирота
+        [13, 4, "2024-01-01T00:00:00", "Создан!"],   # отклонённый клиент
+    ]),
+    "order_products": (["order_id", "product_id"], [
+        [10, 1],
+        [11, 2],
+        [12, 1],   # заказ-сирота отклонён
+        [10, 77],  # нет товара
+        [14, 1],   # нет заказа
+    ]),
+}
+EXPECTED = {
+    "clients": 2, "clients.rejected": 1,
+    "products": 2,
+    "orders": 2, "orders.rejected": 2,
+    "order_products": 2, "order_products.rejected": 3,
+}
+EXPECTED_REJECTED = {
+    "orders": {"12", "13"},
+    "order_products": {("12", "1"), ("10", "77"), ("14", "1")},
+}
+
+
+def main() -> int:
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "import.db"))
+        db.add_client(Client("Имя1", "Фамилия1", "user1@mail.ru", "+79123456789", "Москва"))
+
+        base = os.path.join(tmp, "data")
+        for table, (header, rows) in CSV_ROWS.items():
+            with open(f"{base}_{table}.csv", "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+
+        try:
+            counts = db.import_from_csv(base)
+        except Exception as e:
+            counts = {}
+            failures.append(f"импорт прерван: {type(e).__name__}: {e}")
+        if counts and counts != EXPECTED:
+            failures.append(f"счётчики импорта {counts} != {EXPECTED}")
+
+        for table, expected in EXPECTED_REJECTED.items():
+            path = f"{base}_{table}{db.REJECTED_SUFFIX}"
+            if not os.path.exists(path):
+                failures.append(f"нет файла {path}")
+                continue
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            found = {row["order_id"] if table == "orders" else (row["order_id"], row["product_id"]) for row in rows}
+            if found != expected:
+                failures.append(f"{table}: отклонены {sorted(found)}, ожидалось {sorted(expected)}")
+            if not all(row["error"] for row in rows):
+                failures.append(f"{table}: у отклонённой строки нет причины")
+
+        with db.connection() as conn:
+            broken = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if broken:
+            failures.append(f"нарушены внешние ключи: {broken}")
+        db.close_pool()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{'FAIL' if failures else 'ok  '} внешние ключи при импорте CSV: расхождений {len(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Проверка колоночных таблиц models.py: строка, прошедшая через ClientTable/ProductTable,
+должна возвращаться без изменений, а client(i) - совпадать с Client, который
+возвращает get_client_by_id (в том числе для дат с часовым поясом и микросекундами).
+
+Запуск из корня проекта:
+    python bench/check_models.py
+
+Скрипт завершается с кодом 1, если найдены расхождения.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import ClientTable, ProductTable
+
+REGISTRATION_DATES = [
+    "2024-01-01T00:00:00",
+    "2024-03-01T12:34:56.789012",
+    "2024-03-01T12:00:00+03:00",
+    "2023-10-29T02:30:00-05:00",
+    "2024-02-29",
+]
+
+
+def client_fields(client) -> tuple:
+    return (client.client_id, client.first_name, client.last_name, client.email, client.phone, client.address,
+            client.registration_date, type(client.registration_date))
+
+
+def main() -> int:
+    failures = []
+    rows = [(i + 1, f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва", date)
+            for i, date in enumerate(REGISTRATION_DATES)]
+    table = ClientTable.from_rows(rows)
+    failures += [f"ClientTable.row({i}): {table.row(i)} != {row}" for i, row in enumerate(rows) if table.row(i) != row]
+
+    products = [(1, "Товар", None, 10.5), (2, "Товар 2", "Описание", 0.1)]
+    product_table = ProductTable.from_rows(products)
+    failures += [f"ProductTable.row({i}): {product_table.row(i)} != {row}"
+                 for i, row in enumerate(products) if product_table.row(i) != row]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "models.db"))
+        with db.connection() as conn:
+            conn.executemany(f"INSERT INTO clients ({db.CLIENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        for client in db.get_clients_table():
+            expected = db.get_client_by_id(client.client_id)
+            if client_fields(client) != client_fields(expected):
+                failures.append(f"get_clients_table: {client_fields(client)} != get_client_by_id: "
+                                f"{client_fields(expected)}")
+        db.close_pool()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{'FAIL' if failures else 'ok  '} колоночные таблицы: расхождений {len(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
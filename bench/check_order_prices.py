@@ -0,0 +1,67 @@
+"""
+Проверка цен на момент покупки: после изменения цены товара сумма заказа
+(Order.calc_total), выручка в client_stats и сортировка заказов по сумме в SQL
+(sorted_order_ids) должны считаться по order_products.price, а не по текущей цене.
+
+Запуск из корня проекта:
+    python bench/check_order_prices.py
+
+Скрипт завершается с кодом 1, если суммы разошлись.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client, Order, Product
+from utils import sort_orders
+
+
+def main() -> int:
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "order_prices.db"))
+        client = Client("Имя", "Фамилия", "user@mail.ru", "+79123456789", "Москва")
+        db.add_client(client)
+        cheap, other = Product("Товар", None, 10.0), Product("Другой", None, 30.0)
+        db.add_product(cheap)
+        db.add_product(other)
+
+        old = Order(client, [])
+        old.add_product(cheap, 2)   # 2 x 10 = 20
+        middle = Order(client, [other])  # 30
+        db.add_orders([old, middle])
+        db.update_product(cheap.product_id, cheap.name, None, 99.0)
+        cheap.price = 99.0
+        new = Order(client, [cheap])  # 99
+        db.add_order(new)
+
+        expected = {old.order_id: 20.0, middle.order_id: 30.0, new.order_id: 99.0}
+        orders = db.get_orders_by_client_id(client.client_id)
+        found = {order.order_id: order.calc_total() for order in orders}
+        if found != expected:
+            failures.append(f"calc_total {found} != {expected}")
+
+        with db.connection() as conn:
+            revenue = conn.execute("SELECT revenue FROM client_stats WHERE client_id = ?",
+                                   (client.client_id,)).fetchone()[0]
+        if revenue != sum(expected.values()):
+            failures.append(f"client_stats.revenue {revenue} != {sum(expected.values())}")
+
+        in_python = [order.order_id for order in sort_orders(db.get_all_orders(), "amount", True)]
+        in_sql = db.sorted_order_ids("amount", True)
+        if in_sql != in_python or in_sql != [new.order_id, middle.order_id, old.order_id]:
+            failures.append(f"сортировка по сумме: SQL {in_sql}, Python {in_python}")
+        db.close_pool()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{'FAIL' if failures else 'ok  '} цены на момент покупки: расхождений {len(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
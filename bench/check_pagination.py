@@ -0,0 +1,92 @@
+"""
+Регрессионная проверка TableQuery.page_at: переход к странице в середине таблицы
+не должен просматривать таблицу от начала (OFFSET на половину таблицы).
+
+Работа запроса меряется числом шагов виртуальной машины SQLite (set_progress_handler),
+а не временем, поэтому проверка не зависит от скорости машины. Страница из середины
+таблицы после построения якорей должна стоить не больше, чем страница с тем же
+пропуском строк от начала таблицы; результат сверяется с LIMIT/OFFSET.
+
+Запуск из корня проекта:
+    python bench/check_pagination.py [кол-во клиентов]   # по умолчанию 200 000
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+LIMIT = 200
+STEPS_PER_CALL = 100  # progress handler вызывается раз в столько инструкций
+
+
+def seed(n_clients: int, batch: int = 50000):
+    with db.connection() as conn:
+        for start in range(0, n_clients, batch):
+            conn.executemany("""
+                INSERT INTO clients (first_name, last_name, email, phone, address, registration_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, ((f"Имя{i}", f"Фамилия{i * 7919 % n_clients}", f"user{i}@mail.ru", "+79123456789", "Москва",
+                   "2024-01-01T00:00:00") for i in range(start, min(start + batch, n_clients))))
+
+
+def vm_steps(func):
+    """Результат func() и число шагов VM SQLite, выполненных на соединении пула за время вызова."""
+    calls = [0]
+
+    def handler():
+        calls[0] += 1
+        return 0
+
+    with db.connection() as conn:
+        conn.set_progress_handler(handler, STEPS_PER_CALL)
+        try:
+            result = func()
+        finally:
+            conn.set_progress_handler(None, STEPS_PER_CALL)
+    return result, calls[0] * STEPS_PER_CALL
+
+
+def check(name: str, query: db.TableQuery, total: int) -> bool:
+    skip = db.ANCHOR_STEP - LIMIT  # самый дальний пропуск от якоря
+    middle = (total // 2) // db.ANCHOR_STEP * db.ANCHOR_STEP + skip
+
+    query.page_at(middle, LIMIT)  # первый дальний переход строит якоря - не входит в замер
+    query._boundaries.clear()
+    rows, near_steps = vm_steps(lambda: query.page_at(skip, LIMIT))
+    query._boundaries.clear()
+    rows, middle_steps = vm_steps(lambda: query.page_at(middle, LIMIT))
+
+    where = " AND ".join(query._where)
+    sql = (f"SELECT {', '.join(query.columns)} FROM {query.table}{' WHERE ' + where if where else ''} "
+           f"ORDER BY {query._order_sql()} LIMIT ? OFFSET ?")
+    with db.connection() as conn:
+        expected, offset_steps = vm_steps(lambda: conn.execute(sql, query._params + [LIMIT, middle]).fetchall())
+
+    same = [client.client_id for client in rows] == [row[0] for row in expected]
+    ok = same and middle_steps <= 2 * near_steps + 1000
+    print(f"{'ok  ' if ok else 'FAIL'} {name}: страница {middle}: {middle_steps} шагов VM, "
+          f"страница {skip}: {near_steps}, OFFSET {middle}: {offset_steps}"
+          f"{'' if same else ', строки не совпадают с OFFSET'}")
+    return ok
+
+
+def main(n_clients: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "pagination.db"))
+        seed(n_clients)
+        queries = {
+            "по client_id": db.query_clients(page_size=LIMIT),
+            "по фамилии": db.query_clients(order_by="last_name", page_size=LIMIT),
+            "с фильтром по client_id": db.query_clients(page_size=LIMIT, client_id__gt=n_clients // 10),
+        }
+        failures = sum(not check(name, query, query.count()) for name, query in queries.items())
+        db.close_pool()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
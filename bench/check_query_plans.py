@@ -0,0 +1,92 @@
+"""
+Регрессионная проверка планов запросов: горячие функции db.py не должны
+делать полный просмотр таблиц (SCAN).
+
+Каждая функция вызывается на временной БД, все выполненные ею SQL-выражения
+перехватываются через set_trace_callback и прогоняются через EXPLAIN QUERY PLAN.
+Скрипт завершается с кодом 1, если хоть один план содержит SCAN по таблице.
+
+Запуск из корня проекта:
+    python bench/check_query_plans.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client, Order, Product
+
+# функции с выборочным доступом; полные выгрузки (get_all_*, export) сюда не входят
+HOT_CALLS = {
+    "get_client_by_id": lambda: db.get_client_by_id(2),
+    "find_clients_by_email": lambda: db.find_clients_by_email("user2@mail.ru"),
+    "search_clients": lambda: db.search_clients("Фамилия2"),
+    "search_clients_ranked": lambda: db.search_clients_ranked("Фамилия2"),
+    "update_client": lambda: db.update_client(2, "Имя", "Фамилия2", "user2@mail.ru", "+79123456789", "Москва"),
+    "get_products_by_order_id": lambda: db.get_products_by_order_id(2),
+    "get_orders_by_client_id": lambda: db.get_orders_by_client_id(2),
+    "get_orders_by_ids": lambda: db.get_orders_by_ids([1, 2, 3]),
+    "query_clients keyset": lambda: db.query_clients(page_size=10).page(after=(5,)),
+    "query_orders keyset by date": lambda: db.query_orders(order_by="order_date", page_size=10).page(
+        after=("2000-01-01", 1)),
+    "count_rows": lambda: db.count_rows("orders"),
+}
+
+# служебные выражения, планы которых не проверяются
+# ("--" - выражения внутри триггеров, трассировка показывает их как комментарии)
+SKIP_PREFIXES = ("--", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SELECT 1 FROM SQLITE_MASTER")
+
+
+def seed():
+    products = [Product(f"Товар{i}", "", 10.0 * (i + 1)) for i in range(20)]
+    for product in products:
+        db.add_product(product)
+    for i in range(50):
+        client = Client(f"Имя{i}", f"Фамилия{i}", f"user{i}@mail.ru", "+79123456789", "Москва")
+        db.add_client(client)
+        db.add_order(Order(client, products[i % 10:i % 10 + 3]))
+    with db.connection() as conn:
+        conn.execute("ANALYZE")
+
+
+def traced_statements(func):
+    statements = []
+    with db.connection() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            func()
+        finally:
+            conn.set_trace_callback(None)
+    return [sql for sql in statements if not sql.strip().upper().startswith(SKIP_PREFIXES)]
+
+
+def full_scans(sql: str):
+    with db.connection() as conn:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    details = [row[3] for row in plan]
+    return [detail for detail in details
+            if detail.startswith("SCAN") and "VIRTUAL TABLE" not in detail and detail != "SCAN CONSTANT ROW"]
+
+
+def main() -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure_pool(database=os.path.join(tmp, "plans.db"))
+        db.configure_cache(max_bytes=0)  # иначе повторные вызовы не доходят до SQL
+        db.create_tables()
+        seed()
+        for name, func in HOT_CALLS.items():
+            scans = [(sql, scan) for sql in traced_statements(func) for scan in full_scans(sql)]
+            print(f"{'FAIL' if scans else 'ok  '} {name}")
+            for sql, scan in scans:
+                print(f"       {scan}: {' '.join(sql.split())[:120]}")
+            failures += bool(scans)
+        db.close_pool()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
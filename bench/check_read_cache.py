@@ -0,0 +1,108 @@
+"""
+Проверка кэша чтения при записи во вложенных транзакциях: другой поток, прочитавший
+строку между изменением и COMMIT, не должен оставить в кэше старое значение.
+
+1. Детерминированный сценарий: update_client / update_product вызываются внутри
+   внешнего блока connection(), до COMMIT другой поток читает ту же строку;
+   после COMMIT get_client_by_id / get_all_products обязаны вернуть новые данные.
+2. Буфер отложенной записи (write_buffer): пакет из update_client и множества вставок
+   пишется одной транзакцией, пока поток чтения непрерывно вызывает get_client_by_id;
+   после завершения Future чтение обязано вернуть новые данные.
+
+Запуск из корня проекта:
+    python bench/check_read_cache.py [кол-во пакетов]   # по умолчанию 20
+
+Скрипт завершается с кодом 1, если из кэша прочитаны устаревшие данные.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import write_buffer
+from models import Client, Product
+
+INSERTS_PER_BATCH = 300
+
+
+def read_in_thread(func):
+    """Выполняет func() в отдельном потоке (со своим соединением пула) и ждёт результат."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def check_nested(client_id: int, product_id: int) -> list:
+    failures = []
+    db.get_client_by_id(client_id)
+    db.get_all_products()
+    with db.connection():
+        db.update_client(client_id, "Новое", "Имя", "new@mail.ru", "+79000000000", "Казань")
+        db.update_product(product_id, "Новый товар", None, 1.0)
+        # до COMMIT другой поток видит (и кэширует) старые строки
+        stale_client = read_in_thread(lambda: db.get_client_by_id(client_id))
+        read_in_thread(db.get_all_products)
+    if stale_client.first_name == "Новое":
+        failures.append("поток чтения увидел незафиксированное изменение")
+    if db.get_client_by_id(client_id).first_name != "Новое":
+        failures.append("get_client_by_id после COMMIT вернул старую строку")
+    if {product.name for product in db.get_all_products() if product.product_id == product_id} != {"Новый товар"}:
+        failures.append("get_all_products после COMMIT вернул старую строку")
+    return failures
+
+
+def check_write_buffer(client_id: int, batches: int) -> list:
+    failures = []
+    buffer = write_buffer.WriteBehindBuffer(max_batch=INSERTS_PER_BATCH + 1, max_delay=0.01)
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            db.get_client_by_id(client_id)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for batch in range(batches):
+            address = f"Адрес {batch}"
+            future = buffer.update_client(client_id, "Имя", "Фамилия", "user@mail.ru", "+79123456789", address)
+            for i in range(INSERTS_PER_BATCH):
+                buffer.add_client(Client(f"Имя{i}", f"Фамилия{i}", f"user{batch}.{i}@mail.ru", "+79123456789",
+                                         "Москва"))
+            future.result()
+            found = db.get_client_by_id(client_id).address
+            if found != address:
+                failures.append(f"пакет {batch}: после записи прочитано {found!r} вместо {address!r}")
+    finally:
+        stop.set()
+        thread.join()
+        buffer.close()
+    return failures
+
+
+def main(batches: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "read_cache.db"))
+        client = Client("Имя", "Фамилия", "user@mail.ru", "+79123456789", "Москва")
+        db.add_client(client)
+        product = Product("Товар", None, 10.0)
+        db.add_product(product)
+
+        failures = check_nested(client.client_id, product.product_id)
+        failures += check_write_buffer(client.client_id, batches)
+        db.close_pool()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{'FAIL' if failures else 'ok  '} кэш чтения при вложенных транзакциях: устаревших чтений {len(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
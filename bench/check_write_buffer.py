@@ -0,0 +1,71 @@
+"""
+Проверка склеивания операций в WriteBehindBuffer: внутри пакета выполняется только
+последнее изменение строки, удаление отменяет ожидающие изменения, а изменение
+после ожидающего удаления не отменяет само удаление.
+
+Запуск из корня проекта:
+    python bench/check_write_buffer.py
+
+Скрипт завершается с кодом 1, если после flush() строки не в ожидаемом состоянии.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from models import Client
+from write_buffer import WriteBehindBuffer
+
+
+def update(buffer: WriteBehindBuffer, client_id: int, address: str):
+    return buffer.update_client(client_id, "Имя", "Фамилия", "user@mail.ru", "+79123456789", address)
+
+
+# сценарий -> (операции над строкой, ожидаемый адрес или None - строка удалена)
+SCENARIOS = {
+    "изменение, изменение": ([lambda b, i: update(b, i, "А"), lambda b, i: update(b, i, "Б")], "Б"),
+    "изменение, удаление": ([lambda b, i: update(b, i, "А"), lambda b, i: b.delete_client(i)], None),
+    "удаление, изменение": ([lambda b, i: b.delete_client(i), lambda b, i: update(b, i, "А")], None),
+    "удаление, изменение, удаление": ([lambda b, i: b.delete_client(i), lambda b, i: update(b, i, "А"),
+                                       lambda b, i: b.delete_client(i)], None),
+}
+
+
+def main() -> int:
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(os.path.join(tmp, "write_buffer.db"))
+        client_ids = {}
+        for name in SCENARIOS:
+            client = Client("Имя", "Фамилия", "user@mail.ru", "+79123456789", "Москва")
+            db.add_client(client)
+            client_ids[name] = client.client_id
+
+        # большая задержка - все операции попадают в один пакет и склеиваются
+        buffer = WriteBehindBuffer(max_delay=60.0)
+        futures = {name: [operation(buffer, client_ids[name]) for operation in operations]
+                   for name, (operations, _) in SCENARIOS.items()}
+        buffer.flush()
+        buffer.close()
+
+        for name, (_, expected) in SCENARIOS.items():
+            errors = [future.exception() for future in futures[name] if future.exception() is not None]
+            if errors:
+                failures.append(f"{name}: Future завершился с ошибкой {errors[0]!r}")
+            client = db.get_client_by_id(client_ids[name])
+            found = client.address if client is not None else None
+            if found != expected:
+                failures.append(f"{name}: адрес {found!r}, ожидалось {expected!r}")
+        db.close_pool()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{'FAIL' if failures else 'ok  '} склеивание операций буфера записи: расхождений {len(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
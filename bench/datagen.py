@@ -0,0 +1,173 @@
+"""
+Воспроизводимый генератор синтетических данных магазина.
+
+Перекос как в реальных магазинах:
+- популярность товаров - по Ципфу (PRODUCT_ZIPF_S): немногие товары есть почти в каждом заказе;
+- клиенты - тоже по Ципфу (CLIENT_ZIPF_S): постоянные покупатели делают большую долю заказов;
+- номера популярных товаров и клиентов перемешаны, а не идут подряд с 1;
+- число позиций в заказе - 1 + Пуассон, повторный товар в заказе увеличивает quantity.
+
+Одинаковые (n_lines, seed) дают одинаковые данные: все случайные величины берутся
+из numpy.random.Generator(PCG64(seed)) методом random(), поток которого стабилен.
+Строки пишутся в БД кусками по BATCH_ORDERS заказов, память не растёт с объёмом
+(10 млн строк заказов - несколько минут). Нужен numpy.
+
+Запуск из корня проекта (только сгенерировать БД):
+    python bench/datagen.py путь.db [кол-во строк заказов] [seed]
+"""
+
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+GENERATOR_VERSION = 1  # увеличивается при любом изменении распределений - результаты разных версий несравнимы
+PRODUCT_ZIPF_S = 1.1
+CLIENT_ZIPF_S = 0.7
+LINES_PER_ORDER = 3.0  # среднее число позиций до слияния повторов
+ORDERS_PER_CLIENT = 8
+LINES_PER_PRODUCT = 200
+MIN_PRODUCTS, MAX_PRODUCTS = 100, 50_000
+START_DATE = "2023-01-01T00:00:00"
+DAYS = 730
+BATCH_ORDERS = 200_000
+STATUSES = ("Создан!", "Оплачен", "Доставлен", "Отменён")
+STATUS_WEIGHTS = (0.2, 0.2, 0.55, 0.05)
+
+
+def plan(n_lines: int) -> Dict[str, int]:
+    """Размеры таблиц для заданного числа строк заказов."""
+    n_orders = max(1, int(n_lines / LINES_PER_ORDER))
+    return {
+        "order_lines": n_lines,
+        "orders": n_orders,
+        "clients": max(10, n_orders // ORDERS_PER_CLIENT),
+        "products": max(MIN_PRODUCTS, min(MAX_PRODUCTS, n_lines // LINES_PER_PRODUCT)),
+    }
+
+
+def _zipf_sampler(rng, n: int, s: float):
+    """Выборка номеров 0..n-1 с вероятностью ~ 1/rank^s; ранги случайно переставлены."""
+    import numpy as np
+
+    cumulative = np.cumsum(1.0 / np.arange(1, n + 1, dtype=np.float64) ** s)
+    ranked = np.argsort(rng.random(n))  # перестановка: какой номер имеет ранг 1, 2, ...
+
+    def sample(size: int):
+        ranks = np.searchsorted(cumulative, rng.random(size) * cumulative[-1], side='right')
+        return ranked[np.minimum(ranks, n - 1)]
+
+    return sample
+
+
+def _poisson(rng, lam: float, size: int):
+    """Пуассон через обратную функцию распределения от rng.random (поток стабилен между версиями numpy)."""
+    import numpy as np
+
+    k = np.arange(0, 30)
+    log_pmf = k * np.log(lam) - lam - np.cumsum(np.log(np.maximum(k, 1)))
+    cumulative = np.cumsum(np.exp(log_pmf))
+    return np.searchsorted(cumulative, rng.random(size) * cumulative[-1], side='right')
+
+
+def _timestamps(rng, size: int, start: str, days: int):
+    """ISO-строки дат, равномерно за days дней от start."""
+    import numpy as np
+
+    seconds = (rng.random(size) * days * 86400).astype(np.int64)
+    return (np.datetime64(start) + seconds.astype('timedelta64[s]')).astype(str).tolist()
+
+
+def generate(n_lines: int, seed: int = 42, progress: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+    """
+    Заполняет текущую БД (db.connection()) синтетическими данными.
+
+    Ожидает пустую БД со схемой (db.init_db). Триггеры счётчиков и сводных таблиц
+    на время заливки удаляются, в конце пересчитываются, индексы статистики
+    обновляются ANALYZE. progress(table, rows) вызывается после каждого куска.
+    Возвращает фактическое число строк по таблицам (повторы товара в заказе
+    сливаются, поэтому order_products немного меньше n_lines).
+    """
+    import numpy as np
+
+    rng = np.random.Generator(np.random.PCG64(seed))
+    sizes = plan(n_lines)
+    n_clients, n_products, n_orders = sizes["clients"], sizes["products"], sizes["orders"]
+
+    # цены - логнормальные от ~50 до ~50 000, у популярных товаров не обязательно низкие
+    prices = np.round(np.exp(rng.random(n_products) * 7.0 + 4.0), 2)
+    pick_product = _zipf_sampler(rng, n_products, PRODUCT_ZIPF_S)
+    pick_client = _zipf_sampler(rng, n_clients, CLIENT_ZIPF_S)
+    status_cumulative = np.cumsum(STATUS_WEIGHTS)
+
+    counts = {"clients": n_clients, "products": n_products, "orders": 0, "order_products": 0}
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        db.drop_count_triggers(cursor)
+        db.drop_aggregate_triggers(cursor)
+
+        cursor.executemany("INSERT INTO products (product_id, name, description, price) VALUES (?, ?, ?, ?)",
+                           ((i + 1, f"Товар {i + 1}", f"Описание товара {i + 1}", price)
+                            for i, price in enumerate(prices.tolist())))
+        if progress:
+            progress("products", n_products)
+        registered = _timestamps(rng, n_clients, "2022-01-01T00:00:00", 365)
+        cursor.executemany("""
+            INSERT INTO clients (client_id, first_name, last_name, email, phone, address, registration_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, ((i, f"Имя{i % 997}", f"Фамилия{i}", f"user{i}@mail.ru", f"+7912{i % 10_000_000:07d}",
+               f"Город {i % 101}, улица {i % 1009}", registered[i - 1]) for i in range(1, n_clients + 1)))
+        if progress:
+            progress("clients", n_clients)
+
+        for start in range(0, n_orders, BATCH_ORDERS):
+            size = min(BATCH_ORDERS, n_orders - start)
+            order_ids = np.arange(start + 1, start + size + 1, dtype=np.int64)
+            clients = pick_client(size) + 1
+            dates = _timestamps(rng, size, START_DATE, DAYS)
+            statuses = np.searchsorted(status_cumulative, rng.random(size) * status_cumulative[-1], side='right')
+            cursor.executemany("INSERT INTO orders (order_id, client_id, order_date, status) VALUES (?, ?, ?, ?)",
+                               zip(order_ids.tolist(), clients.tolist(), dates,
+                                   (STATUSES[min(s, len(STATUSES) - 1)] for s in statuses.tolist())))
+
+            lines = _poisson(rng, LINES_PER_ORDER - 1, size) + 1
+            line_orders = np.repeat(order_ids, lines)
+            line_products = pick_product(len(line_orders)) + 1
+            # повтор товара в заказе - это quantity, а не отдельная строка (PRIMARY KEY (order_id, product_id))
+            keys, quantity = np.unique(line_orders * (n_products + 1) + line_products, return_counts=True)
+            line_orders, line_products = keys // (n_products + 1), keys % (n_products + 1)
+            cursor.executemany("INSERT INTO order_products (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+                               zip(line_orders.tolist(), line_products.tolist(), quantity.tolist(),
+                                   prices[line_products - 1].tolist()))
+            counts["orders"] += size
+            counts["order_products"] += len(keys)
+            if progress:
+                progress("order_products", counts["order_products"])
+
+        db.create_count_triggers(cursor)
+        db.refresh_row_counts(cursor)
+        db.create_aggregate_triggers(cursor)
+        db.refresh_aggregates(cursor)
+        conn.commit()
+        cursor.execute("ANALYZE")
+    db.read_cache.clear()
+    return counts
+
+
+def main(path: str, n_lines: int = 1_000_000, seed: int = 42):
+    if os.path.exists(path):
+        raise SystemExit(f"{path} уже существует")
+    db.init_db(path)
+    start = time.perf_counter()
+    counts = generate(n_lines, seed, progress=lambda table, rows: print(f"\r{table}: {rows}", end="", flush=True))
+    print(f"\r{counts} за {time.perf_counter() - start:.1f} с")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], *(int(arg) for arg in sys.argv[2:4]))
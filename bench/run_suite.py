@@ -0,0 +1,397 @@
+"""
+Набор сценариев производительности для сравнения между коммитами.
+
+Генерирует БД (bench/datagen.py) заданного размера, замеряет сценарии для
+публичных функций db.py, импорта/экспорта CSV и агрегатов analysis.py и пишет
+результаты в JSON. С --compare сравнивает с прошлым файлом результатов и
+завершается с кодом 1, если медиана какого-то сценария выросла больше порога.
+
+Каждый сценарий выполняется repeat раз; в результат идут все замеры, минимум,
+медиана и медиана на одну операцию (ops - сколько вызовов делает сценарий).
+Сценарии материализации всех объектов (get_all_orders и т.п.) пропускаются
+выше своего max_lines - при 10 млн строк они занимают минуты и гигабайты.
+Кэш чтения выключен, кроме сценариев с пометкой "(кэш)".
+
+Нужны numpy, pandas и scipy. Запуск из корня проекта:
+    python bench/run_suite.py [--lines 1000000] [--seed 42] [--repeat 3] [--only подстрока]
+                              [--db готовая.db] [--output файл.json]
+                              [--compare прошлый.json] [--threshold 0.25]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import analysis
+import datagen
+import db
+from models import Client, Order, Product
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+LOOKUPS = 200  # вызовов в сценариях точечного доступа
+SEARCHES = 50
+PAGE = 100
+ORDERS_BATCH = 10_000
+MIN_REGRESSION_SECONDS = 0.005  # меньшие абсолютные изменения - шум таймера
+
+
+class Scenario:
+    """
+    name = имя сценария (ключ в результатах) str
+    func = замеряемая функция: func(state) Callable
+    ops = сколько операций выполняет один вызов func int
+    setup = подготовка перед каждым замером, возвращает state Callable
+    teardown = уборка после каждого замера: teardown(state) Callable
+    max_lines = пропускать, если строк заказов больше int
+    """
+
+    __slots__ = ("name", "group", "func", "ops", "setup", "teardown", "max_lines")
+
+    def __init__(self, name: str, group: str, func: Callable, ops: int = 1, setup: Optional[Callable] = None,
+                 teardown: Optional[Callable] = None, max_lines: Optional[int] = None):
+        self.name = name
+        self.group = group
+        self.func = func
+        self.ops = ops
+        self.setup = setup
+        self.teardown = teardown
+        self.max_lines = max_lines
+
+
+def git_revision() -> Dict[str, object]:
+    root = os.path.dirname(BENCH_DIR)
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def table_counts() -> Dict[str, int]:
+    return {table: db.count_rows(table) for table in db.TABLES}
+
+
+def build_scenarios(counts: Dict[str, int], workdir: str, main_db: str) -> List[Scenario]:
+    """Сценарии для текущей БД; ID для точечных запросов выбираются детерминированно."""
+    rnd = random.Random(1)
+    n_clients, n_products, n_orders = counts["clients"], counts["products"], counts["orders"]
+    client_ids = [rnd.randint(1, n_clients) for _ in range(LOOKUPS)]
+    product_ids = [rnd.randint(1, n_products) for _ in range(LOOKUPS)]
+    order_ids = [rnd.randint(1, n_orders) for _ in range(LOOKUPS)]
+    order_id_batch = [rnd.randint(1, n_orders) for _ in range(db.IN_CHUNK_SIZE)]
+    surnames = [f"Фамилия{rnd.randint(1, n_clients)}" for _ in range(SEARCHES)]
+    words = [f"{rnd.randint(1, 999)}" for _ in range(SEARCHES)]
+    export_base = os.path.join(workdir, "export")
+    import_db = os.path.join(workdir, "import.db")
+    new_clients = [Client("Имя", f"Новая{i}", f"new{i}@mail.ru", "+79123456789", "Москва") for i in range(LOOKUPS)]
+    some_products = [Product.from_row((i, "", "", 1.0)) for i in range(1, min(n_products, 50) + 1)]
+
+    def each(func, items):
+        return lambda state: [func(item) for item in items]
+
+    def with_cache(state=None):
+        db.configure_cache()
+        for client_id in client_ids:
+            db.get_client_by_id(client_id)
+
+    def without_cache(state=None):
+        db.configure_cache(max_bytes=0)
+
+    def scratch_clients():
+        for client in new_clients:
+            client.client_id = None
+        with db.connection():
+            for client in new_clients:
+                db.add_client(client)
+        return [client.client_id for client in new_clients]
+
+    def scratch_products():
+        products = [Product(f"Временный{i}", "", 10.0) for i in range(LOOKUPS)]
+        with db.connection():
+            for product in products:
+                db.add_product(product)
+        return [product.product_id for product in products]
+
+    def make_orders(n):
+        def setup():
+            order_rnd = random.Random(n)
+            orders = []
+            for _ in range(n):
+                order = Order(Client.from_row((order_rnd.randint(1, n_clients), "", "", "", "", "",
+                                               "2024-01-01T00:00:00")), [])
+                for product in order_rnd.sample(some_products, 3):
+                    order.add_product(product, order_rnd.randint(1, 3))
+                orders.append(order)
+            return orders
+        return setup
+
+    def scratch_orders(n):
+        orders = make_orders(n)
+        return lambda: db.add_orders(orders())
+
+    def scratch_clients_with_orders():
+        ids = scratch_clients()
+        db.add_orders([Order(Client.from_row((client_id, "", "", "", "", "", "2024-01-01T00:00:00")),
+                             some_products[:3]) for client_id in ids for _ in range(3)])
+        return ids
+
+    def scratch_products_in_orders():
+        ids = scratch_products()
+        db.add_orders([Order(Client.from_row((client_ids[i], "", "", "", "", "", "2024-01-01T00:00:00")),
+                             [Product.from_row((product_id, "", "", 10.0))])
+                       for i, product_id in enumerate(ids) for _ in range(3)])
+        return ids
+
+    def ensure_export():
+        if not os.path.exists(f"{export_base}_clients.csv"):
+            db.export_to_csv(export_base)
+
+    def switch_to_import_db():
+        ensure_export()
+        db.configure_pool(database=import_db)
+        db.configure_cache(max_bytes=0)
+        db.create_tables()
+
+    def back_to_main_db(state=None):
+        db.configure_pool(database=main_db)
+        db.configure_cache(max_bytes=0)
+        os.remove(import_db)
+
+    def rebuild_search_index(state):
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            db.drop_search_index(cursor)
+            db.create_search_index(cursor)
+
+    return [
+        # клиенты
+        Scenario("count_rows", "clients", each(db.count_rows, ["orders"] * LOOKUPS), LOOKUPS),
+        Scenario("count_clients", "clients", lambda state: db.count_clients()),
+        Scenario("get_client_by_id", "clients", each(db.get_client_by_id, client_ids), LOOKUPS),
+        Scenario("get_client_by_id (кэш)", "clients", each(db.get_client_by_id, client_ids), LOOKUPS,
+                 setup=with_cache, teardown=without_cache),
+        Scenario("find_clients_by_email", "clients",
+                 each(db.find_clients_by_email, [f"user{i}@mail.ru" for i in client_ids]), LOOKUPS),
+        Scenario("search_clients", "clients", each(db.search_clients, surnames), SEARCHES),
+        Scenario("search_clients_ranked", "clients", each(db.search_clients_ranked, surnames), SEARCHES),
+        Scenario("search_clients_ranked (короткий запрос)", "clients",
+                 each(db.search_clients_ranked, words), SEARCHES),
+        Scenario("get_clients_page", "clients",
+                 each(lambda offset: db.get_clients_page(offset, PAGE), [n_clients // 2] * 10), 10),
+        Scenario("query_clients keyset", "clients",
+                 each(lambda client_id: db.query_clients(page_size=PAGE).page(after=(client_id,)), client_ids[:50]), 50),
+        Scenario("query_clients по фамилии", "clients",
+                 each(lambda _: db.query_clients(order_by="last_name", page_size=PAGE).page(), range(10)), 10),
+        Scenario("get_clients_table", "clients", lambda state: db.get_clients_table()),
+        Scenario("get_all_clients", "clients", lambda state: db.get_all_clients(), max_lines=5_000_000),
+        Scenario("iter_clients", "clients", lambda state: sum(1 for _ in db.iter_clients()), max_lines=5_000_000),
+        Scenario("add_client", "clients", lambda state: [db.add_client(Client(
+            "Имя", f"Добавленный{i}", f"added{i}@mail.ru", "+79123456789", "Москва")) for i in range(LOOKUPS)],
+            LOOKUPS),
+        Scenario("update_client", "clients", each(lambda client_id: db.update_client(
+            client_id, "Имя", f"Фамилия{client_id}", f"user{client_id}@mail.ru", "+79123456789", "Москва"),
+            client_ids), LOOKUPS),
+        Scenario("delete_client", "clients", lambda ids: [db.delete_client(client_id) for client_id in ids],
+                 LOOKUPS, setup=scratch_clients),
+        Scenario("update_clients", "clients", lambda state: db.update_clients(client_ids, address="Москва"), LOOKUPS),
+        Scenario("delete_clients", "clients", lambda ids: db.delete_clients(ids), LOOKUPS, setup=scratch_clients),
+        Scenario("delete_clients cascade", "clients", lambda ids: db.delete_clients(ids, cascade=True), LOOKUPS,
+                 setup=scratch_clients_with_orders),
+        # товары
+        Scenario("count_products", "products", lambda state: db.count_products()),
+        Scenario("get_all_products", "products", lambda state: db.get_all_products()),
+        Scenario("get_products_table", "products", lambda state: db.get_products_table()),
+        Scenario("get_products_page", "products",
+                 each(lambda offset: db.get_products_page(offset, PAGE), [n_products // 2] * 10), 10),
+        Scenario("query_products по цене", "products",
+                 each(lambda price: db.query_products(order_by="price", page_size=PAGE, price__lt=price).page(),
+                      [100.0, 1000.0, 10000.0]), 3),
+        Scenario("iter_products", "products", lambda state: sum(1 for _ in db.iter_products())),
+        Scenario("get_products_by_order_id", "products", each(db.get_products_by_order_id, order_ids), LOOKUPS),
+        Scenario("add_product", "products", lambda state: [db.add_product(Product(f"Новый{i}", "", 10.0))
+                                                           for i in range(LOOKUPS)], LOOKUPS),
+        Scenario("update_product", "products", each(lambda product_id: db.update_product(
+            product_id, f"Товар {product_id}", f"Описание товара {product_id}", 100.0), product_ids), LOOKUPS),
+        Scenario("delete_product", "products", lambda ids: [db.delete_product(product_id) for product_id in ids],
+                 LOOKUPS, setup=scratch_products),
+        Scenario("update_products", "products", lambda state: db.update_products(product_ids, price=100.0), LOOKUPS),
+        Scenario("delete_products", "products", lambda ids: db.delete_products(ids), LOOKUPS, setup=scratch_products),
+        Scenario("delete_products cascade", "products", lambda ids: db.delete_products(ids, cascade=True), LOOKUPS,
+                 setup=scratch_products_in_orders),
+        # заказы
+        Scenario("get_orders_by_client_id", "orders", each(db.get_orders_by_client_id, client_ids), LOOKUPS),
+        Scenario("get_orders_by_ids", "orders", each(db.get_orders_by_ids, [order_id_batch] * 10), 10),
+        Scenario("query_orders по дате", "orders", each(
+            lambda order_id: db.query_orders(order_by="order_date", page_size=PAGE).page(
+                after=("2024-01-01T00:00:00", order_id)), order_ids[:20]), 20),
+        Scenario("sorted_order_ids date top-10", "orders",
+                 each(lambda _: db.sorted_order_ids("date", True, 10), range(20)), 20),
+        Scenario("sorted_order_ids amount top-10", "orders", lambda state: db.sorted_order_ids("amount", True, 10)),
+        Scenario("get_orders_sorted amount top-10", "orders",
+                 lambda state: db.get_orders_sorted("amount", True, 10)),
+        Scenario("get_all_orders", "orders", lambda state: db.get_all_orders(), max_lines=1_000_000),
+        Scenario("iter_orders", "orders", lambda state: sum(1 for _ in db.iter_orders()), max_lines=1_000_000),
+        Scenario("add_order", "orders", lambda orders: [db.add_order(order) for order in orders], 100,
+                 setup=make_orders(100)),
+        Scenario(f"add_orders x{ORDERS_BATCH}", "orders", lambda orders: db.add_orders(orders), ORDERS_BATCH,
+                 setup=make_orders(ORDERS_BATCH)),
+        Scenario("add_orders x100", "orders", lambda orders: db.add_orders(orders), 100, setup=make_orders(100)),
+        Scenario(f"delete_orders x{ORDERS_BATCH}", "orders", lambda ids: db.delete_orders(ids), ORDERS_BATCH,
+                 setup=scratch_orders(ORDERS_BATCH)),
+        Scenario("delete_orders x100", "orders", lambda ids: db.delete_orders(ids), 100, setup=scratch_orders(100)),
+        # обслуживание
+        Scenario("check_aggregates", "maintenance", lambda state: db.check_aggregates()),
+        Scenario("rebuild_aggregates", "maintenance", lambda state: db.rebuild_aggregates()),
+        Scenario("create_search_index", "maintenance", rebuild_search_index),
+        # импорт и экспорт
+        Scenario("export_to_csv", "csv", lambda state: db.export_to_csv(export_base)),
+        Scenario("export_to_csv gzip", "csv", lambda state: db.export_to_csv(export_base + "_gz", compression="gzip")),
+        *([Scenario("export_snapshot", "csv", lambda state: db.export_snapshot(export_base + "_snapshot"))]
+          if importlib.util.find_spec("pyarrow") else []),
+        Scenario("import_from_csv", "csv", lambda state: db.import_from_csv(export_base), setup=switch_to_import_db,
+                 teardown=back_to_main_db),
+        # аналитика
+        Scenario("top_customers_by_orders", "analysis", lambda state: analysis.top_customers_by_orders(5)),
+        Scenario("order_counts D", "analysis", lambda state: analysis.order_counts('D')),
+        Scenario("order_counts MS", "analysis", lambda state: analysis.order_counts('MS')),
+        Scenario("revenue_per_product", "analysis", lambda state: analysis.revenue_per_product()),
+        Scenario("basket_size_distribution", "analysis", lambda state: analysis.basket_size_distribution()),
+        Scenario("purchase_incidence", "analysis", lambda state: analysis.purchase_incidence()),
+        Scenario("co_purchase_edges top_k=10", "analysis",
+                 lambda state: analysis.co_purchase_edges(top_k=10, max_product_share=0.01), max_lines=3_000_000),
+    ]
+
+
+def run_scenario(scenario: Scenario, repeat: int) -> Dict[str, object]:
+    runs = []
+    for _ in range(repeat):
+        state = scenario.setup() if scenario.setup else None
+        try:
+            start = time.perf_counter()
+            scenario.func(state)
+            runs.append(time.perf_counter() - start)
+        finally:
+            if scenario.teardown:
+                scenario.teardown(state)
+    median = statistics.median(runs)
+    return {
+        "group": scenario.group,
+        "ops": scenario.ops,
+        "runs": runs,
+        "min": min(runs),
+        "median": median,
+        "per_op_ms": median / scenario.ops * 1000,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Сценарии, медиана которых выросла больше threshold (доля) и больше MIN_REGRESSION_SECONDS."""
+    for key in ("generator_version", "counts"):
+        if results["meta"].get(key) != baseline["meta"].get(key):
+            print(f"Внимание: {key} отличается от базового прогона - сравнение приблизительное")
+    regressions = []
+    print(f"\n{'сценарий':<42} {'было, с':>10} {'стало, с':>10} {'изменение':>10}")
+    for name, current in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base or "median" not in base or "median" not in current:
+            continue
+        change = current["median"] / base["median"] - 1 if base["median"] else 0.0
+        regressed = change > threshold and current["median"] - base["median"] > MIN_REGRESSION_SECONDS
+        print(f"{name:<42} {base['median']:10.4f} {current['median']:10.4f} {change:+10.1%}"
+              f"{'  РЕГРЕССИЯ' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Набор бенчмарков БД магазина")
+    parser.add_argument("--lines", type=int, default=1_000_000, help="строк заказов в синтетической БД")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="запускать только сценарии, в имени которых есть подстрока")
+    parser.add_argument("--db", help="готовая БД (например, из bench/datagen.py) - копируется, исходник не меняется")
+    parser.add_argument("--output", help="файл результатов (по умолчанию bench/results/suite-<строк>-<коммит>.json)")
+    parser.add_argument("--compare", help="файл результатов прошлого прогона")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимый рост медианы (доля)")
+    args = parser.parse_args(argv)
+
+    revision = git_revision()
+    with tempfile.TemporaryDirectory() as workdir:
+        main_db = os.path.join(workdir, "suite.db")
+        start = time.perf_counter()
+        if args.db:
+            shutil.copy(args.db, main_db)
+            db.init_db(main_db)
+            generated = None
+        else:
+            db.init_db(main_db)
+            generated = datagen.generate(args.lines, args.seed)
+        db.configure_cache(max_bytes=0)
+        counts = table_counts()
+        print(f"Данные {counts} готовы за {time.perf_counter() - start:.1f} с")
+
+        results = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                **revision,
+                "generator_version": datagen.GENERATOR_VERSION if generated else None,
+                "lines": args.lines if generated else None,
+                "seed": args.seed if generated else None,
+                "source_db": args.db,
+                "counts": counts,
+                "repeat": args.repeat,
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+            },
+            "scenarios": {},
+        }
+        for scenario in build_scenarios(counts, workdir, main_db):
+            if args.only and args.only not in scenario.name:
+                continue
+            if scenario.max_lines is not None and counts["order_products"] > scenario.max_lines:
+                results["scenarios"][scenario.name] = {"group": scenario.group,
+                                                       "skipped": f"больше {scenario.max_lines} строк заказов"}
+                print(f"  {scenario.name:<42} пропущен")
+                continue
+            result = results["scenarios"][scenario.name] = run_scenario(scenario, args.repeat)
+            print(f"  {scenario.name:<42} {result['median']:9.4f} с  {result['per_op_ms']:10.3f} мс/оп")
+        db.close_pool()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"suite-{counts['order_products']}-{revision['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Результаты: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"Регрессии ({len(regressions)}): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
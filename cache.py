@@ -0,0 +1,138 @@
+"""
+Кэш результатов чтения из БД в памяти процесса.
+
+LRUCache хранит значения по ключу с ограничением по памяти (оценка через
+sys.getsizeof) и сроком жизни записи. Точная инвалидация - по ключу или по
+тегу: запись помечается тегами (например ("product", 7)), и изменение товара
+сбрасывает все записи с этим тегом.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set
+
+
+def estimate_size(value: Any) -> int:
+    """Приблизительный размер значения в байтах: кортежи/списки строк БД и скаляры."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш с TTL и ограничением по памяти.
+
+    max_bytes = сколько байт (по estimate_size) могут занимать значения; 0 - кэш выключен int
+    ttl = сколько секунд запись считается актуальной; None - без ограничения float
+    """
+
+    def __init__(self, max_bytes: int = 32 * 2 ** 20, ttl: Optional[float] = 300.0,
+                 sizeof: Callable[[Any], int] = estimate_size):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # ключ -> (значение, размер, срок, теги)
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._version = 0  # растёт при каждой инвалидации
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    tags: Optional[Callable[[Any], Iterable[Hashable]]] = None) -> Any:
+        """
+        Значение из кэша или результат loader() (который тогда кладётся в кэш).
+        tags(value) - теги записи для invalidate_tag. None (строки нет) не кэшируется,
+        поэтому вставка новых строк кэш не сбрасывает. Если за время загрузки что-то
+        было инвалидировано, результат тоже не кэшируется: он мог быть прочитан до изменения.
+        """
+        if self.max_bytes <= 0:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] is None or entry[2] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            version = self._version
+
+        value = loader()
+        if value is None:
+            return value
+        entry_tags = frozenset(tags(value)) if tags is not None else frozenset()
+        size = self.sizeof(value)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            if version != self._version or size > self.max_bytes:
+                return value
+            self._remove(key)
+            self._entries[key] = (value, size, expires, entry_tags)
+            self.bytes += size
+            for tag in entry_tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry[1]
+        for tag in entry[3]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *keys: Hashable):
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def invalidate_tag(self, *tags: Hashable):
+        with self._lock:
+            self._version += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._tags.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -7,17 +7,268 @@ https://proproprogs.ru/modules/metody-fetchall-fetchmany-fetchone-iterdump
 
 import sqlite3
 import csv
-from datetime import datetime
-from typing import List, Dict, Union
-from models import Product, Client, Order
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Union, Iterator, Optional, Callable, Tuple
+from cache import LRUCache
+from models import Product, Client, Order, ClientTable, ProductTable
+from profiler import ProfiledConnection, profiled, profiler
+from utils import EMAIL_RE, PHONE_RE, sort_spec, validate_rows
 
 database_name = "eshop.db"
 
+TABLES = ['clients', 'products', 'orders', 'order_products']  # порядок важен для внешних ключей
+
+CLIENT_COLUMNS = "client_id, first_name, last_name, email, phone, address, registration_date"
+PRODUCT_COLUMNS = "product_id, name, description, price"
+
+# ограничение SQLite на число параметров в одном запросе - IN (...) режем на куски
+IN_CHUNK_SIZE = 500
+
+# PRAGMA, которые выполняются один раз при открытии каждого соединения пула
+CONNECTION_PRAGMAS = (
+    "PRAGMA cache_size = -16000",  # ~16 МБ страничного кэша на соединение
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+class ConnectionPool:
+    """
+    Пул долгоживущих соединений с SQLite.
+
+    Соединение открывается один раз, настраивается PRAGMA и затем переиспользуется,
+    поэтому страничный кэш остаётся "тёплым", а подготовленные выражения
+    берутся из кэша sqlite3 (cached_statements).
+
+    Внутри одного потока вложенные вызовы connection() получают одно и то же
+    соединение, фиксация транзакции выполняется внешним блоком.
+
+    database = путь к файлу БД str
+    size = максимальное число одновременно открытых соединений int
+    cached_statements = размер кэша подготовленных выражений на соединение int
+    timeout = сколько секунд ждать свободное соединение float
+    """
+
+    def __init__(self, database: str, size: int = 4, cached_statements: int = 256, timeout: float = 30.0):
+        if size < 1:
+            raise ValueError("Размер пула должен быть не меньше 1")
+        self.database = database
+        self.size = size
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.opened = 0  # сколько соединений было открыто за время жизни пула
+
+    def _open(self) -> sqlite3.Connection:
+        # профилирующий класс - только пока профилировщик включён, иначе без накладных расходов
+        conn = sqlite3.connect(self.database, cached_statements=self.cached_statements,
+                               check_same_thread=False, timeout=self.timeout,
+                               factory=ProfiledConnection if profiler.enabled else sqlite3.Connection)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        self.opened += 1
+        if profiler.enabled:
+            profiler.record_connection()
+        return conn
+
+    def _stale(self, conn: sqlite3.Connection) -> bool:
+        """Соединение открыто до включения/выключения профилирования."""
+        return isinstance(conn, ProfiledConnection) != profiler.enabled
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+        conn.close()
+
+    def _acquire(self) -> sqlite3.Connection:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if not self._stale(conn):
+                return conn
+            self._discard(conn)
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Нет свободных соединений с {self.database} (size={self.size})")
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Выдаёт соединение; commit при успешном выходе, rollback при исключении."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            # вложенный вызов в том же потоке - транзакцией управляет внешний блок
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.callbacks = callbacks = []
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._local.callbacks = None
+            if self._stale(conn):
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+            for callback in callbacks:
+                callback()
+
+    def after_transaction(self, callback: Callable[[], None]):
+        """
+        Вызывает callback(), когда внешний блок connection() текущего потока зафиксирует
+        или откатит транзакцию; вне блока connection() - сразу.
+        Нужен для действий, которые другие потоки должны увидеть только после COMMIT
+        (сброс кэша чтения): вложенный блок выходит раньше, чем транзакция фиксируется.
+        """
+        callbacks = getattr(self._local, "callbacks", None)
+        if callbacks is None:
+            callback()
+        else:
+            callbacks.append(callback)
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait()
+                except queue.Empty:
+                    break
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+pool_size = 4
+
+# Кэш чтения для get_client_by_id, get_products_by_order_id и get_all_products.
+# Хранит строки БД (кортежи), объекты моделей создаются на каждый вызов заново.
+# Записи сбрасываются функциями изменения из этого модуля (ещё раз - после COMMIT внешнего
+# блока connection(), см. _invalidate_cache); изменения в обход db.py
+# (другой процесс, ручной SQL) видны не позже чем через ttl секунд.
+read_cache = LRUCache(max_bytes=32 * 2 ** 20, ttl=300.0)
+
+
+def configure_cache(max_bytes: int = 32 * 2 ** 20, ttl: Optional[float] = 300.0):
+    """Задаёт ограничение памяти (0 - выключить кэш) и срок жизни записей кэша чтения."""
+    read_cache.clear()
+    read_cache.max_bytes = max_bytes
+    read_cache.ttl = ttl
+
+
+def cache_stats() -> Dict[str, int]:
+    """Счётчики кэша чтения: попадания, промахи, вытеснения, объём."""
+    return read_cache.stats()
+
+
+def get_pool() -> ConnectionPool:
+    """Возвращает пул для текущего database_name (пересоздаётся, если имя БД сменилось)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.database != database_name:
+            if _pool is not None:
+                _pool.close()
+                read_cache.clear()
+            _pool = ConnectionPool(database_name, size=pool_size)
+        return _pool
+
+
+def configure_pool(size: int = 4, database: Optional[str] = None):
+    """Задаёт размер пула и (необязательно) файл БД; старые соединения закрываются."""
+    global _pool, pool_size, database_name
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        pool_size = size
+        if database is not None:
+            database_name = database
+        read_cache.clear()
+
+
+def close_pool():
+    """Закрывает все соединения (например, при выходе из приложения)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        read_cache.clear()
+
+
+def connection():
+    """Контекстный менеджер соединения из общего пула: with connection() as conn: ..."""
+    return get_pool().connection()
+
+
+def after_transaction(callback: Callable[[], None]):
+    """callback() после фиксации/отката транзакции текущего потока (см. ConnectionPool.after_transaction)."""
+    get_pool().after_transaction(callback)
+
+
+def _invalidate_cache(keys=(), tags=()):
+    """
+    Сбрасывает ключи и теги кэша чтения сразу (чтобы транзакция видела свои изменения)
+    и ещё раз после её фиксации: иначе другой поток мог бы между сбросом и COMMIT
+    прочитать и закэшировать старую строку.
+    """
+    keys, tags = list(keys), list(tags)
+
+    def invalidate():
+        read_cache.invalidate(*keys)
+        read_cache.invalidate_tag(*tags)
+
+    invalidate()
+    after_transaction(invalidate)
+
+
+def enable_profiling(slow_threshold: Optional[float] = None):
+    """
+    Включает профилировщик (см. profiler.py). Свободные соединения пула переоткрываются
+    с ProfiledConnection, занятые - после возврата в пул.
+    slow_threshold = порог журнала медленных вызовов, секунды float
+    """
+    if slow_threshold is not None:
+        profiler.slow_threshold = slow_threshold
+    profiler.enable()
+
+
+def disable_profiling():
+    """Выключает профилировщик; соединения снова открываются без замеров. Накопленное сохраняется."""
+    profiler.disable()
 
-def create_tables():
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
 
+def _migration_1_base_schema(cursor: sqlite3.Cursor):
+    """Исходные таблицы и полнотекстовый индекс клиентов."""
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS clients (
             client_id INTEGER PRIMARY KEY,
@@ -59,271 +310,1840 @@ def create_tables():
         )
     """)
 
-    conn.commit()
-    conn.close()
+    create_search_index(cursor)
+
+
+def _migration_2_indexes(cursor: sqlite3.Cursor):
+    """Вторичные (покрывающие) индексы для соединений, поиска и сортировки."""
+    # заказы клиента: JOIN orders -> clients и выборка заказов по клиенту без обращения к таблице
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_client ON orders (client_id, order_date, status)")
+    # статистика по датам
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_date ON orders (order_date)")
+    # обратный поиск заказов по товару (первичный ключ order_products начинается с order_id)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_products_product ON order_products (product_id, order_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clients_email ON clients (email)")
+    # сортировка ORDER BY last_name, first_name
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clients_name ON clients (last_name, first_name)")
 
-def add_client(client: Client):
-    """ добавляем клиента в БД"""
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
 
+def _migration_3_row_counts(cursor: sqlite3.Cursor):
+    """Счётчики строк таблиц, которые поддерживаются триггерами (вместо COUNT(*) по всей таблице)."""
     cursor.execute("""
-    INSERT INTO clients (first_name, last_name, email, phone, address, registration_date)
-    VALUES (?, ?, ?, ?, ?, ?)
-    """, (client.first_name, client.last_name, client.email, client.phone, client.address,
-          client.registration_date.isoformat()))
+        CREATE TABLE IF NOT EXISTS table_counts (
+            table_name TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    create_count_triggers(cursor)
+    refresh_row_counts(cursor)
 
-    client.client_id = cursor.lastrowid  # получаем айди клиента
-    conn.commit()
-    conn.close()
 
-def get_all_clients() -> List[Client]:
-    """список всех клиентов из БД"""
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
+def _migration_4_aggregates(cursor: sqlite3.Cursor):
+    """Сводные таблицы статистики заказов, которые поддерживаются триггерами."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS client_stats (
+            client_id INTEGER PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_order_counts (
+            day TEXT PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_sales (
+            product_id INTEGER PRIMARY KEY,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        )
+    """)
+    # топ-N клиентов читается с начала индекса, без сортировки всей таблицы
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_client_stats_orders ON client_stats (order_count DESC, client_id)")
+    # триггеры и заполнение - в миграции 5, им нужны колонки quantity и price
+
+
+def _migration_5_order_lines(cursor: sqlite3.Cursor):
+    """Количество и цена на момент покупки в строках заказов; выручка в сводных таблицах считается по ним."""
+    cursor.execute("ALTER TABLE order_products ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1 CHECK (quantity > 0)")
+    cursor.execute("ALTER TABLE order_products ADD COLUMN price REAL")
+    fill_purchase_prices(cursor)
+    cursor.execute("DROP TRIGGER IF EXISTS products_stats_au")  # выручка больше не зависит от текущей цены товара
+    drop_aggregate_triggers(cursor)
+    create_aggregate_triggers(cursor)
+    refresh_aggregates(cursor)
+
+
+def _migration_6_bulk_mode(cursor: sqlite3.Cursor):
+    """Триггеры счётчиков и сводных таблиц с условием на флаг bulk_mode (см. _bulk_mode)."""
+    drop_count_triggers(cursor)
+    drop_aggregate_triggers(cursor)
+    create_count_triggers(cursor)
+    create_aggregate_triggers(cursor)
+
+
+# Миграции схемы: номер версии = позиция в списке + 1, текущая версия хранится в PRAGMA user_version.
+# Новые изменения схемы добавляются только в конец списка.
+MIGRATIONS = [
+    _migration_1_base_schema,
+    _migration_2_indexes,
+    _migration_3_row_counts,
+    _migration_4_aggregates,
+    _migration_5_order_lines,
+    _migration_6_bulk_mode,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+# Условие триггеров счётчиков и сводных таблиц: пока в bulk_mode есть строка, они не срабатывают
+BULK_MODE_GUARD = "WHEN NOT EXISTS (SELECT 1 FROM bulk_mode)"
+
+
+def _create_bulk_mode_table(cursor: sqlite3.Cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS bulk_mode (active INTEGER PRIMARY KEY CHECK (active = 1))")
+
+
+@contextmanager
+def _bulk_mode(cursor: sqlite3.Cursor):
+    """
+    Выключает триггеры счётчиков строк и сводных таблиц до конца блока - для массовых
+    операций, которые сами применяют изменения одним набором запросов (add_orders, delete_*).
+
+    Флаг - строка в bulk_mode внутри текущей транзакции: другие соединения её не видят,
+    а схема не меняется (DROP/CREATE TRIGGER заставил бы все соединения пула заново
+    подготовить выражения). Блок выполняется в точке сохранения: при исключении
+    откатываются и флаг, и уже записанная часть пакета, так что счётчики не расходятся,
+    даже если вызывающий перехватит ошибку без отката всей транзакции.
+    """
+    cursor.execute("SAVEPOINT bulk_mode")
+    try:
+        entered = cursor.execute("INSERT OR IGNORE INTO bulk_mode (active) VALUES (1)").rowcount
+        yield
+    except BaseException:
+        if cursor.connection.in_transaction:  # после некоторых ошибок SQLite уже откатил транзакцию целиком
+            cursor.execute("ROLLBACK TO bulk_mode")
+            cursor.execute("RELEASE bulk_mode")
+        raise
+    if entered:
+        cursor.execute("DELETE FROM bulk_mode")
+    cursor.execute("RELEASE bulk_mode")
+
+
+def create_count_triggers(cursor: sqlite3.Cursor):
+    _create_bulk_mode_table(cursor)
+    for table in TABLES:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_count_ai AFTER INSERT ON {table} {BULK_MODE_GUARD} BEGIN
+                UPDATE table_counts SET row_count = row_count + 1 WHERE table_name = '{table}';
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_count_ad AFTER DELETE ON {table} {BULK_MODE_GUARD} BEGIN
+                UPDATE table_counts SET row_count = row_count - 1 WHERE table_name = '{table}';
+            END
+        """)
+
+
+def drop_count_triggers(cursor: sqlite3.Cursor):
+    for table in TABLES:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_count_ai")
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_count_ad")
+
+
+def refresh_row_counts(cursor: sqlite3.Cursor):
+    """Пересчитывает счётчики строк полным подсчётом."""
+    for table in TABLES:
+        cursor.execute(f"INSERT OR REPLACE INTO table_counts (table_name, row_count) "
+                       f"SELECT '{table}', COUNT(*) FROM {table}")
+
+
+@profiled
+def count_rows(table: str) -> int:
+    """Число строк таблицы по поддерживаемому счётчику (O(1))."""
+    if table not in TABLES:
+        raise ValueError(f"Неизвестная таблица {table!r}")
+    with connection() as conn:
+        row = conn.execute("SELECT row_count FROM table_counts WHERE table_name = ?", (table,)).fetchone()
+    return row[0] if row else 0
+
+
+# Сводные таблицы: имя -> (ключевые колонки, запрос полного пересчёта).
+# Выручка считается по количеству и цене на момент покупки; строки с нулевым числом заказов/продаж не хранятся.
+AGGREGATES = {
+    "client_stats": (("client_id",), """
+        SELECT o.client_id, COUNT(*), COALESCE(SUM(r.revenue), 0)
+        FROM orders o
+        LEFT JOIN (
+            SELECT order_id, SUM(quantity * price) AS revenue
+            FROM order_products
+            GROUP BY order_id
+        ) r ON r.order_id = o.order_id
+        GROUP BY o.client_id
+    """),
+    "daily_order_counts": (("day",), """
+        SELECT date(order_date) AS day, COUNT(*)
+        FROM orders
+        GROUP BY day
+    """),
+    "product_sales": (("product_id",), """
+        SELECT product_id, SUM(quantity), COALESCE(SUM(quantity * price), 0)
+        FROM order_products
+        GROUP BY product_id
+    """),
+}
+
+# Тела триггеров сводных таблиц. Порядок удаления заказа и его позиций не важен:
+# позиция без заказа не меняет client_stats, а удалённый заказ вычитает выручку оставшихся позиций.
+_ORDER_ADDED = """
+    INSERT INTO client_stats (client_id, order_count, revenue)
+    VALUES (new.client_id, 1, (SELECT COALESCE(SUM(quantity * price), 0) FROM order_products
+                               WHERE order_id = new.order_id))
+    ON CONFLICT (client_id) DO UPDATE SET order_count = order_count + 1, revenue = revenue + excluded.revenue;
+    INSERT INTO daily_order_counts (day, order_count) VALUES (date(new.order_date), 1)
+    ON CONFLICT (day) DO UPDATE SET order_count = order_count + 1;
+"""
+_ORDER_REMOVED = """
+    UPDATE client_stats
+    SET order_count = order_count - 1,
+        revenue = revenue - (SELECT COALESCE(SUM(quantity * price), 0) FROM order_products
+                             WHERE order_id = old.order_id)
+    WHERE client_id = old.client_id;
+    DELETE FROM client_stats WHERE client_id = old.client_id AND order_count <= 0;
+    UPDATE daily_order_counts SET order_count = order_count - 1 WHERE day = date(old.order_date);
+    DELETE FROM daily_order_counts WHERE day = date(old.order_date) AND order_count <= 0;
+"""
+_LINE_ADDED = """
+    INSERT INTO product_sales (product_id, units, revenue)
+    VALUES (new.product_id, new.quantity, COALESCE(new.quantity * new.price, 0))
+    ON CONFLICT (product_id) DO UPDATE SET units = units + excluded.units, revenue = revenue + excluded.revenue;
+    UPDATE client_stats SET revenue = revenue + COALESCE(new.quantity * new.price, 0)
+    WHERE client_id = (SELECT client_id FROM orders WHERE order_id = new.order_id);
+"""
+_LINE_REMOVED = """
+    UPDATE product_sales
+    SET units = units - old.quantity, revenue = revenue - COALESCE(old.quantity * old.price, 0)
+    WHERE product_id = old.product_id;
+    DELETE FROM product_sales WHERE product_id = old.product_id AND units <= 0;
+    UPDATE client_stats SET revenue = revenue - COALESCE(old.quantity * old.price, 0)
+    WHERE client_id = (SELECT client_id FROM orders WHERE order_id = old.order_id);
+"""
+AGGREGATE_TRIGGERS = {
+    "orders_stats_ai": ("AFTER INSERT ON orders", _ORDER_ADDED),
+    "orders_stats_ad": ("AFTER DELETE ON orders", _ORDER_REMOVED),
+    "orders_stats_au": ("AFTER UPDATE OF client_id, order_date ON orders", _ORDER_REMOVED + _ORDER_ADDED),
+    "order_products_stats_ai": ("AFTER INSERT ON order_products", _LINE_ADDED),
+    "order_products_stats_ad": ("AFTER DELETE ON order_products", _LINE_REMOVED),
+    "order_products_stats_au": ("AFTER UPDATE OF order_id, product_id, quantity, price ON order_products",
+                                _LINE_REMOVED + _LINE_ADDED),
+}
 
-    cursor.execute("SELECT * FROM clients")
-    rows = cursor.fetchall()
 
-    clients = []
+def create_aggregate_triggers(cursor: sqlite3.Cursor):
+    _create_bulk_mode_table(cursor)
+    for name, (event, body) in AGGREGATE_TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} {BULK_MODE_GUARD} BEGIN {body} END")
 
-    for row in rows:
-        client_id, first_name, last_name, email, phone, address, registration_date = row
-        client = Client(first_name, last_name, email, phone, address)
-        client.client_id = client_id
-        client.registration_date = datetime.fromisoformat(registration_date)
-        clients.append(client)
 
-    conn.close()
-    return clients
+def drop_aggregate_triggers(cursor: sqlite3.Cursor):
+    for name in AGGREGATE_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
 
-def delete_client(client_id: int):
-    """Удаляет клиента по ID"""
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
 
-    cursor.execute('DELETE FROM clients WHERE client_id = ?', (client_id,))
-    conn.commit()
-    conn.close()
+def refresh_aggregates(cursor: sqlite3.Cursor):
+    """Пересчитывает сводные таблицы полным проходом по заказам."""
+    for table, (_, sql) in AGGREGATES.items():
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"INSERT INTO {table} {sql}")
 
-def update_client(client_id: int, first_name: str, last_name: str, email: str, phone: str, address: str):
-    """Обновляет данные клиента"""
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
 
-    cursor.execute('''
-    UPDATE clients 
-    SET first_name = ?, last_name = ?, email = ?, phone = ?, address = ?
-    WHERE client_id = ?
-    ''', (first_name, last_name, email, phone, address, client_id))
+@profiled
+def rebuild_aggregates():
+    """Перестраивает сводные таблицы с нуля в одной транзакции (после ручной правки БД и т.п.)."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        refresh_aggregates(cursor)
 
-    conn.commit()
-    conn.close()
 
-def search_clients(search_text: str) -> List[Client]:
-    """Ищет клиентов по всем полям"""
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
+def fill_purchase_prices(cursor: sqlite3.Cursor):
+    """Строкам заказов без цены покупки (старые данные, CSV без колонки price) проставляет текущую цену товара."""
+    cursor.execute("""
+        UPDATE order_products
+        SET price = (SELECT price FROM products WHERE products.product_id = order_products.product_id)
+        WHERE price IS NULL
+    """)
 
-    search_pattern = f'%{search_text}%'
-    cursor.execute('''
-    SELECT * FROM clients 
-    WHERE first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ? OR address LIKE ?
-    ORDER BY last_name, first_name
-    ''', (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern))
 
-    rows = cursor.fetchall()
-    clients = []
+@profiled
+def check_aggregates(tolerance: float = 1e-6) -> Dict[str, List[tuple]]:
+    """
+    Сверяет сводные таблицы с полным пересчётом.
+
+    Возвращает расхождения по таблицам: список (ключ, сохранённая строка, пересчитанная строка),
+    где отсутствующая строка - None. Пустые списки означают, что сводные таблицы верны.
+    tolerance - относительная погрешность: суммы выручки, которые триггеры и массовые
+    операции ведут вычитанием, расходятся с пересчётом в последних знаках.
+    """
+    mismatches: Dict[str, List[tuple]] = {}
+    with connection() as conn:
+        for table, (key_columns, sql) in AGGREGATES.items():
+            width = len(key_columns)
+            stored = {row[:width]: row[width:] for row in conn.execute(f"SELECT * FROM {table}")}
+            expected = {row[:width]: row[width:] for row in conn.execute(sql)}
+            mismatches[table] = [
+                (key, stored.get(key), expected.get(key))
+                for key in sorted(stored.keys() | expected.keys())
+                if stored.get(key) is None or expected.get(key) is None
+                or any(abs(a - b) > tolerance * max(1.0, abs(a), abs(b)) for a, b in zip(stored[key], expected[key]))
+            ]
+    return mismatches
+
+
+def get_schema_version() -> int:
+    with connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate() -> int:
+    """
+    Доводит схему БД до SCHEMA_VERSION, применяя недостающие миграции по порядку.
+    Каждая миграция выполняется в своей транзакции вместе с записью user_version,
+    поэтому существующий файл БД обновляется на месте и не остаётся в промежуточном состоянии.
+    Возвращает версию схемы до миграции.
+    """
+    with connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(f"Схема БД версии {version} новее, чем поддерживает приложение ({SCHEMA_VERSION})")
+        if version < SCHEMA_VERSION:
+            conn.commit()
+            conn.execute("PRAGMA journal_mode = WAL")  # сохраняется в файле БД, вне транзакции
+
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+
+    return version
 
-    for row in rows:
-        client_id, first_name, last_name, email, phone, address, registration_date = row
-        client = Client(first_name, last_name, email, phone, address)
-        client.client_id = client_id
-        client.registration_date = datetime.fromisoformat(registration_date)
-        clients.append(client)
 
-    conn.close()
-    return clients
+def create_tables():
+    """Создаёт или обновляет схему БД (см. migrate)."""
+    migrate()
+
+
+# Полнотекстовый индекс клиентов (FTS5, триграммы) - внешний контент над таблицей clients
+SEARCH_COLUMNS = ("first_name", "last_name", "email", "phone", "address")
+SEARCH_WEIGHTS = (10.0, 10.0, 5.0, 2.0, 1.0)  # веса bm25 по колонкам SEARCH_COLUMNS
+FTS_MIN_QUERY = 3  # триграммный индекс не умеет искать строки короче трёх символов
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """Проверяет, собран ли SQLite с FTS5 и триграммным токенайзером."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_search_index(cursor: sqlite3.Cursor):
+    """
+    Создаёт clients_fts и триггеры синхронизации; при первом создании
+    индекс заполняется из существующих строк. Без FTS5 ничего не делает -
+    поиск тогда работает через LIKE.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'clients_fts'")
+    if cursor.fetchone() or not fts5_available(cursor.connection):
+        return
+
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join("new." + col for col in SEARCH_COLUMNS)
+    old_values = ", ".join("old." + col for col in SEARCH_COLUMNS)
+
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE clients_fts USING fts5(
+            {columns}, content='clients', content_rowid='client_id', tokenize='trigram'
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER clients_fts_ai AFTER INSERT ON clients BEGIN
+            INSERT INTO clients_fts (rowid, {columns}) VALUES (new.client_id, {new_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER clients_fts_ad AFTER DELETE ON clients BEGIN
+            INSERT INTO clients_fts (clients_fts, rowid, {columns}) VALUES ('delete', old.client_id, {old_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER clients_fts_au AFTER UPDATE ON clients BEGIN
+            INSERT INTO clients_fts (clients_fts, rowid, {columns}) VALUES ('delete', old.client_id, {old_values});
+            INSERT INTO clients_fts (rowid, {columns}) VALUES (new.client_id, {new_values});
+        END
+    """)
+    cursor.execute("INSERT INTO clients_fts (clients_fts) VALUES ('rebuild')")
 
-def add_product(product: Product):
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
 
-    cursor.execute("""
-    INSERT INTO products (name, description, price)
-    VALUES (?, ?, ?)
-    """, (product.name, product.description, product.price))
+def drop_search_index(cursor: sqlite3.Cursor):
+    """Удаляет clients_fts вместе с триггерами синхронизации."""
+    for trigger in ("clients_fts_ai", "clients_fts_ad", "clients_fts_au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS clients_fts")
 
-    product.product_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
 
-def get_all_products() -> List[Product]:
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
+def _has_search_index(cursor: sqlite3.Cursor) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'clients_fts'")
+    return cursor.fetchone() is not None
 
-    cursor.execute("SELECT * FROM products")
-    rows = cursor.fetchall()
 
-    products = []
+def _fts_phrase(text: str) -> str:
+    """Экранирует строку как фразу FTS5 (для триграмм это поиск подстроки)."""
+    return '"' + text.replace('"', '""') + '"'
 
-    for row in rows:
-        product_id, name, description, price = row
-        product = Product(name, description, price)
-        product.product_id = product_id
-        products.append(product)
 
-    conn.close()
-    return products
+def _fts_fuzzy(text: str) -> str:
+    """Запрос "хотя бы одна общая триграмма" - устойчив к опечаткам, bm25 поднимает лучшие совпадения."""
+    text = text.lower()
+    trigrams = dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2))
+    return " OR ".join(_fts_phrase(trigram) for trigram in trigrams)
 
-def delete_product(product_id: int):
-    """Удаляет товар по ID"""
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
+@profiled
+def add_client(client: Client):
+    """ добавляем клиента в БД"""
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('DELETE FROM products WHERE product_id = ?', (product_id,))
-    conn.commit()
-    conn.close()
+        cursor.execute("""
+        INSERT INTO clients (first_name, last_name, email, phone, address, registration_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """, (client.first_name, client.last_name, client.email, client.phone, client.address,
+              client.registration_date.isoformat()))
 
-def add_order(order: Order):
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
+        client.client_id = cursor.lastrowid  # получаем айди клиента
+
+@profiled
+def get_all_clients() -> List[Client]:
+    """список всех клиентов из БД"""
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM clients")
+        rows = cursor.fetchall()
 
+    return [Client.from_row(row) for row in rows]
+
+@profiled
+def count_clients() -> int:
+    """Число клиентов в БД"""
+    return count_rows('clients')
+
+@profiled
+def get_clients_page(offset: int, limit: int) -> List[Client]:
+    """Страница клиентов в порядке client_id (для таблиц с виртуальной прокруткой)"""
+    with connection() as conn:
+        rows = conn.execute(f"SELECT {CLIENT_COLUMNS} FROM clients ORDER BY client_id LIMIT ? OFFSET ?",
+                            (limit, offset)).fetchall()
+    identity_map = IdentityMap()
+    return [identity_map.client(row) for row in rows]
+
+@profiled
+def get_clients_table() -> ClientTable:
+    """Все клиенты в колоночном виде (для больших выборок)"""
+    table = ClientTable()
+    with connection() as conn:
+        cursor = conn.execute(f"SELECT {CLIENT_COLUMNS} FROM clients ORDER BY client_id")
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            table.extend(rows)
+    return table
+
+@profiled
+def find_clients_by_email(email: str) -> List[Client]:
+    """Клиенты с указанным email (по индексу idx_clients_email)"""
+    with connection() as conn:
+        rows = conn.execute(f"SELECT {CLIENT_COLUMNS} FROM clients WHERE email = ?", (email,)).fetchall()
+    identity_map = IdentityMap()
+    return [identity_map.client(row) for row in rows]
+
+# Массовое удаление и изменение: ID передаются через временную таблицу temp.bulk_ids
+# (своя у каждого соединения), а не списком IN (?, ...) - размер набора не ограничен числом параметров.
+# Внешние ключи включены (CONNECTION_PRAGMAS), поэтому без cascade удаление строк,
+# на которые ссылаются заказы, отменяется целиком с ошибкой sqlite3.IntegrityError.
+_BULK_TEMP_TABLES = {
+    "bulk_ids": "id INTEGER PRIMARY KEY",
+    "bulk_orders": "order_id INTEGER PRIMARY KEY, client_id INTEGER, day TEXT",
+    # на сколько уменьшаются сводные таблицы после удаления
+    "bulk_client_delta": "client_id INTEGER PRIMARY KEY, orders INTEGER, revenue REAL",
+    "bulk_day_delta": "day TEXT PRIMARY KEY, orders INTEGER",
+    "bulk_product_delta": "product_id INTEGER PRIMARY KEY, lines INTEGER, units INTEGER, revenue REAL",
+}
+
+
+def _begin_bulk(cursor: sqlite3.Cursor, ids) -> int:
+    """Открывает транзакцию записи и кладёт ID без повторов в temp.bulk_ids; возвращает их число."""
+    for table, columns in _BULK_TEMP_TABLES.items():
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} ({columns})")
+    if not cursor.connection.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+    for table in _BULK_TEMP_TABLES:
+        cursor.execute(f"DELETE FROM temp.{table}")
+    # один JSON-массив вместо executemany по строке на ID
+    cursor.execute("INSERT OR IGNORE INTO temp.bulk_ids (id) SELECT value FROM json_each(?)",
+                   (json.dumps([int(i) for i in ids]),))
+    return cursor.execute("SELECT COUNT(*) FROM temp.bulk_ids").fetchone()[0]
+
+
+def _collect_orders(cursor: sqlite3.Cursor, where: str) -> int:
+    """
+    Запоминает удаляемые заказы (where - условие по orders) в temp.bulk_orders
+    и считает, на сколько уменьшатся сводные таблицы. Возвращает число строк заказов и позиций.
+    """
+    cursor.execute(f"""
+        INSERT INTO temp.bulk_orders (order_id, client_id, day)
+        SELECT order_id, client_id, date(order_date) FROM orders WHERE {where}
+    """)
+    # выручка по заказам группируется по первичному ключу order_products без сортировки
+    cursor.execute("""
+        INSERT INTO temp.bulk_client_delta (client_id, orders, revenue)
+        SELECT b.client_id, COUNT(*), COALESCE(SUM(r.revenue), 0)
+        FROM temp.bulk_orders b
+        LEFT JOIN (
+            SELECT order_id, SUM(COALESCE(quantity * price, 0)) AS revenue
+            FROM order_products
+            WHERE order_id IN (SELECT order_id FROM temp.bulk_orders)
+            GROUP BY order_id
+        ) r ON r.order_id = b.order_id
+        GROUP BY b.client_id
+    """)
     cursor.execute("""
-    INSERT INTO orders (client_id, order_date, status)
-    VALUES (?, ?, ?)
-    """, (order.client.client_id, order.order_date.isoformat(), order.status))
+        INSERT INTO temp.bulk_day_delta (day, orders)
+        SELECT day, COUNT(*) FROM temp.bulk_orders GROUP BY day
+    """)
+    cursor.execute("""
+        INSERT INTO temp.bulk_product_delta (product_id, lines, units, revenue)
+        SELECT product_id, COUNT(*), SUM(quantity), SUM(COALESCE(quantity * price, 0))
+        FROM order_products
+        WHERE order_id IN (SELECT order_id FROM temp.bulk_orders)
+        GROUP BY product_id
+    """)
+    return cursor.execute("""
+        SELECT (SELECT COUNT(*) FROM temp.bulk_orders) + (SELECT COALESCE(SUM(lines), 0) FROM temp.bulk_product_delta)
+    """).fetchone()[0]
 
-    order.order_id = cursor.lastrowid
 
-    for product in order.products:
-        cursor.execute("""
-        INSERT INTO order_products (order_id, product_id)
-        VALUES (?, ?)
-        """, (order.order_id, product.product_id))
+def _collect_product_lines(cursor: sqlite3.Cursor) -> int:
+    """Как _collect_orders, но для строк заказов с товарами temp.bulk_ids (заказы остаются)."""
+    cursor.execute("""
+        INSERT INTO temp.bulk_product_delta (product_id, lines, units, revenue)
+        SELECT product_id, COUNT(*), SUM(quantity), SUM(COALESCE(quantity * price, 0))
+        FROM order_products
+        WHERE product_id IN (SELECT id FROM temp.bulk_ids)
+        GROUP BY product_id
+    """)
+    cursor.execute("""
+        INSERT INTO temp.bulk_client_delta (client_id, orders, revenue)
+        SELECT o.client_id, 0, SUM(COALESCE(op.quantity * op.price, 0))
+        FROM order_products op
+        JOIN orders o ON o.order_id = op.order_id
+        WHERE op.product_id IN (SELECT id FROM temp.bulk_ids)
+        GROUP BY o.client_id
+    """)
+    return cursor.execute("SELECT COALESCE(SUM(lines), 0) FROM temp.bulk_product_delta").fetchone()[0]
 
-    conn.commit()
-    conn.close()
 
-def get_all_orders() -> List[Order]:
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
+def _apply_delete_deltas(cursor: sqlite3.Cursor):
+    """Вычитает temp.bulk_*_delta из сводных таблиц - то же, что триггеры делают построчно."""
+    cursor.execute("""
+        UPDATE client_stats
+        SET order_count = client_stats.order_count - d.orders, revenue = client_stats.revenue - d.revenue
+        FROM temp.bulk_client_delta d
+        WHERE client_stats.client_id = d.client_id
+    """)
+    cursor.execute("""
+        DELETE FROM client_stats
+        WHERE client_id IN (SELECT client_id FROM temp.bulk_client_delta) AND order_count <= 0
+    """)
+    cursor.execute("""
+        UPDATE daily_order_counts SET order_count = daily_order_counts.order_count - d.orders
+        FROM temp.bulk_day_delta d
+        WHERE daily_order_counts.day = d.day
+    """)
+    cursor.execute("""
+        DELETE FROM daily_order_counts
+        WHERE day IN (SELECT day FROM temp.bulk_day_delta) AND order_count <= 0
+    """)
+    cursor.execute("""
+        UPDATE product_sales
+        SET units = product_sales.units - d.units, revenue = product_sales.revenue - d.revenue
+        FROM temp.bulk_product_delta d
+        WHERE product_sales.product_id = d.product_id
+    """)
+    cursor.execute("""
+        DELETE FROM product_sales
+        WHERE product_id IN (SELECT product_id FROM temp.bulk_product_delta) AND units <= 0
+    """)
 
-    cursor.execute("SELECT * FROM orders")
-    rows = cursor.fetchall()
 
-    orders = []
+def _delete_bulk(cursor: sqlite3.Cursor, statements: List[Tuple[str, str]], rows: int,
+                 restrict_error: Optional[str] = None) -> Dict[str, int]:
+    """
+    Выполняет DELETE-выражения statements [(таблица, sql), ...] по порядку внешних ключей.
+
+    Если затронуто от BULK_ORDERS_THRESHOLD строк (rows - оценка по собранным temp-таблицам),
+    триггеры счётчиков и сводных таблиц на время удаления выключаются флагом bulk_mode
+    (см. _bulk_mode), а изменения вычитаются из temp.bulk_*_delta несколькими
+    UPDATE ... FROM - как в add_orders.
+    restrict_error - текст ошибки, если удалению помешал внешний ключ.
+    """
+    bulk = rows >= BULK_ORDERS_THRESHOLD
+    deleted = {}
+    with _bulk_mode(cursor) if bulk else nullcontext():
+        if bulk:
+            _apply_delete_deltas(cursor)
+        for table, sql in statements:
+            try:
+                deleted[table] = cursor.execute(sql).rowcount
+            except sqlite3.IntegrityError as e:
+                if restrict_error is None:
+                    raise
+                raise sqlite3.IntegrityError(f"{restrict_error}: удаление отменено "
+                                             f"(cascade=True удалит и зависимые строки) - {e}") from e
+        if bulk:
+            cursor.executemany("UPDATE table_counts SET row_count = row_count - ? WHERE table_name = ?",
+                               [(count, table) for table, count in deleted.items() if count])
+    return deleted
+
+
+_DELETE_COLLECTED_ORDERS = [
+    ("order_products", "DELETE FROM order_products WHERE order_id IN (SELECT order_id FROM temp.bulk_orders)"),
+    ("orders", "DELETE FROM orders WHERE order_id IN (SELECT order_id FROM temp.bulk_orders)"),
+]
+
+
+@profiled
+def delete_clients(client_ids, cascade: bool = False) -> Dict[str, int]:
+    """
+    Удаляет клиентов по списку ID одной транзакцией.
+
+    cascade=True - вместе с их заказами и строками заказов; иначе клиенты с заказами
+    не удаляются и вся операция отменяется (sqlite3.IntegrityError).
+    Возвращает число удалённых строк по таблицам.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        rows = _begin_bulk(cursor, client_ids)
+        statements = [("clients", "DELETE FROM clients WHERE client_id IN (SELECT id FROM temp.bulk_ids)")]
+        if cascade:
+            rows += _collect_orders(cursor, "client_id IN (SELECT id FROM temp.bulk_ids)")
+            statements = _DELETE_COLLECTED_ORDERS + statements
+        deleted = _delete_bulk(cursor, statements, rows, "Есть клиенты с заказами")
+        order_ids = [row[0] for row in cursor.execute("SELECT order_id FROM temp.bulk_orders")]
+        ids = [row[0] for row in cursor.execute("SELECT id FROM temp.bulk_ids")]
+
+    _invalidate_cache(keys=(("client", client_id) for client_id in ids),
+                      tags=(("order", order_id) for order_id in order_ids))
+    return deleted
+
+
+@profiled
+def update_clients(client_ids, **values) -> int:
+    """
+    Задаёт одинаковые значения колонок всем клиентам из списка одной транзакцией:
+    update_clients([1, 2, 3], address="Москва"). Меняются только переданные колонки.
+    Возвращает число изменённых строк.
+    """
+    return _update_many("clients", "client_id", client_ids, values,
+                        ("first_name", "last_name", "email", "phone", "address"),
+                        lambda ids: _invalidate_cache(keys=(("client", client_id) for client_id in ids)))
+
+
+def _update_many(table: str, key: str, ids, values: Dict[str, object], allowed, invalidate) -> int:
+    """UPDATE table SET <values> для строк temp.bulk_ids; колонки проверяются по allowed."""
+    unknown = set(values) - set(allowed)
+    if unknown or not values:
+        raise ValueError(f"Можно изменить колонки {list(allowed)}, получено: {sorted(unknown) or 'ничего'}")
+    with connection() as conn:
+        cursor = conn.cursor()
+        _begin_bulk(cursor, ids)
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        updated = cursor.execute(f"UPDATE {table} SET {assignments} WHERE {key} IN (SELECT id FROM temp.bulk_ids)",
+                                 tuple(values.values())).rowcount
+        changed = [row[0] for row in cursor.execute("SELECT id FROM temp.bulk_ids")]
+    invalidate(changed)
+    return updated
+
+
+@profiled
+def delete_client(client_id: int, cascade: bool = False):
+    """Удаляет клиента по ID (cascade=True - вместе с его заказами, см. delete_clients)"""
+    delete_clients([client_id], cascade)
+
+@profiled
+def update_client(client_id: int, first_name: str, last_name: str, email: str, phone: str, address: str):
+    """Обновляет данные клиента"""
+    with connection() as conn:
+        conn.execute('''
+        UPDATE clients 
+        SET first_name = ?, last_name = ?, email = ?, phone = ?, address = ?
+        WHERE client_id = ?
+        ''', (first_name, last_name, email, phone, address, client_id))
+    _invalidate_cache(keys=[("client", client_id)])
+
+@profiled
+def search_clients(search_text: str) -> List[Client]:
+    """Ищет клиентов по всем полям"""
+    search_pattern = f'%{search_text}%'
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        if len(search_text) >= FTS_MIN_QUERY and _has_search_index(cursor):
+            # CROSS JOIN фиксирует порядок: сначала индекс FTS, потом клиенты по первичному ключу
+            cursor.execute(f'''
+            SELECT {", ".join("c." + col for col in CLIENT_COLUMNS.split(", "))}
+            FROM clients_fts f
+            CROSS JOIN clients c ON c.client_id = f.rowid
+            WHERE clients_fts MATCH ?
+            ORDER BY c.last_name, c.first_name
+            ''', (_fts_phrase(search_text),))
+        else:
+            cursor.execute('''
+            SELECT * FROM clients 
+            WHERE first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ? OR address LIKE ?
+            ORDER BY last_name, first_name
+            ''', (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern))
 
-    for row in rows:
-        order_id, client_id, order_date, status = row
+        rows = cursor.fetchall()
 
-        client = get_client_by_id(client_id)
-        products = get_products_by_order_id(order_id)
+    return [Client.from_row(row) for row in rows]
+
+@profiled
+def search_clients_ranked(search_text: str, limit: int = 50, offset: int = 0, fuzzy: bool = True) -> List[Client]:
+    """
+    Ранжированный поиск клиентов с постраничной выдачей.
+
+    Сначала ищется точная подстрока по всем полям (bm25, имя/фамилия весят больше).
+    Если ничего не нашлось и fuzzy=True - ищутся клиенты с общими триграммами,
+    что находит записи с опечатками. Без FTS5 или для запросов короче
+    FTS_MIN_QUERY используется LIKE с сортировкой по фамилии и имени.
+    """
+    search_text = search_text.strip()
+    if not search_text:
+        return []
+
+    columns = ", ".join("c." + col for col in CLIENT_COLUMNS.split(", "))
+    weights = ", ".join(str(weight) for weight in SEARCH_WEIGHTS)
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        if len(search_text) >= FTS_MIN_QUERY and _has_search_index(cursor):
+            match = _fts_phrase(search_text)
+            if fuzzy and len(search_text) > FTS_MIN_QUERY:
+                cursor.execute("SELECT 1 FROM clients_fts WHERE clients_fts MATCH ? LIMIT 1", (match,))
+                if cursor.fetchone() is None:
+                    match = _fts_fuzzy(search_text)
+            cursor.execute(f"""
+                SELECT {columns}
+                FROM clients_fts f
+                CROSS JOIN clients c ON c.client_id = f.rowid
+                WHERE clients_fts MATCH ?
+                ORDER BY bm25(clients_fts, {weights})
+                LIMIT ? OFFSET ?
+            """, (match, limit, offset))
+            rows = cursor.fetchall()
+        else:
+            pattern = f"%{search_text}%"
+            cursor.execute(f"""
+                SELECT {CLIENT_COLUMNS} FROM clients
+                WHERE first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ? OR address LIKE ?
+                ORDER BY last_name, first_name
+                LIMIT ? OFFSET ?
+            """, (pattern,) * len(SEARCH_COLUMNS) + (limit, offset))
+            rows = cursor.fetchall()
+
+    identity_map = IdentityMap()
+    return [identity_map.client(row) for row in rows]
+
+@profiled
+def add_product(product: Product):
+    with connection() as conn:
+        cursor = conn.cursor()
 
-        order = Order(client, products, status)
-        order.order_id = order_id
-        order.order_date = datetime.fromisoformat(order_date)
-        orders.append(order)
+        cursor.execute("""
+        INSERT INTO products (name, description, price)
+        VALUES (?, ?, ?)
+        """, (product.name, product.description, product.price))
+
+        product.product_id = cursor.lastrowid
+    _invalidate_cache(keys=["all_products"])
+
+def _fetch_all_products() -> List[tuple]:
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM products")
+        return cursor.fetchall()
+
+@profiled
+def get_all_products() -> List[Product]:
+    """Все товары (список меняется редко и читается из кэша)"""
+    rows = read_cache.get_or_load("all_products", _fetch_all_products)
+    return [Product.from_row(row) for row in rows]
+
+@profiled
+def count_products() -> int:
+    """Число товаров в БД"""
+    return count_rows('products')
+
+@profiled
+def get_products_page(offset: int, limit: int) -> List[Product]:
+    """Страница товаров в порядке product_id"""
+    with connection() as conn:
+        rows = conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY product_id LIMIT ? OFFSET ?",
+                            (limit, offset)).fetchall()
+    identity_map = IdentityMap()
+    return [identity_map.product(row) for row in rows]
+
+@profiled
+def get_products_table() -> ProductTable:
+    """Все товары в колоночном виде (для больших выборок)"""
+    table = ProductTable()
+    with connection() as conn:
+        cursor = conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY product_id")
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            table.extend(rows)
+    return table
+
+@profiled
+def delete_products(product_ids, cascade: bool = False) -> Dict[str, int]:
+    """
+    Удаляет товары по списку ID одной транзакцией.
+
+    cascade=True - вместе со строками заказов с этими товарами (сами заказы остаются,
+    выручка клиентов уменьшается); иначе товары из заказов не удаляются и вся
+    операция отменяется (sqlite3.IntegrityError).
+    Возвращает число удалённых строк по таблицам.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        rows = _begin_bulk(cursor, product_ids)
+        statements = [("products", "DELETE FROM products WHERE product_id IN (SELECT id FROM temp.bulk_ids)")]
+        if cascade:
+            rows += _collect_product_lines(cursor)
+            statements.insert(0, ("order_products",
+                                  "DELETE FROM order_products WHERE product_id IN (SELECT id FROM temp.bulk_ids)"))
+        deleted = _delete_bulk(cursor, statements, rows, "Есть товары в заказах")
+        ids = [row[0] for row in cursor.execute("SELECT id FROM temp.bulk_ids")]
+
+    # строки заказов в кэше помечены тегами своих товаров - сбрасываются вместе с ними
+    _invalidate_cache(keys=["all_products"], tags=(("product", product_id) for product_id in ids))
+    return deleted
+
+
+@profiled
+def update_products(product_ids, **values) -> int:
+    """
+    Задаёт одинаковые значения колонок всем товарам из списка одной транзакцией:
+    update_products([1, 2], price=99.0). Выручка прошлых заказов не меняется.
+    Возвращает число изменённых строк.
+    """
+    return _update_many("products", "product_id", product_ids, values, ("name", "description", "price"),
+                        lambda ids: _invalidate_cache(keys=["all_products"],
+                                                      tags=(("product", product_id) for product_id in ids)))
+
+
+@profiled
+def delete_product(product_id: int, cascade: bool = False):
+    """Удаляет товар по ID (cascade=True - вместе со строками заказов, см. delete_products)"""
+    delete_products([product_id], cascade)
+
+@profiled
+def update_product(product_id: int, name: str, description: str, price: float):
+    """Обновляет данные товара (выручка прошлых заказов не меняется - в строках хранится цена покупки)"""
+    with connection() as conn:
+        conn.execute('UPDATE products SET name = ?, description = ?, price = ? WHERE product_id = ?',
+                     (name, description, price, product_id))
+    _invalidate_cache(keys=["all_products"], tags=[("product", product_id)])
+
+@profiled
+def add_order(order: Order):
+    add_orders([order])
+
+
+BULK_ORDERS_THRESHOLD = 500  # с такого размера пакета счётчики обновляются один раз на пакет, а не триггерами
+
+
+@profiled
+def add_orders(orders: List[Order]) -> List[int]:
+    """
+    Пакетно сохраняет заказы вместе со строками в одной транзакции.
+
+    ID заказов выдаются подряд от текущего максимума под блокировкой записи
+    (BEGIN IMMEDIATE), поэтому заказы и их строки пишутся двумя executemany
+    без lastrowid по каждой строке. Повторы одного товара в order.products
+    сохраняются как quantity, а order.line_price (для нового заказа - текущая цена товара) -
+    как цена на момент покупки.
+    Для пакетов от BULK_ORDERS_THRESHOLD заказов триггеры счётчиков строк и сводных
+    таблиц на время вставки выключаются флагом bulk_mode (см. _bulk_mode), а изменения
+    применяются одним набором UPSERT в той же транзакции.
+    Заполняет order.order_id и возвращает список ID в порядке orders.
+    """
+    order_rows = []
+    order_lines = []
+    for order in orders:
+        if order.client is None or order.client.client_id is None:
+            raise ValueError("Клиент заказа не сохранён в БД")
+        lines = order.lines()
+        if any(product.product_id is None for product, _ in lines):
+            raise ValueError("Товар заказа не сохранён в БД")
+        order_rows.append([None, order.client.client_id, order.order_date.isoformat(), order.status])
+        order_lines.append([(product, quantity, order.line_price(product)) for product, quantity in lines])
+
+    bulk = len(order_rows) >= BULK_ORDERS_THRESHOLD
+    with connection() as conn:
+        cursor = conn.cursor()
+        if not conn.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")  # никто не займёт ID между MAX и вставкой
+        next_id = cursor.execute("SELECT COALESCE(MAX(order_id), 0) + 1 FROM orders").fetchone()[0]
+        for order_id, row in enumerate(order_rows, start=next_id):
+            row[0] = order_id
+        line_rows = [(row[0], product.product_id, quantity, price)
+                     for row, lines in zip(order_rows, order_lines) for product, quantity, price in lines]
+
+        with _bulk_mode(cursor) if bulk else nullcontext():
+            cursor.executemany("INSERT INTO orders (order_id, client_id, order_date, status) VALUES (?, ?, ?, ?)",
+                               order_rows)
+            cursor.executemany("INSERT INTO order_products (order_id, product_id, quantity, price) "
+                               "VALUES (?, ?, ?, ?)", line_rows)
+            if bulk:
+                _apply_order_deltas(cursor, order_rows, line_rows)
+
+    # пустой список товаров мог быть закэширован для ещё не существовавшего ID
+    _invalidate_cache(tags=(("order", row[0]) for row in order_rows))
+    for order, row in zip(orders, order_rows):
+        order.order_id = row[0]
+    return [row[0] for row in order_rows]
+
+
+def _apply_order_deltas(cursor: sqlite3.Cursor, order_rows, line_rows):
+    """Делает за пакет новых заказов то же, что триггеры счётчиков и сводных таблиц делают построчно."""
+    clients: Dict[int, list] = {}
+    products: Dict[int, list] = {}
+    client_of = {}
+    for order_id, client_id, _, _ in order_rows:
+        client_of[order_id] = client_id
+        clients.setdefault(client_id, [0, 0.0])[0] += 1
+    for order_id, product_id, quantity, price in line_rows:
+        revenue = quantity * price if price is not None else 0.0
+        clients[client_of[order_id]][1] += revenue
+        sales = products.setdefault(product_id, [0, 0.0])
+        sales[0] += quantity
+        sales[1] += revenue
+
+    cursor.executemany("""
+        INSERT INTO client_stats (client_id, order_count, revenue) VALUES (?, ?, ?)
+        ON CONFLICT (client_id) DO UPDATE SET order_count = order_count + excluded.order_count,
+                                              revenue = revenue + excluded.revenue
+    """, ((client_id, count, revenue) for client_id, (count, revenue) in clients.items()))
+    # день считается SQLite-функцией date(), как в триггерах: время с часовым поясом приводится к UTC
+    cursor.execute("""
+        INSERT INTO daily_order_counts (day, order_count)
+        SELECT date(value), COUNT(*) FROM json_each(?) GROUP BY 1
+        ON CONFLICT (day) DO UPDATE SET order_count = order_count + excluded.order_count
+    """, (json.dumps([row[2] for row in order_rows]),))
+    cursor.executemany("""
+        INSERT INTO product_sales (product_id, units, revenue) VALUES (?, ?, ?)
+        ON CONFLICT (product_id) DO UPDATE SET units = units + excluded.units, revenue = revenue + excluded.revenue
+    """, ((product_id, units, revenue) for product_id, (units, revenue) in products.items()))
+    cursor.executemany("UPDATE table_counts SET row_count = row_count + ? WHERE table_name = ?",
+                       [(len(order_rows), "orders"), (len(line_rows), "order_products")])
+
+
+@profiled
+def delete_orders(order_ids) -> Dict[str, int]:
+    """Удаляет заказы по списку ID вместе с их строками одной транзакцией; возвращает число строк по таблицам."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        _begin_bulk(cursor, order_ids)
+        rows = _collect_orders(cursor, "order_id IN (SELECT id FROM temp.bulk_ids)")
+        deleted = _delete_bulk(cursor, _DELETE_COLLECTED_ORDERS, rows)
+        ids = [row[0] for row in cursor.execute("SELECT order_id FROM temp.bulk_orders")]
+
+    _invalidate_cache(tags=(("order", order_id) for order_id in ids))
+    return deleted
+
+
+class IdentityMap:
+    """
+    Карта идентичности: один объект Client/Product на один ID в пределах загрузки.
+
+    Повторные строки того же клиента или товара не создают новых объектов,
+    поэтому все заказы клиента ссылаются на один и тот же Client.
+    """
+
+    def __init__(self):
+        self.clients: Dict[int, Client] = {}
+        self.products: Dict[int, Product] = {}
+
+    def client(self, row) -> Optional[Client]:
+        """row - кортеж в порядке CLIENT_COLUMNS."""
+        client_id = row[0]
+        if client_id is None:
+            return None
+        client = self.clients.get(client_id)
+        if client is None:
+            client = self.clients[client_id] = Client.from_row(row)
+        return client
+
+    def product(self, row) -> Product:
+        """row - кортеж в порядке PRODUCT_COLUMNS."""
+        product_id = row[0]
+        product = self.products.get(product_id)
+        if product is None:
+            product = self.products[product_id] = Product.from_row(row)
+        return product
+
+
+def _load_orders(cursor: sqlite3.Cursor, where: str = "", params=(),
+                 identity_map: Optional[IdentityMap] = None) -> Dict[int, Order]:
+    """
+    Строит граф Order/Client/Product двумя запросами:
+    заказы вместе с клиентами (JOIN) и строки заказов вместе с товарами (JOIN).
+    """
+    identity_map = identity_map if identity_map is not None else IdentityMap()
+    orders: Dict[int, Order] = {}
+
+    cursor.execute(f"""
+        SELECT o.order_id, o.order_date, o.status, {", ".join("c." + col for col in CLIENT_COLUMNS.split(", "))}
+        FROM orders o
+        LEFT JOIN clients c ON c.client_id = o.client_id
+        {where}
+        ORDER BY o.order_id
+    """, params)
+    for row in cursor:
+        client = identity_map.client(row[3:])
+        order = Order.from_row(row[:3], client)
+        if client is not None:
+            client.add_order(order)
+        orders[order.order_id] = order
+
+    cursor.execute(f"""
+        SELECT op.order_id, op.quantity, COALESCE(op.price, 0),
+               {", ".join("p." + col for col in PRODUCT_COLUMNS.split(", "))}
+        FROM order_products op
+        JOIN orders o ON o.order_id = op.order_id
+        JOIN products p ON p.product_id = op.product_id
+        {where}
+        ORDER BY op.order_id
+    """, params)
+    for row in cursor:
+        order = orders.get(row[0])
+        if order is not None:
+            # цена не заполнена - 0, как COALESCE в сводных таблицах
+            order.add_product(identity_map.product(row[3:]), row[1], row[2])
 
-    conn.close()
     return orders
 
-def get_client_by_id(client_id: int) -> Client:
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM clients WHERE client_id = ?", (client_id,))
-    row = cursor.fetchone()
+@profiled
+def get_all_orders(identity_map: Optional[IdentityMap] = None) -> List[Order]:
+    """Все заказы с клиентами и товарами за постоянное число запросов."""
+    with connection() as conn:
+        orders = _load_orders(conn.cursor(), identity_map=identity_map)
+    return list(orders.values())
+
+
+@profiled
+def get_orders_by_client_id(client_id: int, identity_map: Optional[IdentityMap] = None) -> List[Order]:
+    """Заказы одного клиента (по индексу idx_orders_client)."""
+    with connection() as conn:
+        orders = _load_orders(conn.cursor(), "WHERE o.client_id = ?", (client_id,), identity_map)
+    return list(orders.values())
+
+
+@profiled
+def get_orders_by_ids(order_ids: List[int], identity_map: Optional[IdentityMap] = None) -> List[Order]:
+    """Заказы по списку ID; IN (...) разбивается на куски по IN_CHUNK_SIZE."""
+    identity_map = identity_map if identity_map is not None else IdentityMap()
+    ids = list(dict.fromkeys(order_ids))
+    orders: Dict[int, Order] = {}
+    with connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[start:start + IN_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            orders.update(_load_orders(cursor, f"WHERE o.order_id IN ({placeholders})", chunk, identity_map))
+    return [orders[order_id] for order_id in order_ids if order_id in orders]
+
+
+# ключи utils.ORDER_SORT_KEYS в SQL; сумма - как Order.calc_total (по ценам на момент покупки)
+ORDER_SORT_SQL = {
+    "id": "o.order_id",
+    "date": "o.order_date",
+    "status": "o.status",
+    "amount": "COALESCE(t.total, 0)",
+}
+
+
+@profiled
+def sorted_order_ids(key="date", reverse: bool = False, limit: Optional[int] = None) -> List[int]:
+    """
+    ID заказов в порядке utils.sort_orders, но сортировка (и отбор top-k) выполняется в SQL.
+    При равных ключах порядок - по order_id, как у стабильной сортировки get_all_orders().
+    """
+    spec = sort_spec(key, reverse, ORDER_SORT_SQL)
+    order_sql = ", ".join(f"{ORDER_SORT_SQL[name]} {'DESC' if desc else 'ASC'}" for name, desc in spec)
+    totals = ""
+    if any(name == "amount" for name, _ in spec):
+        totals = """
+            LEFT JOIN (
+                SELECT order_id, SUM(COALESCE(quantity * price, 0)) AS total
+                FROM order_products
+                GROUP BY order_id
+            ) t ON t.order_id = o.order_id"""
+    with connection() as conn:
+        rows = conn.execute(f"SELECT o.order_id FROM orders o{totals} ORDER BY {order_sql}, o.order_id LIMIT ?",
+                            (limit if limit is not None else -1,)).fetchall()
+    return [row[0] for row in rows]
+
+
+@profiled
+def get_orders_sorted(key="date", reverse: bool = False, limit: Optional[int] = None,
+                      identity_map: Optional[IdentityMap] = None) -> List[Order]:
+    """То же, что utils.sort_orders(get_all_orders(), ...), но из БД загружаются только нужные заказы."""
+    return get_orders_by_ids(sorted_order_ids(key, reverse, limit), identity_map)
+
+# Операторы фильтров query_*: column__op=value
+FILTER_OPERATORS = {"eq": "=", "ne": "!=", "lt": "<", "le": "<=", "gt": ">", "ge": ">=", "like": "LIKE"}
+QUERY_PAGE_SIZE = 1000
+ANCHOR_STEP = 1000  # шаг разреженного индекса якорей TableQuery.page_at: переход стоит не больше ANCHOR_STEP строк
+
+
+class TableQuery:
+    """
+    Ленивый запрос к таблице с keyset-пагинацией.
+
+    Страница выбирается условием WHERE (order_by, key) > (?, ?) по последней строке
+    предыдущей страницы, поэтому стоимость страницы не зависит от её номера,
+    в отличие от OFFSET. Для произвольного доступа по смещению (page_at) хранится
+    разреженный индекс якорей - ключ каждой ANCHOR_STEP-й строки. Фильтры выполняются
+    в SQL, объекты создаются только для текущей страницы функцией hydrate(rows).
+
+    table = имя таблицы str
+    columns = выбираемые колонки (первая - ключ key) List[str]
+    hydrate = строки страницы -> объекты Callable
+    order_by = колонка сортировки (NOT NULL) str
+    descending = сортировка по убыванию bool
+    filters = {"колонка" или "колонка__оператор": значение}, операторы см. FILTER_OPERATORS
+    """
+
+    def __init__(self, table: str, columns: List[str], hydrate: Callable[[List[tuple]], List],
+                 order_by: Optional[str] = None, descending: bool = False, page_size: int = QUERY_PAGE_SIZE,
+                 filters: Optional[Dict[str, object]] = None, sortable: Optional[List[str]] = None):
+        self.table = table
+        self.columns = columns
+        self.key = columns[0]
+        self.hydrate = hydrate
+        self.order_by = order_by or self.key
+        self.descending = descending
+        self.page_size = page_size
+        if self.order_by not in (sortable or columns):
+            raise ValueError(f"Сортировка по {self.order_by!r} не поддерживается")
+
+        self._where: List[str] = []
+        self._params: List[object] = []
+        for name, value in (filters or {}).items():
+            column, _, op = name.partition("__")
+            if column not in columns or (op or "eq") not in FILTER_OPERATORS:
+                raise ValueError(f"Неизвестный фильтр {name!r}")
+            self._where.append(f"{column} {FILTER_OPERATORS[op or 'eq']} ?")
+            self._params.append(value)
+
+        self._order_index = columns.index(self.order_by)
+        self._boundaries: Dict[int, tuple] = {}  # смещение -> ключ последней строки перед ним
+        self._anchors: Optional[List[tuple]] = None  # ключ строки (i + 1) * ANCHOR_STEP - 1 для каждого i
+        self._anchors_version: Optional[int] = None  # count_rows(table) на момент построения якорей
+
+    def _cursor_key(self, row: tuple) -> tuple:
+        if self.order_by == self.key:
+            return (row[0],)
+        return row[self._order_index], row[0]
+
+    def _order_sql(self) -> str:
+        direction = "DESC" if self.descending else "ASC"
+        if self.order_by == self.key:
+            return f"{self.key} {direction}"
+        return f"{self.order_by} {direction}, {self.key} {direction}"
+
+    @profiled
+    def page_rows(self, limit: Optional[int] = None, after: Optional[tuple] = None, skip: int = 0) -> List[tuple]:
+        """
+        Строки следующей страницы после ключа after (см. _cursor_key), без создания объектов.
+        skip - сколько строк после after пропустить (OFFSET от якоря, см. page_at).
+        """
+        where, params = [], []
+        sign = "<" if self.descending else ">"
+        if after is not None:
+            # условие keyset - первым: из двух границ по одной колонке SQLite ищет по первой,
+            # а граница keyset всегда не слабее фильтра
+            if self.order_by == self.key:
+                where.append(f"{self.key} {sign} ?")
+            else:
+                where.append(f"({self.order_by}, {self.key}) {sign} (?, ?)")
+            params.extend(after)
+        where += self._where
+        params += self._params
+
+        sql = (f"SELECT {', '.join(self.columns)} FROM {self.table}"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {self._order_sql()} LIMIT ? OFFSET ?")
+        with connection() as conn:
+            return conn.execute(sql, params + [limit or self.page_size, skip]).fetchall()
+
+    def page(self, limit: Optional[int] = None, after: Optional[tuple] = None) -> List:
+        return self.hydrate(self.page_rows(limit, after))
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """Все строки по страницам; между страницами соединение не удерживается."""
+        after = None
+        while True:
+            rows = self.page_rows(after=after)
+            yield from rows
+            if len(rows) < self.page_size:
+                return
+            after = self._cursor_key(rows[-1])
+
+    def __iter__(self) -> Iterator:
+        after = None
+        while True:
+            rows = self.page_rows(after=after)
+            yield from self.hydrate(rows)
+            if len(rows) < self.page_size:
+                return
+            after = self._cursor_key(rows[-1])
+
+    def page_at(self, offset: int, limit: int) -> List:
+        """
+        Страница по смещению (для таблиц с прокруткой). Если известна граница
+        предыдущей страницы - используется keyset, иначе поиск от ближайшего якоря:
+        keyset до якоря и OFFSET меньше ANCHOR_STEP строк, а не OFFSET от начала таблицы.
+        Якоря строятся одним проходом по ключам при первом переходе вдали от известных
+        границ и перестраиваются, когда меняется число строк таблицы.
+        """
+        self._check_anchors()
+        if offset == 0:
+            rows = self.page_rows(limit)
+        elif offset in self._boundaries:
+            rows = self.page_rows(limit, self._boundaries[offset])
+        else:
+            anchors = self._build_anchors()
+            anchor = min(offset // ANCHOR_STEP, len(anchors))
+            if anchor == 0:
+                rows = self.page_rows(limit, skip=offset)
+            else:
+                rows = self.page_rows(limit, anchors[anchor - 1], skip=offset - anchor * ANCHOR_STEP)
+        if rows:
+            self._boundaries[offset + len(rows)] = self._cursor_key(rows[-1])
+        return self.hydrate(rows)
+
+    def _check_anchors(self):
+        """Сбрасывает якоря и границы страниц, если после их построения в таблице добавились или удалились строки."""
+        version = count_rows(self.table)
+        if version != self._anchors_version:
+            self._anchors = None
+            self._boundaries.clear()
+            self._anchors_version = version
+
+    @profiled
+    def _build_anchors(self) -> List[tuple]:
+        """Один проход по колонкам сортировки (без создания объектов): ключ каждой ANCHOR_STEP-й строки."""
+        if self._anchors is None:
+            columns = self.key if self.order_by == self.key else f"{self.key}, {self.order_by}"
+            where = " AND ".join(self._where)
+            anchors = []
+            with connection() as conn:
+                cursor = conn.execute(f"SELECT {columns} FROM {self.table}"
+                                      f"{' WHERE ' + where if where else ''} ORDER BY {self._order_sql()}",
+                                      self._params)
+                while True:
+                    rows = cursor.fetchmany(ANCHOR_STEP)
+                    if len(rows) < ANCHOR_STEP:
+                        break
+                    last = rows[-1]
+                    anchors.append((last[0],) if len(last) == 1 else (last[1], last[0]))
+            self._anchors = anchors
+        return self._anchors
+
+    def count(self) -> int:
+        """Без фильтров - из счётчика table_counts, с фильтрами - COUNT(*) в SQL."""
+        if not self._where:
+            return count_rows(self.table)
+        with connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {' AND '.join(self._where)}",
+                                self._params).fetchone()[0]
+
+
+def query_clients(order_by: str = "client_id", descending: bool = False, page_size: int = QUERY_PAGE_SIZE,
+                  **filters) -> TableQuery:
+    """Запрос клиентов: for client in query_clients(last_name="Иванов"): ..."""
+    return TableQuery("clients", CLIENT_COLUMNS.split(", "), lambda rows: [Client.from_row(row) for row in rows],
+                      order_by, descending, page_size, filters)
+
+
+def query_products(order_by: str = "product_id", descending: bool = False, page_size: int = QUERY_PAGE_SIZE,
+                   **filters) -> TableQuery:
+    """Запрос товаров: query_products(order_by="price", price__lt=100)"""
+    columns = PRODUCT_COLUMNS.split(", ")
+    return TableQuery("products", columns, lambda rows: [Product.from_row(row) for row in rows],
+                      order_by, descending, page_size, filters,
+                      sortable=[column for column in columns if column != "description"])
+
+
+def query_orders(order_by: str = "order_id", descending: bool = False, page_size: int = QUERY_PAGE_SIZE,
+                 **filters) -> TableQuery:
+    """
+    Запрос заказов: query_orders(client_id=5, order_date__ge="2024-01-01").
+    Строки: (order_id, client_id, order_date, status); при итерации каждая страница
+    догружается с клиентами и товарами за постоянное число запросов.
+    """
+    return TableQuery("orders", ["order_id", "client_id", "order_date", "status"],
+                      lambda rows: get_orders_by_ids([row[0] for row in rows]),
+                      order_by, descending, page_size, filters)
+
+
+def iter_clients(**kwargs) -> Iterator[Client]:
+    return iter(query_clients(**kwargs))
+
+
+def iter_products(**kwargs) -> Iterator[Product]:
+    return iter(query_products(**kwargs))
+
+
+def iter_orders(**kwargs) -> Iterator[Order]:
+    return iter(query_orders(**kwargs))
+
+
+def _fetch_client_row(client_id: int) -> Optional[tuple]:
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM clients WHERE client_id = ?", (client_id,))
+        return cursor.fetchone()
+
+@profiled
+def get_client_by_id(client_id: int) -> Client:
+    row = read_cache.get_or_load(("client", client_id), lambda: _fetch_client_row(client_id))
 
     if row:
-        client_id, first_name, last_name, email, phone, address, registration_date = row
-        client = Client(first_name, last_name, email, phone, address)
-        client.client_id = client_id
-        client.registration_date = datetime.fromisoformat(registration_date)
-        conn.close()
-        return client
+        return Client.from_row(row)
     else:
-        conn.close()
         return None
 
-def get_products_by_order_id(order_id: int) -> List[Product]:
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT products.*
-        FROM products
-        JOIN order_products ON products.product_id = order_products.product_id
-        WHERE order_products.order_id = ?
-       """, (order_id,))
-    rows = cursor.fetchall()
-
-    products = []
-    for row in rows:
-        product_id, name, description, price = row
-        product = Product(name, description, price)
-        product.product_id = product_id
-        products.append(product)
-
-    conn.close()
-    return products
-
-def export_to_csv(filename: str):
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
-
-    tables = ['clients', 'products', 'orders', 'order_products']
-    for table in tables:
-        cursor.execute(f"SELECT * FROM {table}")
-        rows = cursor.fetchall()
+def _fetch_order_product_rows(order_id: int) -> List[tuple]:
+    with connection() as conn:
+        cursor = conn.cursor()
 
-        cursor.execute(f"PRAGMA table_info({table})")
-        columns_info = cursor.fetchall()
-        column_names = [column[1] for column in columns_info]
+        cursor.execute("""
+            SELECT products.*
+            FROM products
+            JOIN order_products ON products.product_id = order_products.product_id
+            WHERE order_products.order_id = ?
+           """, (order_id,))
+        return cursor.fetchall()
+
+@profiled
+def get_products_by_order_id(order_id: int) -> List[Product]:
+    rows = read_cache.get_or_load(
+        ("order_products", order_id), lambda: _fetch_order_product_rows(order_id),
+        tags=lambda rows: [("order", order_id)] + [("product", row[0]) for row in rows])
 
-        with open(f"{filename}_{table}.csv", 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(column_names)
-            writer.writerows(rows)
+    return [Product.from_row(row) for row in rows]
 
-    conn.close()
+EXPORT_BATCH_SIZE = 10000
+CSV_COMPRESSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}  # сжатие -> суффикс файла
 
-def import_from_csv(filename: str):
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
 
-    tables = ['clients', 'products', 'orders', 'order_products']
-    for table in tables:
+def _open_csv(path: str, mode: str, compression: Optional[str]):
+    """Открывает CSV в текстовом режиме, при необходимости через gzip/zstd."""
+    if compression is None:
+        return open(path, mode, newline='', encoding='utf-8')
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", newline='', encoding='utf-8')
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Для сжатия zstd установите пакет zstandard: pip install zstandard")
+        return io.TextIOWrapper(zstandard.open(path, mode + "b"), newline='', encoding='utf-8')
+    raise ValueError(f"Неизвестное сжатие {compression!r}, доступны: {list(CSV_COMPRESSIONS)}")
+
+
+def _read_only_connection(database: Optional[str] = None) -> sqlite3.Connection:
+    """Отдельное соединение только для чтения (для параллельных выгрузок и процессов аналитики)."""
+    uri = Path(database or database_name).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+
+def _export_table(table: str, path: str, compression: Optional[str], since_rowid: int,
+                  batch_size: int) -> Tuple[int, int]:
+    """
+    Пишет строки таблицы с rowid > since_rowid, читая курсор кусками fetchmany.
+    При since_rowid > 0 строки дописываются в существующий файл (если файла нет - выгружается всё).
+    Возвращает (число строк, максимальный выгруженный rowid).
+    """
+    append = since_rowid > 0 and os.path.exists(path)
+    if not append:
+        since_rowid = 0
+    conn = _read_only_connection()
+    try:
+        cursor = conn.execute(f"SELECT rowid, * FROM {table} WHERE rowid > ? ORDER BY rowid", (since_rowid,))
+        column_names = [column[0] for column in cursor.description[1:]]
+        count, last_rowid = 0, since_rowid
+
+        with _open_csv(path, 'a' if append else 'w', compression) as csvfile:
+            writer = csv.writer(csvfile)
+            if not append:
+                writer.writerow(column_names)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.writerows(row[1:] for row in rows)
+                count += len(rows)
+                last_rowid = rows[-1][0]
+    finally:
+        conn.close()
+    return count, last_rowid
+
+
+@profiled
+def export_to_csv(filename: str, compression: Optional[str] = None, parallel: bool = True,
+                  incremental: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Потоковая выгрузка таблиц в {filename}_{table}.csv[.gz|.zst].
+
+    Каждая таблица читается своим соединением только для чтения кусками по batch_size,
+    так что память не зависит от размера таблицы; при parallel=True таблицы
+    выгружаются одновременно в пуле потоков (таблицы читаются в разных транзакциях).
+
+    compression - None, "gzip" или "zstd" (нужен пакет zstandard).
+    incremental=True дописывает только строки, добавленные после прошлой выгрузки:
+    максимальный rowid каждой таблицы хранится в {filename}_watermark.json.
+    Изменения и удаления уже выгруженных строк инкрементальный режим не отслеживает.
+
+    Возвращает число выгруженных строк по таблицам.
+    """
+    if compression not in CSV_COMPRESSIONS:
+        raise ValueError(f"Неизвестное сжатие {compression!r}, доступны: {list(CSV_COMPRESSIONS)}")
+    if compression == "zstd":
+        _open_csv(os.devnull, 'w', compression).close()  # проверяем наличие zstandard до запуска потоков
+
+    watermark_path = f"{filename}_watermark.json"
+    watermarks: Dict[str, int] = {}
+    if incremental and os.path.exists(watermark_path):
+        with open(watermark_path, encoding='utf-8') as f:
+            watermarks = json.load(f)
+
+    jobs = {table: (table, f"{filename}_{table}.csv{CSV_COMPRESSIONS[compression]}", compression,
+                    watermarks.get(table, 0) if incremental else 0, batch_size)
+            for table in TABLES}
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = {table: executor.submit(_export_table, *args) for table, args in jobs.items()}
+            results = {table: future.result() for table, future in futures.items()}
+    else:
+        results = {table: _export_table(*args) for table, args in jobs.items()}
+
+    with open(watermark_path, 'w', encoding='utf-8') as f:
+        json.dump({table: last_rowid for table, (_, last_rowid) in results.items()}, f)
+
+    return {table: count for table, (count, _) in results.items()}
+
+SNAPSHOT_FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}  # формат снимка -> суффикс частей
+SNAPSHOT_WATERMARK = "watermark.json"
+# объявленный тип колонки SQLite -> тип Arrow; остальные колонки (TEXT, даты) - строки
+SNAPSHOT_TYPES = {"INTEGER": "int64", "REAL": "float64"}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Для снимков установите пакет pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def _snapshot_parts(folder: str, extension: str) -> List[str]:
+    """Части таблицы снимка по порядку выгрузки (part-00000, part-00001, ...)."""
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.startswith("part-") and name.endswith(extension)]
+
+
+def _snapshot_writer(path: str, schema, fmt: str):
+    """Писатель части снимка: write_batch(RecordBatch), close()."""
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(path, schema)
+    return _import_pyarrow().ipc.new_file(path, schema)
+
+
+def _snapshot_table(table: str, directory: str, fmt: str, since_rowid: int,
+                    batch_size: int) -> Tuple[int, int]:
+    """
+    Пишет строки таблицы с rowid > since_rowid новой частью {directory}/{table}/part-NNNNN.
+    since_rowid = 0 - полный снимок: части прошлых выгрузок заменяются одной новой.
+    Часть пишется во временный файл и переименовывается, когда записана целиком.
+    Возвращает (число строк, максимальный выгруженный rowid).
+    """
+    pa = _import_pyarrow()
+    folder = os.path.join(directory, table)
+    os.makedirs(folder, exist_ok=True)
+    parts = _snapshot_parts(folder, SNAPSHOT_FORMATS[fmt])
+    if not parts:
+        since_rowid = 0
+    path = os.path.join(folder, f"part-{len(parts) if since_rowid else 0:05d}{SNAPSHOT_FORMATS[fmt]}")
+    conn = _read_only_connection()
+    writer = None
+    try:
+        columns = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        schema = pa.schema([(name, getattr(pa, SNAPSHOT_TYPES.get(declared.upper(), "string"))())
+                            for _, name, declared, *_ in columns])
+        cursor = conn.execute(f"SELECT rowid, {', '.join(schema.names)} FROM {table} WHERE rowid > ? ORDER BY rowid",
+                              (since_rowid,))
+        count, last_rowid = 0, since_rowid
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if writer is None:
+                writer = _snapshot_writer(path + ".tmp", schema, fmt)
+            columns = list(zip(*rows))[1:]
+            writer.write_batch(pa.record_batch([pa.array(column, type=field.type)
+                                                for column, field in zip(columns, schema)], schema=schema))
+            count += len(rows)
+            last_rowid = rows[-1][0]
+        if writer is None and not since_rowid:
+            writer = _snapshot_writer(path + ".tmp", schema, fmt)  # пустая таблица: часть без строк хранит схему
+    finally:
+        conn.close()
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        if not since_rowid:
+            for old in _snapshot_parts(folder, SNAPSHOT_FORMATS[fmt]):
+                os.remove(old)
+        os.replace(path + ".tmp", path)
+    return count, last_rowid
+
+
+@profiled
+def export_snapshot(directory: str, format: str = "arrow", incremental: bool = False, parallel: bool = True,
+                    batch_size: int = EXPORT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Колоночный снимок таблиц в каталог directory: {directory}/{table}/part-NNNNN.arrow|.parquet.
+
+    format = "arrow" (Arrow IPC: читается через memory_map без копирования) или
+    "parquet" (меньше на диске, при чтении распаковывается); нужен пакет pyarrow.
+    Как и export_to_csv, таблицы читаются кусками соединениями только для чтения,
+    при parallel=True - одновременно в пуле потоков.
+    incremental=True дописывает новой частью только строки, добавленные после прошлого
+    снимка (максимальные rowid хранятся в {directory}/watermark.json); изменения и
+    удаления уже выгруженных строк не отслеживаются - для них нужен полный снимок.
+
+    Возвращает число выгруженных строк по таблицам.
+    """
+    if format not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Неизвестный формат снимка {format!r}, доступны: {list(SNAPSHOT_FORMATS)}")
+    _import_pyarrow()
+
+    watermark_path = os.path.join(directory, SNAPSHOT_WATERMARK)
+    watermarks: Dict[str, int] = {}
+    if incremental and os.path.exists(watermark_path):
+        with open(watermark_path, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous["format"] != format:
+            raise ValueError(f"Снимок в {directory} записан в формате {previous['format']!r}, а не {format!r}")
+        watermarks = previous["watermarks"]
+
+    os.makedirs(directory, exist_ok=True)
+    jobs = {table: (table, directory, format, watermarks.get(table, 0), batch_size) for table in TABLES}
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = {table: executor.submit(_snapshot_table, *args) for table, args in jobs.items()}
+            results = {table: future.result() for table, future in futures.items()}
+    else:
+        results = {table: _snapshot_table(*args) for table, args in jobs.items()}
+
+    with open(watermark_path, 'w', encoding='utf-8') as f:
+        json.dump({"format": format, "watermarks": {table: last_rowid for table, (_, last_rowid) in results.items()}}, f)
+
+    return {table: count for table, (count, _) in results.items()}
+
+
+class Snapshot:
+    """
+    Снимок, выгруженный export_snapshot. Таблицы читаются при первом обращении и
+    запоминаются: части Arrow IPC отображаются в память без копирования, части
+    Parquet читаются с распаковкой; несколько частей - одна pyarrow.Table из нескольких кусков.
+
+    directory = каталог снимка str
+    format = формат частей ("arrow" или "parquet") str
+    watermarks = максимальный выгруженный rowid по таблицам dict
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, SNAPSHOT_WATERMARK), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.format = meta["format"]
+        self.watermarks: Dict[str, int] = meta["watermarks"]
+        self._tables = {}
+
+    def table(self, name: str):
+        """Таблица снимка (pyarrow.Table)."""
+        if name not in self._tables:
+            pa = _import_pyarrow()
+            parts = _snapshot_parts(os.path.join(self.directory, name), SNAPSHOT_FORMATS[self.format])
+            if not parts:
+                raise KeyError(f"В снимке {self.directory} нет таблицы {name}")
+            if self.format == "parquet":
+                import pyarrow.parquet as pq
+                tables = [pq.read_table(path, memory_map=True) for path in parts]
+            else:
+                tables = [pa.ipc.open_file(pa.memory_map(path)).read_all() for path in parts]
+            self._tables[name] = pa.concat_tables(tables)
+        return self._tables[name]
+
+    def column(self, table: str, name: str):
+        """Колонка как numpy-массив (числовая колонка из одного куска - без копирования)."""
+        return self.table(table).column(name).to_numpy()
+
+    def to_pandas(self, table: str, columns: Optional[List[str]] = None):
+        """Таблица или её колонки в pandas.DataFrame."""
+        return self.table(table).select(columns or self.table(table).column_names).to_pandas()
+
+    def row_counts(self) -> Dict[str, int]:
+        return {table: self.table(table).num_rows for table in TABLES}
+
+
+def open_snapshot(directory: str) -> Snapshot:
+    """Открывает снимок, выгруженный export_snapshot (таблицы читаются лениво)."""
+    return Snapshot(directory)
+
+IMPORT_BATCH_SIZE = 10000
+IMPORT_CONFLICT_MODES = ("REPLACE", "IGNORE", "ABORT")
+# форматы колонок, проверяемые при импорте: таблица -> колонка -> шаблон
+IMPORT_RULES = {
+    "clients": {"email": EMAIL_RE, "phone": PHONE_RE},
+}
+REJECTED_SUFFIX = ".rejected.csv"  # {filename}_{table}.rejected.csv - отклонённые строки и причины
+
+
+def _table_columns(cursor: sqlite3.Cursor, table: str) -> List[str]:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in cursor.fetchall()]
+
+
+def _primary_key(cursor: sqlite3.Cursor, table: str) -> Optional[str]:
+    """Колонка первичного ключа таблицы; None для составного ключа."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    keys = [column[1] for column in cursor.fetchall() if column[5]]
+    return keys[0] if len(keys) == 1 else None
+
+
+def _foreign_keys(cursor: sqlite3.Cursor, table: str) -> Dict[str, Tuple[str, str]]:
+    """Внешние ключи таблицы: колонка -> (родительская таблица, колонка родителя)."""
+    cursor.execute(f"PRAGMA foreign_key_list({table})")
+    return {row[3]: (row[2], row[4] or _primary_key(cursor, row[2])) for row in cursor.fetchall()}
+
+
+def _reject_orphans(cursor: sqlite3.Cursor, header: List[str], rows: List[list],
+                    foreign_keys: Dict[str, Tuple[str, str]]) -> Tuple[List[list], List[tuple]]:
+    """
+    Отделяет строки куска, чей внешний ключ не найден в родительской таблице.
+    Родительские таблицы импортируются раньше, поэтому в них уже есть и старые строки БД,
+    и принятые строки CSV этого импорта. На колонку - один anti-join по значениям куска
+    из JSON-массива. Возвращает (подходящие строки, [(строка, причина), ...]).
+    """
+    reasons = {}
+    for column, (parent, parent_key) in foreign_keys.items():
+        if column not in header or not rows:
+            continue
+        index = header.index(column)
+        missing = {row[0] for row in cursor.execute(f"""
+            SELECT DISTINCT value FROM json_each(?)
+            WHERE NOT EXISTS (SELECT 1 FROM {parent} WHERE {parent_key} = value)
+        """, (json.dumps([row[index] for row in rows]),))}
+        for i, row in enumerate(rows):
+            if row[index] in missing:
+                reasons.setdefault(i, f"{column}: нет строки {parent}.{parent_key} = {row[index]}")
+    if not reasons:
+        return rows, []
+    return [row for i, row in enumerate(rows) if i not in reasons], [(rows[i], reasons[i]) for i in sorted(reasons)]
+
+
+def _write_rejected(path: str, header: List[str], rejected: List[tuple], append: bool):
+    """Дописывает отклонённые строки с причиной в колонке error (отклонения редки - файл открывается на кусок)."""
+    with open(path, 'a' if append else 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        if not append:
+            writer.writerow(header + ["error"])
+        # короткие строки дополняются, чтобы причина оказалась в колонке error
+        writer.writerows(row + [""] * (len(header) - len(row)) + [reason] for row, reason in rejected)
+
+
+def _drop_secondary_indexes(cursor: sqlite3.Cursor, tables: List[str]) -> List[str]:
+    """Удаляет пользовательские индексы таблиц и возвращает их DDL для пересоздания."""
+    placeholders = ", ".join("?" * len(tables))
+    cursor.execute(f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, tables)
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+    return [sql for _, sql in indexes]
+
+
+@profiled
+def import_from_csv(filename: str, batch_size: int = IMPORT_BATCH_SIZE,
+                    progress: Optional[Callable[[str, int], None]] = None,
+                    on_conflict: str = "REPLACE", validate: bool = True) -> Dict[str, int]:
+    """
+    Потоковый импорт {filename}_{table}.csv (или .csv.gz/.csv.zst) в одной транзакции.
+
+    Файл читается кусками по batch_size строк и пишется через executemany,
+    поэтому память не растёт с размером файла. Колонки берутся из заголовка CSV,
+    так что client_id/order_id/product_id из файла сохраняются и внешние ключи
+    не ломаются. На время импорта включаются synchronous=OFF и WAL, вторичные
+    индексы, полнотекстовый индекс, триггеры счётчиков строк и сводных таблиц
+    удаляются, а в конце строятся (пересчитываются) заново.
+
+    progress(table, rows_done) вызывается после каждого куска.
+    on_conflict - что делать со строками, чей ID уже есть в БД: REPLACE, IGNORE или ABORT.
+    validate - проверять куски пакетно (validate_rows по IMPORT_RULES и числу полей).
+    Неподходящие строки не прерывают импорт, а пишутся с причиной в
+    {filename}_{table}.rejected.csv; строки, ссылающиеся на отклонённые
+    (заказы отклонённого клиента и т.п.) или на ID, которых нет ни в БД, ни среди
+    принятых строк CSV (_reject_orphans), тоже отклоняются - иначе транзакция
+    упала бы на внешнем ключе при COMMIT.
+    Возвращает число импортированных строк по таблицам и "{table}.rejected" -
+    число отклонённых, если они были.
+    """
+    on_conflict = on_conflict.upper()
+    if on_conflict not in IMPORT_CONFLICT_MODES:
+        raise ValueError(f"on_conflict должен быть одним из {IMPORT_CONFLICT_MODES}")
+
+    counts: Dict[str, int] = {}
+    rejected_keys: Dict[str, set] = {}  # таблица -> ID отклонённых строк (как в CSV)
+    with connection() as conn:
+        cursor = conn.cursor()
+        synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA journal_mode = WAL")
         try:
-            with open(f"{filename}_{table}.csv", 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile)
-                header = next(reader)
-                for row in reader:
-                    if table == 'clients':
-                        cursor.execute("""
-                            INSERT INTO clients (first_name, last_name, email, phone, address, registration_date)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, row)
-                    elif table == 'products':
-                        cursor.execute("""
-                            INSERT INTO products (name, description, price)
-                            VALUES (?, ?, ?)
-                        """, row)
-                    elif table == 'orders':
-                        cursor.execute("""
-                            INSERT INTO orders (client_id, order_date, status)
-                            VALUES (?, ?, ?)
-                        """, row)
-                    elif table == 'order_products':
-                        cursor.execute("""
-                            INSERT INTO order_products (order_id, product_id)
-                            VALUES (?, ?)
-                        """, row)
-        except FileNotFoundError:
-            print(f"Файл {filename}_{table}.csv не найден, пропускаем")
-
-    conn.commit()
-    conn.close()
-
-# Инициализация базы данных при импорте
-create_tables()
+            cursor.execute("BEGIN")  # DDL (удаление/создание индексов) тоже должен откатываться
+            # при REPLACE родительская строка временно удаляется - проверку ключей откладываем до COMMIT
+            cursor.execute("PRAGMA defer_foreign_keys = ON")
+            index_sql = _drop_secondary_indexes(cursor, TABLES)
+            had_search_index = _has_search_index(cursor)
+            if had_search_index:
+                drop_search_index(cursor)
+            # счётчики строк и сводные таблицы пересчитываются один раз в конце
+            drop_count_triggers(cursor)
+            drop_aggregate_triggers(cursor)
+
+            for table in TABLES:
+                for compression, suffix in CSV_COMPRESSIONS.items():
+                    if os.path.exists(f"{filename}_{table}.csv{suffix}"):
+                        csvfile = _open_csv(f"{filename}_{table}.csv{suffix}", 'r', compression)
+                        break
+                else:
+                    print(f"Файл {filename}_{table}.csv не найден, пропускаем")
+                    continue
+
+                with csvfile:
+                    reader = csv.reader(csvfile)
+                    header = next(reader, None)
+                    if not header:
+                        continue
+                    unknown = set(header) - set(_table_columns(cursor, table))
+                    if unknown:
+                        raise ValueError(f"{filename}_{table}.csv: неизвестные колонки {sorted(unknown)}")
+
+                    sql = (f"INSERT OR {on_conflict} INTO {table} ({', '.join(header)}) "
+                           f"VALUES ({', '.join('?' * len(header))})")
+                    rules = IMPORT_RULES.get(table)
+                    foreign_keys = _foreign_keys(cursor, table)
+                    references = {column: rejected_keys[parent]
+                                  for column, (parent, _) in foreign_keys.items()
+                                  if parent in rejected_keys}
+                    key = _primary_key(cursor, table)
+                    key_index = header.index(key) if key in header else None
+                    rejected_path = f"{filename}_{table}{REJECTED_SUFFIX}"
+                    if validate and os.path.exists(rejected_path):
+                        os.remove(rejected_path)  # отчёт прошлого импорта
+                    counts[table] = 0
+                    while True:
+                        batch = list(islice(reader, batch_size))
+                        if not batch:
+                            break
+                        if validate:
+                            batch, rejected = validate_rows(header, batch, rules, references)
+                            batch, orphans = _reject_orphans(cursor, header, batch, foreign_keys)
+                            rejected += orphans
+                            if rejected:
+                                rejected_count = counts.get(f"{table}.rejected", 0)
+                                _write_rejected(rejected_path, header, rejected, append=rejected_count > 0)
+                                counts[f"{table}.rejected"] = rejected_count + len(rejected)
+                                if key_index is not None:
+                                    rejected_keys.setdefault(table, set()).update(
+                                        row[key_index] for row, _ in rejected if len(row) > key_index)
+                        cursor.executemany(sql, batch)
+                        counts[table] += len(batch)
+                        if progress:
+                            progress(table, counts[table])
+
+            for sql in index_sql:
+                cursor.execute(sql)
+            if had_search_index:
+                create_search_index(cursor)
+            create_count_triggers(cursor)
+            refresh_row_counts(cursor)
+            fill_purchase_prices(cursor)
+            create_aggregate_triggers(cursor)
+            refresh_aggregates(cursor)
+            conn.commit()
+            read_cache.clear()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute(f"PRAGMA synchronous = {synchronous}")
+
+    return counts
+
+_initialized = set()  # базы, для которых init_db уже выполнен в этом процессе
+
+
+def init_db(database: Optional[str] = None):
+    """
+    Однократная инициализация БД при запуске приложения: выбор файла и миграция схемы.
+    Импорт модуля db больше не обращается к диску - init_db вызывается явно (см. main.py).
+    """
+    if database is not None and database != database_name:
+        configure_pool(pool_size, database)
+    if database_name not in _initialized:
+        create_tables()
+        _initialized.add(database_name)
@@ -1,14 +1,91 @@
+import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 from typing import List
 
 from db import (
-    add_client, get_all_clients, delete_client, update_client, search_clients,
+    add_client, query_clients, delete_clients, search_clients_ranked, FTS_MIN_QUERY,
     export_to_csv, import_from_csv,
-    add_product, get_all_products, delete_product
+    add_product, query_products, delete_products, close_pool,
+    enable_profiling, disable_profiling
 )
+from jobs import JobExecutor
 from models import Client, Product
+from profiler import profiler
+from widgets import VirtualTreeview
+from write_buffer import close_write_buffer
+
+SEARCH_PAGE_SIZE = 500  # сколько лучших совпадений показывать в таблице клиентов
+LIVE_SEARCH_DELAY_MS = 150  # пауза после последнего нажатия клавиши перед живым поиском
+LIVE_SEARCH_LIMIT = 20000  # до скольких совпадений результат держится в памяти для уточнения
+JOBS_SHUTDOWN_TIMEOUT = 30.0  # сколько секунд при закрытии ждать выполняющиеся фоновые задачи
+
+
+def client_row(client: Client) -> tuple:
+    """Значения строки таблицы клиентов."""
+    return (
+        client.client_id,
+        client.first_name,
+        client.last_name,
+        client.email,
+        client.phone,
+        client.address,
+        client.registration_date.strftime("%Y-%m-%d")
+    )
+
+
+class IncrementalSearch:
+    """
+    Результат живого поиска клиентов, который уточняется в памяти.
+
+    Поиск - по подстроке в имени, фамилии, email, телефоне и адресе. Если новый
+    запрос содержит предыдущий (пользователь допечатал символы), все его совпадения
+    уже есть среди загруженных строк, и они просто фильтруются без обращения к БД.
+    Это верно, только пока прошлый результат полный (не обрезан лимитом) и найден
+    через FTS: запросы короче FTS_MIN_QUERY ищутся LIKE, который не приводит
+    к одному регистру кириллицу, поэтому их результат не уточняется в памяти.
+    """
+
+    def __init__(self, limit: int = LIVE_SEARCH_LIMIT) :
+        self.limit = limit
+        self.clear()
+
+    def clear(self) :
+        self.query = None
+        self.complete = False
+        self._rows = []  # (строка полей поиска в нижнем регистре, строка таблицы)
+
+    def can_refine(self, text: str) -> bool:
+        return self.complete and self.query is not None and self.query in text.lower()
+
+    def load(self, text: str, rows: List[tuple]) :
+        """Запоминает результат запроса к БД (rows - строки таблицы, не больше limit + 1)."""
+        self.query = text.lower()
+        self.complete = len(rows) <= self.limit and len(text) >= FTS_MIN_QUERY
+        rows = rows[:self.limit]
+        self._rows = [("\x00".join(row[1:6]).lower(), row) for row in rows]
+
+    def refine(self, text: str) -> List[tuple]:
+        """Фильтрует загруженные строки по уточнённому запросу (порядок сохраняется)."""
+        needle = text.lower()
+        self._rows = [item for item in self._rows if needle in item[0]]
+        self.query = needle
+        return [row for _, row in self._rows]
+
+    @property
+    def rows(self) -> List[tuple]:
+        return [row for _, row in self._rows]
+
+
+def product_row(product: Product) -> tuple:
+    """Значения строки таблицы товаров."""
+    return (
+        product.product_id,
+        product.name,
+        product.description,
+        product.price
+    )
 
 
 class MainApplication(tk.Tk) :
@@ -21,6 +98,13 @@ class MainApplication(tk.Tk) :
         self.title("GIU Inet-shop")
         self.geometry("1000x700")
 
+        # Все операции с БД выполняются в фоне, результаты применяются через after()
+        self.jobs = JobExecutor(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.incremental_search = IncrementalSearch()
+        self.search_after_id = None
+
         # Создаем вкладки
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(fill=tk.BOTH, expand=True)
@@ -29,16 +113,25 @@ class MainApplication(tk.Tk) :
         self.clients_frame = ttk.Frame(self.notebook)
         self.products_frame = ttk.Frame(self.notebook)
         self.data_frame = ttk.Frame(self.notebook)
+        self.stats_frame = ttk.Frame(self.notebook)
+        self.diagnostics_frame = ttk.Frame(self.notebook)
 
         # Добавляем вкладки
         self.notebook.add(self.clients_frame, text="Клиенты")
         self.notebook.add(self.products_frame, text="Товары")
+        self.notebook.add(self.stats_frame, text="Статистика")
         self.notebook.add(self.data_frame, text="Данные")
+        self.notebook.add(self.diagnostics_frame, text="Диагностика")
 
         # Инициализируем вкладки
         self.init_clients_tab()
         self.init_products_tab()
         self.init_data_tab()
+        self.init_diagnostics_tab()
+
+        # Вкладка статистики строится при первом открытии: модули аналитики грузятся только тогда
+        self.stats_initialized = False
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
     def init_clients_tab(self) :
         """Инициализация вкладки клиентов."""
@@ -53,6 +146,9 @@ class MainApplication(tk.Tk) :
         self.export_csv_btn = tk.Button(control_frame, text="Экспорт в CSV", command=self.export_csv)
         self.export_csv_btn.pack(side=tk.LEFT, padx=5)
 
+        self.cancel_btn = tk.Button(control_frame, text="Отменить операцию", command=self.cancel_jobs)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+
         # Поля ввода для клиента
         input_frame = ttk.Frame(self.clients_frame)
         input_frame.pack(pady=10)
@@ -82,6 +178,8 @@ class MainApplication(tk.Tk) :
 
         self.search_entry = tk.Entry(search_frame, width=30)
         self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Return>", lambda event : self.search_clients())
 
         self.search_btn = tk.Button(search_frame, text="Найти", command=self.search_clients)
         self.search_btn.pack(side=tk.LEFT)
@@ -93,20 +191,15 @@ class MainApplication(tk.Tk) :
         tree_frame = ttk.Frame(self.clients_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        self.tree = ttk.Treeview(tree_frame,
-                                 columns=("ID", "Имя", "Фамилия", "Email", "Телефон", "Адрес", "Дата регистрации"),
-                                 show='headings', height=15)
-
+        # Таблица с виртуальной прокруткой: строки подгружаются из БД страницами
         columns = ["ID", "Имя", "Фамилия", "Email", "Телефон", "Адрес", "Дата регистрации"]
+        self.tree = VirtualTreeview(tree_frame, columns=columns, height=15)
+
         for col in columns :
             self.tree.heading(col, text=col)
             self.tree.column(col, width=100)
 
-        # Scrollbar для таблицы
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.pack(fill=tk.BOTH, expand=True)
 
         # Кнопки редактирования/удаления
         edit_frame = ttk.Frame(self.clients_frame)
@@ -158,18 +251,14 @@ class MainApplication(tk.Tk) :
         tree_frame = ttk.Frame(self.products_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        self.products_tree = ttk.Treeview(tree_frame, columns=("ID", "Название", "Описание", "Цена"), show='headings',
-                                          height=15)
-
         columns = ["ID", "Название", "Описание", "Цена"]
+        self.products_tree = VirtualTreeview(tree_frame, columns=columns, height=15)
+
         for col in columns :
             self.products_tree.heading(col, text=col)
             self.products_tree.column(col, width=100)
 
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.products_tree.yview)
-        self.products_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.products_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.products_tree.pack(fill=tk.BOTH, expand=True)
 
         # Кнопки редактирования/удаления
         edit_frame = ttk.Frame(self.products_frame)
@@ -208,28 +297,204 @@ class MainApplication(tk.Tk) :
         info_label = tk.Label(info_frame, text=info_text, justify=tk.LEFT)
         info_label.pack()
 
-    def load_clients(self) :
-        """Загрузка клиентов из базы данных."""
+    def on_tab_changed(self, event) :
+        """Ленивая инициализация вкладки статистики, обновление диагностики при открытии."""
+        if not self.stats_initialized and self.notebook.select() == str(self.stats_frame) :
+            self.stats_initialized = True
+            self.init_stats_tab()
+        if self.notebook.select() == str(self.diagnostics_frame) :
+            self.refresh_diagnostics()
+
+    def init_diagnostics_tab(self) :
+        """Вкладка диагностики: профилировщик обращений к БД (по умолчанию выключен)."""
+        control_frame = ttk.Frame(self.diagnostics_frame)
+        control_frame.pack(pady=10)
+
+        self.profiling_var = tk.BooleanVar(value=profiler.enabled)
+        tk.Checkbutton(control_frame, text="Профилирование", variable=self.profiling_var,
+                       command=self.toggle_profiling).pack(side=tk.LEFT, padx=5)
+        tk.Button(control_frame, text="Обновить", command=self.refresh_diagnostics).pack(side=tk.LEFT, padx=5)
+        tk.Button(control_frame, text="Сбросить", command=self.reset_diagnostics).pack(side=tk.LEFT, padx=5)
+        tk.Button(control_frame, text="Экспорт JSON",
+                  command=lambda : self.export_diagnostics("json")).pack(side=tk.LEFT, padx=5)
+        tk.Button(control_frame, text="Экспорт Prometheus",
+                  command=lambda : self.export_diagnostics("prom")).pack(side=tk.LEFT, padx=5)
+
+        columns = ["Тип", "Имя", "Вызовов", "Всего мс", "Среднее мс", "p95 мс", "Макс мс", "Строк", "Ошибок"]
+        self.diagnostics_tree = ttk.Treeview(self.diagnostics_frame, columns=columns, show='headings', height=14)
+        for col in columns :
+            self.diagnostics_tree.heading(col, text=col)
+            self.diagnostics_tree.column(col, width=420 if col == "Имя" else 75, anchor=tk.W if col == "Имя" else tk.E)
+        self.diagnostics_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        tk.Label(self.diagnostics_frame, text="Медленные вызовы").pack(anchor=tk.W, padx=10)
+        slow_columns = ["Время", "Тип", "Имя", "мс"]
+        self.slow_tree = ttk.Treeview(self.diagnostics_frame, columns=slow_columns, show='headings', height=6)
+        for col in slow_columns :
+            self.slow_tree.heading(col, text=col)
+            self.slow_tree.column(col, width=600 if col == "Имя" else 90)
+        self.slow_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        self.diagnostics_status = tk.Label(self.diagnostics_frame, text="Профилирование выключено", bd=1,
+                                           relief=tk.SUNKEN, anchor=tk.W)
+        self.diagnostics_status.pack(side=tk.BOTTOM, fill=tk.X)
+
+    def toggle_profiling(self) :
+        if self.profiling_var.get() :
+            enable_profiling()
+        else :
+            disable_profiling()
+        self.refresh_diagnostics()
+
+    def reset_diagnostics(self) :
+        profiler.reset()
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self) :
+        """Показывает накопленные измерения: самые затратные по суммарному времени - сверху."""
+        snapshot = profiler.snapshot()
+        rows = [(kind, name, stats) for kind, key in (("функция", "functions"), ("SQL", "statements"))
+                for name, stats in snapshot[key].items()]
+        rows.sort(key=lambda row : row[2]["sum"], reverse=True)
+
+        self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+        for kind, name, stats in rows :
+            count = stats["count"]
+            self.diagnostics_tree.insert("", tk.END, values=(
+                kind, name, count, f"{stats['sum'] * 1000:.1f}",
+                f"{stats['sum'] / count * 1000:.3f}" if count else "-",
+                f"{stats['p95'] * 1000:.3f}", f"{stats['max'] * 1000:.3f}", stats["rows"], stats["errors"]))
+
+        self.slow_tree.delete(*self.slow_tree.get_children())
+        for entry in reversed(snapshot["slow_log"]) :
+            self.slow_tree.insert("", tk.END, values=(
+                datetime.fromtimestamp(entry["time"]).strftime("%H:%M:%S"), entry["kind"], entry["name"],
+                f"{entry['seconds'] * 1000:.1f}"))
+
+        state = "включено" if snapshot["enabled"] else "выключено"
+        self.diagnostics_status.config(
+            text=f"Профилирование {state}; открыто соединений: {snapshot['connections_opened']}; "
+                 f"порог медленных вызовов: {snapshot['slow_threshold'] * 1000:.0f} мс")
+
+    def export_diagnostics(self, fmt: str) :
+        """Сохраняет измерения в JSON или в текстовом формате Prometheus."""
+        extension = ".json" if fmt == "json" else ".prom"
+        filename = filedialog.asksaveasfilename(
+            title="Сохранить измерения профилировщика",
+            defaultextension=extension,
+            filetypes=[("JSON", "*.json")] if fmt == "json" else [("Prometheus", "*.prom"), ("Text", "*.txt")]
+        )
+        if filename :
+            try :
+                with open(filename, "w", encoding="utf-8") as f :
+                    f.write(profiler.to_json() if fmt == "json" else profiler.to_prometheus())
+            except OSError as e :
+                messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {str(e)}")
+
+    def init_stats_tab(self) :
+        """Инициализация вкладки статистики."""
+        import analysis
+
+        self.analysis = analysis
+
+        control_frame = ttk.Frame(self.stats_frame)
+        control_frame.pack(pady=10)
+
+        self.top_clients_btn = tk.Button(control_frame, text="Топ-5 клиентов", command=self.show_top_clients)
+        self.top_clients_btn.pack(side=tk.LEFT, padx=5)
+
+        self.order_dynamics_btn = tk.Button(control_frame, text="Динамика заказов", command=self.show_order_dynamics)
+        self.order_dynamics_btn.pack(side=tk.LEFT, padx=5)
+
+        columns = ["ID", "Имя", "Фамилия", "Заказов"]
+        self.stats_tree = ttk.Treeview(self.stats_frame, columns=columns, show='headings', height=10)
+        for col in columns :
+            self.stats_tree.heading(col, text=col)
+            self.stats_tree.column(col, width=120)
+        self.stats_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        self.stats_status = tk.Label(self.stats_frame, text="Статус: Готов", bd=1, relief=tk.SUNKEN, anchor=tk.W)
+        self.stats_status.pack(side=tk.BOTTOM, fill=tk.X)
+
+    def show_top_clients(self) :
+        """Топ-5 клиентов по количеству заказов."""
+        self.stats_status.config(text="Статус: Расчёт ⏳")
+
+        def done(top) :
+            self.stats_tree.delete(*self.stats_tree.get_children())
+            for row in top.itertuples(index=False) :
+                self.stats_tree.insert("", tk.END, values=(row.customer_id, row.first_name, row.last_name,
+                                                           row.order_count))
+            self.stats_status.config(text="Статус: Готово ✅")
+
+        self.run_job("Топ клиентов", lambda job : self.analysis.top_customers_by_orders(5), on_done=done,
+                     error_text="Не удалось посчитать статистику", group="stats")
+
+    def show_order_dynamics(self) :
+        """График динамики заказов (matplotlib работает только в потоке Tk)."""
         try :
-            for item in self.tree.get_children() :
-                self.tree.delete(item)
-
-            clients = get_all_clients()
-            for client in clients :
-                self.tree.insert("", tk.END, values=(
-                    client.client_id,
-                    client.first_name,
-                    client.last_name,
-                    client.email,
-                    client.phone,
-                    client.address,
-                    client.registration_date.strftime("%Y-%m-%d")
-                ))
-
-            self.status_bar.config(text=f"Статус: Загружено {len(clients)} клиентов ✅")
+            self.analysis.plot_order_dynamics()
         except Exception as e :
-            messagebox.showerror("Ошибка", f"Не удалось загрузить клиентов: {str(e)}")
-            self.status_bar.config(text="Статус: Ошибка загрузки клиентов ❌")
+            messagebox.showerror("Ошибка", f"Не удалось построить график: {str(e)}")
+
+    def run_job(self, name: str, func, *args, on_done=None, error_text: str = "Ошибка", group=None,
+                progress: bool = False, on_error=None) :
+        """
+        Запускает func(job, *args) в фоновом потоке.
+        on_done(result) вызывается в потоке Tk, ошибка показывается в messagebox и в строке статуса
+        (или передаётся в on_error(e), если он указан).
+        progress=True - сообщения job.report() выводятся в строку статуса.
+        """
+        def show_error(e) :
+            messagebox.showerror("Ошибка", f"{error_text}: {str(e)}")
+            self.status_bar.config(text=f"Статус: {error_text} ❌")
+
+        def on_progress(message) :
+            self.status_bar.config(text=f"Статус: {message} ⏳")
+
+        return self.jobs.submit(name, func, *args, on_done=on_done, on_error=on_error or show_error,
+                                on_progress=on_progress if progress else None, group=group)
+
+    def page_error(self, e) :
+        """Страница таблицы не загрузилась в фоне - строки остаются с заглушкой, ошибка в строке статуса."""
+        self.status_bar.config(text=f"Статус: Не удалось загрузить строки таблицы: {str(e)} ❌")
+
+    def cancel_jobs(self) :
+        """Отмена длительных операций (импорт, экспорт, поиск)."""
+        self.jobs.cancel_all()
+        self.status_bar.config(text="Статус: Операция отменена")
+
+    def on_close(self) :
+        """Закрытие окна: останавливаем фоновые задачи и закрываем соединения с БД."""
+        self.withdraw()  # окно пропадает сразу, пока дожидаемся задач
+        # задачи отменяются; выполняющиеся (импорт, экспорт, снимок) ещё держат соединения пула
+        stopped = self.jobs.shutdown(wait=True, timeout=JOBS_SHUTDOWN_TIMEOUT)
+        close_write_buffer()  # отложенные записи фиксируются до закрытия соединений
+        if self.stats_initialized :
+            self.analysis.close_parallel()  # процессы параллельной аналитики
+        if stopped :
+            close_pool()
+        # иначе соединения не закрываем под работающей задачей - их закроет выход из процесса
+        self.destroy()
+
+    def load_clients(self) :
+        """Загрузка клиентов из базы данных."""
+        self.status_bar.config(text="Статус: Загрузка клиентов ⏳")
+        self.incremental_search.clear()
+
+        # страницы читаются keyset-пагинацией, число строк берётся из счётчика в БД
+        query = query_clients(page_size=self.tree.page_size)
+
+        def done(total) :
+            # страницы читаются в фоне - перетаскивание полосы прокрутки не подвешивает окно
+            self.tree.set_source(total, lambda offset, limit : [client_row(client) for client in
+                                                                query.page_at(offset, limit)],
+                                 jobs=self.jobs, on_error=self.page_error)
+            self.status_bar.config(text=f"Статус: Загружено {total} клиентов ✅")
+
+        # поиск и загрузка пишут в одну таблицу - новая операция отменяет предыдущую
+        self.run_job("Загрузка клиентов", lambda job : query.count(), on_done=done,
+                     error_text="Не удалось загрузить клиентов", group="clients_view")
 
     def add_client(self) :
         """Добавляет нового клиента."""
@@ -244,11 +509,10 @@ class MainApplication(tk.Tk) :
             self.status_bar.config(text="Статус: Ошибка - не все поля заполнены ❌")
             return
 
-        try :
-            client = Client(first_name, last_name, email, phone, address)
-            client.registration_date = datetime.now()
-            add_client(client)
+        client = Client(first_name, last_name, email, phone, address)
+        client.registration_date = datetime.now()
 
+        def done(_) :
             # Очищаем поля
             for entry in [self.first_name_entry, self.last_name_entry, self.email_entry, self.phone_entry,
                           self.address_entry] :
@@ -256,18 +520,18 @@ class MainApplication(tk.Tk) :
 
             self.load_clients()
             self.status_bar.config(text="Статус: Клиент успешно добавлен ✅")
-        except Exception as e :
-            messagebox.showerror("Ошибка", f"Не удалось добавить клиента: {str(e)}")
-            self.status_bar.config(text="Статус: Ошибка добавления клиента ❌")
+
+        self.run_job("Добавление клиента", lambda job : add_client(client), on_done=done,
+                     error_text="Не удалось добавить клиента")
 
     def on_client_select(self, event) :
         """Обработка выбора клиента в таблице."""
         selection = self.tree.selection()
-        if selection :
-            self.edit_btn.config(state=tk.NORMAL)
+        self.edit_btn.config(state=tk.NORMAL if selection else tk.DISABLED)
+        # удалить можно и строки, выделенные и прокрученные за экран
+        if self.tree.selected_keys() :
             self.delete_btn.config(state=tk.NORMAL)
         else :
-            self.edit_btn.config(state=tk.DISABLED)
             self.delete_btn.config(state=tk.DISABLED)
 
     def edit_client(self) :
@@ -283,50 +547,91 @@ class MainApplication(tk.Tk) :
         messagebox.showinfo("Информация", f"Редактирование клиента ID {client_id}")
 
     def delete_client(self) :
-        """Удаление выбранного клиента."""
-        selection = self.tree.selection()
-        if not selection :
+        """Удаление выбранных клиентов вместе с их заказами."""
+        client_ids = [int(key) for key in self.tree.selected_keys()]
+        if not client_ids :
             return
 
-        item = self.tree.item(selection[0])
-        client_id = item['values'][0]
-
-        if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить этого клиента?") :
-            try :
-                delete_client(client_id)
+        question = (f"Удалить клиентов: {len(client_ids)}?" if len(client_ids) > 1
+                    else "Вы уверены, что хотите удалить этого клиента?")
+        if messagebox.askyesno("Подтверждение", f"{question}\nЗаказы клиентов тоже будут удалены.") :
+            def done(deleted) :
                 self.load_clients()
-                self.status_bar.config(text="Статус: Клиент успешно удален ✅")
-            except Exception as e :
-                messagebox.showerror("Ошибка", f"Не удалось удалить клиента: {str(e)}")
-                self.status_bar.config(text="Статус: Ошибка удаления клиента ❌")
+                self.status_bar.config(text=f"Статус: Удалено клиентов: {deleted['clients']}, "
+                                            f"заказов: {deleted.get('orders', 0)} ✅")
+
+            self.run_job("Удаление клиентов", lambda job : delete_clients(client_ids, cascade=True), on_done=done,
+                         error_text="Не удалось удалить клиентов")
+
+    def on_search_key(self, event) :
+        """Живой поиск: запрос выполняется через LIVE_SEARCH_DELAY_MS после последнего нажатия."""
+        if event.keysym in ("Return", "KP_Enter") :
+            return
+        if self.search_after_id is not None :
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(LIVE_SEARCH_DELAY_MS, self.live_search)
+
+    def live_search(self) :
+        """Поиск по мере ввода: уточнение фильтруется в памяти, иначе - запрос к БД в фоне."""
+        self.search_after_id = None
+        search_text = self.search_entry.get().strip()
+        if not search_text :
+            self.load_clients()
+            return
+        if search_text.lower() == self.incremental_search.query :
+            return
+
+        if self.incremental_search.can_refine(search_text) :
+            self.jobs.cancel_group("clients_view")  # устаревший запрос к БД не должен перезаписать таблицу
+            self.show_live_results(search_text, self.incremental_search.refine(search_text))
+            return
+
+        def work(job) :
+            # без нечёткого поиска: результат должен содержать все совпадения подстроки
+            clients = search_clients_ranked(search_text, limit=self.incremental_search.limit + 1, fuzzy=False)
+            return [client_row(client) for client in clients]
+
+        def done(rows) :
+            self.incremental_search.load(search_text, rows)
+            self.show_live_results(search_text, self.incremental_search.rows)
+
+        self.status_bar.config(text=f"Статус: Поиск '{search_text}' ⏳")
+        self.run_job("Поиск клиентов", work, on_done=done, error_text="Ошибка поиска", group="clients_view")
+
+    def show_live_results(self, search_text: str, rows: List[tuple]) :
+        self.tree.set_rows(rows, keep_selection=True)
+        if self.incremental_search.complete :
+            self.status_bar.config(text=f"Статус: Найдено {len(rows)} клиентов по запросу '{search_text}' ✅")
+        else :
+            self.status_bar.config(text=f"Статус: Показаны первые {len(rows)} совпадений по запросу '{search_text}' ✅")
 
     def search_clients(self) :
-        """Поиск клиентов."""
+        """Поиск клиентов (ранжированный, с нечётким поиском при отсутствии точных совпадений)."""
         search_text = self.search_entry.get().strip()
         if not search_text :
             self.load_clients()
             return
 
-        try :
-            for item in self.tree.get_children() :
-                self.tree.delete(item)
-
-            clients = search_clients(search_text)
-            for client in clients :
-                self.tree.insert("", tk.END, values=(
-                    client.client_id,
-                    client.first_name,
-                    client.last_name,
-                    client.email,
-                    client.phone,
-                    client.address,
-                    client.registration_date.strftime("%Y-%m-%d")
-                ))
-
-            self.status_bar.config(text=f"Статус: Найдено {len(clients)} клиентов по запросу '{search_text}' ✅")
-        except Exception as e :
-            messagebox.showerror("Ошибка", f"Ошибка поиска: {str(e)}")
-            self.status_bar.config(text="Статус: Ошибка поиска ❌")
+        if self.search_after_id is not None :
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        self.incremental_search.clear()  # нечёткие совпадения нельзя уточнять фильтром подстроки
+        self.status_bar.config(text=f"Статус: Поиск '{search_text}' ⏳")
+
+        def work(job) :
+            clients = search_clients_ranked(search_text, limit=SEARCH_PAGE_SIZE)
+            return [client_row(client) for client in clients]
+
+        def done(rows) :
+            self.tree.set_rows(rows)
+
+            if len(rows) == SEARCH_PAGE_SIZE :
+                self.status_bar.config(text=f"Статус: Показаны {len(rows)} лучших совпадений по запросу '{search_text}' ✅")
+            else :
+                self.status_bar.config(text=f"Статус: Найдено {len(rows)} клиентов по запросу '{search_text}' ✅")
+
+        # новый поиск отменяет ещё не завершившийся предыдущий
+        self.run_job("Поиск клиентов", work, on_done=done, error_text="Ошибка поиска", group="clients_view")
 
     def import_csv(self) :
         """Импорт данных из CSV."""
@@ -336,19 +641,25 @@ class MainApplication(tk.Tk) :
         )
 
         if filename :
-            try :
-                # Убираем расширение .csv если есть
-                if filename.endswith('.csv') :
-                    filename = filename[:-4]
+            # Убираем расширение .csv если есть
+            if filename.endswith('.csv') :
+                filename = filename[:-4]
+
+            def work(job) :
+                # прогресс идёт в строку статуса; отмена откатывает транзакцию импорта
+                return import_from_csv(filename, progress=lambda table, rows : job.report(
+                    f"Импорт {table}: {rows} строк"))
 
-                import_from_csv(filename)
+            def done(counts) :
                 self.load_clients()
                 self.load_products()
-                messagebox.showinfo("Успех", "Данные успешно импортированы из CSV файлов")
+                details = ", ".join(f"{table}: {count}" for table, count in counts.items())
+                if any(table.endswith(".rejected") for table in counts) :
+                    details += f"\nОтклонённые строки и причины: {filename}_<таблица>.rejected.csv"
+                messagebox.showinfo("Успех", f"Данные успешно импортированы из CSV файлов\n{details}")
                 self.status_bar.config(text="Статус: Импорт завершен успешно ✅")
-            except Exception as e :
-                messagebox.showerror("Ошибка", f"Ошибка импорта: {str(e)}")
-                self.status_bar.config(text="Статус: Ошибка импорта ❌")
+
+            self.run_job("Импорт CSV", work, on_done=done, error_text="Ошибка импорта", progress=True)
 
     def export_csv(self) :
         """Экспорт данных в CSV."""
@@ -359,34 +670,31 @@ class MainApplication(tk.Tk) :
         )
 
         if filename :
-            try :
-                # Убираем расширение .csv если есть
-                if filename.endswith('.csv') :
-                    filename = filename[:-4]
+            # Убираем расширение .csv если есть
+            if filename.endswith('.csv') :
+                filename = filename[:-4]
+
+            def work(job) :
+                job.report("Экспорт в CSV")
+                return export_to_csv(filename)
 
-                export_to_csv(filename)
+            def done(counts) :
                 messagebox.showinfo("Успех", f"Данные успешно экспортированы в CSV файлы с базовым именем {filename}")
                 self.status_bar.config(text="Статус: Экспорт завершен успешно ✅")
-            except Exception as e :
-                messagebox.showerror("Ошибка", f"Ошибка экспорта: {str(e)}")
-                self.status_bar.config(text="Статус: Ошибка экспорта ❌")
+
+            self.run_job("Экспорт CSV", work, on_done=done, error_text="Ошибка экспорта", progress=True)
 
     def load_products(self) :
         """Загрузка товаров из базы данных."""
-        try :
-            for item in self.products_tree.get_children() :
-                self.products_tree.delete(item)
-
-            products = get_all_products()
-            for product in products :
-                self.products_tree.insert("", tk.END, values=(
-                    product.product_id,
-                    product.name,
-                    product.description,
-                    product.price
-                ))
-        except Exception as e :
-            messagebox.showerror("Ошибка", f"Не удалось загрузить товары: {str(e)}")
+        query = query_products(page_size=self.products_tree.page_size)
+
+        def done(total) :
+            self.products_tree.set_source(total, lambda offset, limit : [product_row(product) for product in
+                                                                         query.page_at(offset, limit)],
+                                          jobs=self.jobs, on_error=self.page_error)
+
+        self.run_job("Загрузка товаров", lambda job : query.count(), on_done=done,
+                     error_text="Не удалось загрузить товары", group="products_view")
 
     def add_product(self) :
         """Добавляет новый товар."""
@@ -403,27 +711,26 @@ class MainApplication(tk.Tk) :
             messagebox.showerror("Ошибка", "Пожалуйста, заполните название товара")
             return
 
-        try :
-            product = Product(name, description, price)
-            add_product(product)
+        product = Product(name, description, price)
 
+        def done(_) :
             # Очищаем поля
             for entry in [self.product_name_entry, self.product_desc_entry, self.product_price_entry] :
                 entry.delete(0, tk.END)
 
             self.load_products()
             messagebox.showinfo("Успех", "Товар успешно добавлен")
-        except Exception as e :
-            messagebox.showerror("Ошибка", f"Не удалось добавить товар: {str(e)}")
+
+        self.run_job("Добавление товара", lambda job : add_product(product), on_done=done,
+                     error_text="Не удалось добавить товар")
 
     def on_product_select(self, event) :
         """Обработка выбора товара в таблице."""
         selection = self.products_tree.selection()
-        if selection :
-            self.edit_product_btn.config(state=tk.NORMAL)
+        self.edit_product_btn.config(state=tk.NORMAL if selection else tk.DISABLED)
+        if self.products_tree.selected_keys() :
             self.delete_product_btn.config(state=tk.NORMAL)
         else :
-            self.edit_product_btn.config(state=tk.DISABLED)
             self.delete_product_btn.config(state=tk.DISABLED)
 
     def edit_product(self) :
@@ -438,20 +745,34 @@ class MainApplication(tk.Tk) :
         messagebox.showinfo("Информация", f"Редактирование товара ID {product_id}")
 
     def delete_product(self) :
-        """Удаление выбранного товара."""
-        selection = self.products_tree.selection()
-        if not selection :
+        """Удаление выбранных товаров; товары из заказов - по отдельному подтверждению, со строками заказов."""
+        product_ids = [int(key) for key in self.products_tree.selected_keys()]
+        if not product_ids :
             return
 
-        item = self.products_tree.item(selection[0])
-        product_id = item['values'][0]
+        question = (f"Удалить товаров: {len(product_ids)}?" if len(product_ids) > 1
+                    else "Вы уверены, что хотите удалить этот товар?")
+        if not messagebox.askyesno("Подтверждение", question) :
+            return
 
-        if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить этот товар?") :
-            try :
-                delete_product(product_id)
-                self.load_products()
-                messagebox.showinfo("Успех", "Товар успешно удален")
-            except Exception as e :
-                messagebox.showerror("Ошибка", f"Не удалось удалить товар: {str(e)}")
+        def done(deleted) :
+            self.load_products()
+            messagebox.showinfo("Успех", f"Удалено товаров: {deleted['products']}, "
+                                         f"строк заказов: {deleted.get('order_products', 0)}")
+
+        def failed(e) :
+            # внешние ключи включены: товар из заказа без cascade не удаляется, и ничего не удаляется
+            if not isinstance(e, sqlite3.IntegrityError) :
+                messagebox.showerror("Ошибка", f"Не удалось удалить товары: {str(e)}")
+                self.status_bar.config(text="Статус: Не удалось удалить товары ❌")
+            elif messagebox.askyesno("Товары есть в заказах",
+                                     "Выбранные товары есть в оформленных заказах.\n"
+                                     "Удалить их вместе со строками этих заказов?") :
+                self.run_job("Удаление товаров", lambda job : delete_products(product_ids, cascade=True),
+                             on_done=done, error_text="Не удалось удалить товары")
+            else :
+                self.status_bar.config(text="Статус: Удаление отменено - товары есть в заказах")
+
+        self.run_job("Удаление товаров", lambda job : delete_products(product_ids), on_done=done, on_error=failed)
 
 
@@ -0,0 +1,185 @@
+"""
+Фоновое выполнение операций с БД для графического интерфейса.
+
+Tkinter нельзя трогать из других потоков, поэтому работа выполняется в пуле
+потоков, а результаты, ошибки и прогресс складываются в очередь, которую
+главный поток разбирает через after().
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class JobCancelled(Exception):
+    """Задача была отменена (выбрасывается внутри рабочей функции через Job.check)."""
+
+
+class Job:
+    """
+    Одна фоновая задача.
+
+    Рабочая функция получает объект Job первым аргументом и может
+    сообщать прогресс через report() и проверять отмену через check().
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str, executor: "JobExecutor"):
+        self.id = next(self._ids)
+        self.name = name
+        self._executor = executor
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        """Прерывает рабочую функцию, если задачу отменили."""
+        if self.cancelled:
+            raise JobCancelled(self.name)
+
+    def report(self, message: Any):
+        """Передаёт прогресс в главный поток (вызывается из рабочего потока)."""
+        self.check()
+        self._executor._messages.put(("progress", self, message))
+
+    def __repr__(self):
+        return f"Job(id={self.id}, name='{self.name}', cancelled={self.cancelled})"
+
+
+class JobExecutor:
+    """
+    Пул потоков для операций с БД с доставкой результатов в поток Tk.
+
+    widget = любой виджет Tk, через его after() опрашивается очередь
+    max_workers = число рабочих потоков int
+    poll_ms = период опроса очереди в миллисекундах int
+    batch = сколько сообщений обрабатывать за один опрос, чтобы не подвешивать окно int
+    """
+
+    def __init__(self, widget, max_workers: int = 2, poll_ms: int = 30, batch: int = 50):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.batch = batch
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-job")
+        self._messages: "queue.Queue[tuple]" = queue.Queue()
+        self._groups: Dict[str, Job] = {}
+        self._active: Dict[int, Job] = {}
+        self._callbacks: Dict[int, tuple] = {}
+        self._running = 0  # сколько рабочих функций выполняется прямо сейчас
+        self._idle = threading.Condition()
+        self._closed = False
+        self._after_id = self.widget.after(self.poll_ms, self._poll)
+
+    @property
+    def active(self) -> int:
+        """Сколько задач ещё не завершено."""
+        return len(self._active)
+
+    def submit(self, name: str, func: Callable[..., Any], *args,
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               on_progress: Optional[Callable[[Any], None]] = None,
+               group: Optional[str] = None) -> Job:
+        """
+        Запускает func(job, *args) в рабочем потоке.
+
+        Колбэки вызываются в потоке Tk. Если указан group, предыдущая задача
+        той же группы отменяется и её результат не будет доставлен
+        (так устаревший поиск не перетирает новый).
+        """
+        if self._closed:
+            raise RuntimeError("JobExecutor уже остановлен")
+
+        job = Job(name, self)
+        if group is not None:
+            previous = self._groups.get(group)
+            if previous is not None:
+                previous.cancel()
+            self._groups[group] = job
+
+        self._active[job.id] = job
+        self._callbacks[job.id] = (on_done, on_error, on_progress, group)
+        self._pool.submit(self._run, job, func, args)
+        return job
+
+    def _run(self, job: Job, func, args):
+        with self._idle:
+            self._running += 1
+        try:
+            job.check()
+            result = func(job, *args)
+            self._messages.put(("done", job, result))
+        except JobCancelled:
+            self._messages.put(("cancelled", job, None))
+        except BaseException as e:
+            self._messages.put(("error", job, e))
+        finally:
+            with self._idle:
+                self._running -= 1
+                self._idle.notify_all()
+
+    def cancel_group(self, group: str):
+        """Отменяет текущую задачу группы: её результат не будет доставлен."""
+        job = self._groups.get(group)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        for job in list(self._active.values()):
+            job.cancel()
+
+    def _poll(self):
+        for _ in range(self.batch):
+            try:
+                kind, job, payload = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            self._dispatch(kind, job, payload)
+        if not self._closed:
+            self._after_id = self.widget.after(self.poll_ms, self._poll)
+
+    def _dispatch(self, kind: str, job: Job, payload):
+        on_done, on_error, on_progress, group = self._callbacks.get(job.id, (None, None, None, None))
+        if kind == "progress":
+            if on_progress and not job.cancelled:
+                on_progress(payload)
+            return
+
+        # задача завершилась
+        self._active.pop(job.id, None)
+        self._callbacks.pop(job.id, None)
+        if group is not None and self._groups.get(group) is job:
+            del self._groups[group]
+        if job.cancelled or kind == "cancelled":
+            return
+        if kind == "done" and on_done:
+            on_done(payload)
+        elif kind == "error" and on_error:
+            on_error(payload)
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Отменяет задачи и останавливает пул (вызывать при закрытии окна).
+        Задачи из очереди не запускаются; уже выполняющиеся прерываются на ближайшем
+        job.check()/job.report(). wait=True - дождаться их завершения (не дольше timeout секунд).
+        Returns True, если рабочих функций больше не выполняется.
+        """
+        self._closed = True
+        self.cancel_all()
+        try:
+            self.widget.after_cancel(self._after_id)
+        except Exception:
+            pass
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._idle:
+            if wait:
+                self._idle.wait_for(lambda: self._running == 0, timeout)
+            return self._running == 0
@@ -1,7 +1,13 @@
-import tkinter as tk
-from tkinter import ttk
+import db
 from gui import MainApplication
 
-if __name__ == "__main__":
+
+def main():
+    # БД инициализируется один раз здесь, а не при импорте модулей
+    db.init_db()
     app = MainApplication()
     app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,16 @@
 -заказ
 """
 
-import re
+import sys
+from array import array
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
+
+import utils
 
 class Person:
+    # __slots__ вместо __dict__: объекты заметно меньше при загрузке больших выборок
+    __slots__ = ("first_name", "last_name", "email", "phone")
 
     def __init__(self, first_name: str, last_name: str, email: str, phone: str):
         """
@@ -30,12 +35,10 @@ class Person:
         return f"{self.__class__.__name__}(first_name='{self.first_name}', last_name='{self.last_name}', email='{self.email}', phone='{self.phone}')"
 
     def validate_email(self):
-        email_pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(email_pattern, self.email) is not None
+        return utils.validate_email(self.email)
 
     def validate_phone(self):
-        phone_pattern = r"^\+?[0-9]{10,12}$"
-        return re.match(phone_pattern, self.phone) is not None
+        return utils.validate_phone(self.phone)
 
 
 class Client(Person):
@@ -48,12 +51,38 @@ class Client(Person):
     orders = список заказов клиента list[order]
     """
 
+    __slots__ = ("client_id", "address", "registration_date", "_orders")
+
     def __init__(self, first_name: str, last_name: str, email: str, phone: str, address: str):
         super().__init__(first_name, last_name, email, phone)
         self.client_id: Optional[int] = None  # ID устанавливаются как Optional[int] = None и будут заполняться базой данных при сохранении
         self.address = address
         self.registration_date = datetime.now()
-        self.orders: List['Order'] = []
+        self._orders: Optional[List['Order']] = None
+
+    @classmethod
+    def from_row(cls, row) -> 'Client':
+        """
+        Быстрое создание из строки БД (client_id, first_name, last_name, email, phone, address, registration_date)
+        без значений по умолчанию из __init__ (datetime.now(), пустой список заказов).
+        """
+        client = cls.__new__(cls)
+        (client.client_id, client.first_name, client.last_name, client.email, client.phone,
+         client.address, registration_date) = row
+        client.registration_date = datetime.fromisoformat(registration_date)
+        client._orders = None
+        return client
+
+    @property
+    def orders(self) -> List['Order']:
+        # список заказов создаётся только при первом обращении
+        if self._orders is None:
+            self._orders = []
+        return self._orders
+
+    @orders.setter
+    def orders(self, orders: List['Order']):
+        self._orders = orders
 
     def __repr__(self):
         return f"Client(client_id={self.client_id}, first_name='{self.first_name}', last_name='{self.last_name}', email='{self.email}', phone='{self.phone}', address='{self.address}', registration_date={self.registration_date})"
@@ -64,30 +93,166 @@ class Client(Person):
 
 
 class Product:
+    __slots__ = ("product_id", "name", "description", "price")
+
     def __init__(self, name: str, description: str, price: float):
         self.product_id: Optional[int] = None  # ID устанавливаются как Optional[int] = None и будут заполняться базой данных при сохранении
         self.name = name
         self.description = description
         self.price = price
 
+    @classmethod
+    def from_row(cls, row) -> 'Product':
+        """Быстрое создание из строки БД (product_id, name, description, price)."""
+        product = cls.__new__(cls)
+        product.product_id, product.name, product.description, product.price = row
+        return product
+
     def __repr__(self):
         return f"Product(product_id={self.product_id}, name='{self.name}', description='{self.description}', price={self.price})"
 
 
 class Order:
+    __slots__ = ("order_id", "client", "products", "order_date", "status", "prices")
+
     def __init__(self, client: Client, products: List[Product], status: str = "Создан!"):
         self.order_id: Optional[int] = None  # ID устанавливаются как Optional[int] = None и будут заполняться базой данных при сохранении
         self.client = client
         self.products = products
         self.order_date = datetime.now()
         self.status = status
+        self.prices: Dict[int, float] = {}  # product_id -> цена на момент покупки (для заказов из БД)
+
+    @classmethod
+    def from_row(cls, row, client: Optional[Client], products: Optional[List[Product]] = None) -> 'Order':
+        """Быстрое создание из строки БД (order_id, order_date, status) с уже загруженными клиентом и товарами."""
+        order = cls.__new__(cls)
+        order.order_id, order_date, order.status = row
+        order.order_date = datetime.fromisoformat(order_date)
+        order.client = client
+        order.products = products if products is not None else []
+        order.prices = {}
+        return order
 
     def __repr__(self):
         product_names = [product.name for product in self.products]
         return f"Order(order_id={self.order_id}, client={self.client.first_name}, products={product_names}, order_date={self.order_date}, status='{self.status}')"
 
     def calc_total(self) -> float:
-        return sum(product.price for product in self.products)
+        """Сумма заказа по ценам на момент покупки - так же считается выручка в сводных таблицах."""
+        return sum(self.line_price(product) for product in self.products)
+
+    def line_price(self, product: Product) -> float:
+        """Цена товара в заказе: на момент покупки, если заказ загружен из БД, иначе текущая цена товара."""
+        return self.prices.get(product.product_id, product.price)
+
+    def add_product(self, product: Product, quantity: int = 1, price: Optional[float] = None):
+        """
+        Добавляет товар; количество хранится повторениями товара в списке products.
+        price - цена на момент покупки (order_products.price); None - текущая цена товара.
+        """
+        self.products.extend([product] * quantity)
+        if price is not None:
+            self.prices[product.product_id] = price
+
+    def lines(self) -> List[tuple]:
+        """Строки заказа [(товар, количество)] в порядке первого появления товара."""
+        quantities: Dict[int, int] = {}
+        products: Dict[int, Product] = {}
+        for product in self.products:
+            key = product.product_id if product.product_id is not None else id(product)
+            quantities[key] = quantities.get(key, 0) + 1
+            products.setdefault(key, product)
+        return [(products[key], quantity) for key, quantity in quantities.items()]
+
+
+class ClientTable:
+    """
+    Колоночное представление множества клиентов для больших выборок.
+
+    Числа хранятся в array (8 байт на значение), повторяющиеся имена и фамилии
+    интернируются. Дата регистрации хранится исходной строкой из БД: row(i) возвращает
+    ту же строку, а client(i) - тот же Client, что и get_client_by_id (часовой пояс
+    и точность не теряются). Объект Client создаётся только по запросу через
+    client(i) или при итерации.
+    """
+
+    __slots__ = ("client_id", "first_name", "last_name", "email", "phone", "address", "registration_date")
+
+    def __init__(self):
+        self.client_id = array("q")
+        self.first_name: List[str] = []
+        self.last_name: List[str] = []
+        self.email: List[str] = []
+        self.phone: List[str] = []
+        self.address: List[str] = []
+        self.registration_date: List[str] = []
+
+    @classmethod
+    def from_rows(cls, rows) -> 'ClientTable':
+        table = cls()
+        table.extend(rows)
+        return table
+
+    def extend(self, rows):
+        """Добавляет строки в порядке колонок таблицы clients."""
+        intern = sys.intern
+        for client_id, first_name, last_name, email, phone, address, registration_date in rows:
+            self.client_id.append(client_id)
+            self.first_name.append(intern(first_name))
+            self.last_name.append(intern(last_name))
+            self.email.append(email)
+            self.phone.append(phone)
+            self.address.append(address)
+            self.registration_date.append(registration_date)
+
+    def __len__(self):
+        return len(self.client_id)
+
+    def row(self, i: int) -> tuple:
+        return (self.client_id[i], self.first_name[i], self.last_name[i], self.email[i], self.phone[i],
+                self.address[i], self.registration_date[i])
+
+    def client(self, i: int) -> Client:
+        return Client.from_row(self.row(i))
+
+    def __iter__(self) -> Iterator[Client]:
+        return (self.client(i) for i in range(len(self)))
+
+
+class ProductTable:
+    """Колоночное представление множества товаров (см. ClientTable)."""
+
+    __slots__ = ("product_id", "name", "description", "price")
+
+    def __init__(self):
+        self.product_id = array("q")
+        self.name: List[str] = []
+        self.description: List[Optional[str]] = []
+        self.price = array("d")
+
+    @classmethod
+    def from_rows(cls, rows) -> 'ProductTable':
+        table = cls()
+        table.extend(rows)
+        return table
+
+    def extend(self, rows):
+        """Добавляет строки в порядке колонок таблицы products."""
+        for product_id, name, description, price in rows:
+            self.product_id.append(product_id)
+            self.name.append(name)
+            self.description.append(description)
+            self.price.append(price)
+
+    def __len__(self):
+        return len(self.product_id)
+
+    def row(self, i: int) -> tuple:
+        return self.product_id[i], self.name[i], self.description[i], self.price[i]
+
+    def product(self, i: int) -> Product:
+        return Product.from_row(self.row(i))
 
-    def add_product(self, product: Product):
-        self.products.append(product)
+    def __iter__(self) -> Iterator[Product]:
+        return (self.product(i) for i in range(len(self)))
@@ -0,0 +1,312 @@
+"""
+Профилировщик обращений к БД. По умолчанию выключен.
+
+Пока профилирование включено (enable_profiling / profiler.enable):
+- функции db.py, помеченные @profiled, пишут время выполнения и число
+  возвращённых строк;
+- соединения пула открываются с классом ProfiledConnection, курсоры которого
+  замеряют каждое execute/executemany (executemany - одно измерение на весь пакет)
+  и считают строки (rowcount для изменений, fetch* для выборок);
+- считаются открытые соединения, медленные вызовы попадают в журнал.
+
+Выключенный профилировщик не ставит на соединения никаких обработчиков:
+пул открывает обычные sqlite3.Connection, а @profiled только проверяет флаг.
+
+Время выражения - время execute: для запросов с сортировкой или агрегацией это
+почти вся работа, для потоковых SELECT - время до первой строки (остальное
+попадает во время вызвавшей функции).
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import wraps
+from time import perf_counter
+from typing import Dict, List, Optional
+
+# верхние границы корзин гистограмм задержки, секунды
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = "eshop_db"
+
+FUNCTION, STATEMENT = "function", "sql"  # виды измерений
+
+_IN_LIST = re.compile(r"\?(\s*,\s*\?)+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Ключ выражения: пробелы схлопнуты, списки IN (?, ?, ...) любой длины - одно выражение."""
+    return _IN_LIST.sub("?, ...", " ".join(sql.split()))
+
+
+class Histogram:
+    """Гистограмма задержек с фиксированными корзинами LATENCY_BUCKETS."""
+
+    __slots__ = ("buckets", "count", "total", "max", "rows", "errors")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # последняя - больше 10 с
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.errors = 0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля сверху - граница корзины, в которую он попал."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "rows": self.rows,
+            "errors": self.errors,
+            "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.buckets)),
+        }
+
+
+class Profiler:
+    """
+    Накопитель измерений: гистограммы по функциям и по SQL-выражениям,
+    счётчик открытых соединений и журнал медленных вызовов.
+
+    На горячем пути измерение только дописывается в очередь (deque.append
+    потокобезопасен и не требует блокировки); разбор по гистограммам,
+    нормализация SQL и журнал медленных вызовов - при накоплении DRAIN_SIZE
+    измерений или при snapshot().
+
+    slow_threshold = с какой длительности (секунды) вызов попадает в журнал float
+    slow_log_size = сколько последних медленных вызовов хранить int
+    """
+
+    DRAIN_SIZE = 4096
+
+    def __init__(self, slow_threshold: float = 0.1, slow_log_size: int = 200):
+        self.enabled = False
+        self.slow_threshold = slow_threshold
+        self._lock = threading.Lock()
+        self._events: deque = deque()  # (вид, имя, секунды или None, строки, ошибка)
+        self._keys: Dict[str, str] = {}  # исходный текст SQL -> normalize_sql
+        self.slow_log: deque = deque(maxlen=slow_log_size)
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self.functions: Dict[str, Histogram] = {}
+            self.statements: Dict[str, Histogram] = {}
+            self.connections_opened = 0
+            self.slow_log.clear()
+            self.started = time.time()
+
+    def record_function(self, name: str, seconds: float, rows: Optional[int] = None, error: bool = False):
+        self._events.append((FUNCTION, name, seconds, rows, error))
+        if len(self._events) >= self.DRAIN_SIZE:
+            self._drain()
+
+    def record_statement(self, sql: str, seconds: Optional[float], rows: int = -1, error: bool = False):
+        """seconds=None - только строки, выбранные fetch* после execute (время уже учтено)."""
+        self._events.append((STATEMENT, sql, seconds, rows, error))
+        if len(self._events) >= self.DRAIN_SIZE:
+            self._drain()
+
+    def record_connection(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def _statement_key(self, sql: str) -> str:
+        key = self._keys.get(sql)
+        if key is None:
+            if len(self._keys) > 10000:  # тексты с подставленными значениями не должны копиться
+                self._keys.clear()
+            key = self._keys[sql] = normalize_sql(sql)
+        return key
+
+    def _drain(self):
+        with self._lock:
+            events = self._events
+            while events:
+                try:
+                    kind, name, seconds, rows, error = events.popleft()
+                except IndexError:
+                    break
+                if kind is STATEMENT:
+                    name = self._statement_key(name)
+                    table = self.statements
+                else:
+                    table = self.functions
+                histogram = table.get(name)
+                if histogram is None:
+                    histogram = table[name] = Histogram()
+                if rows is not None and rows > 0:
+                    histogram.rows += rows
+                histogram.errors += error
+                if seconds is None:
+                    continue
+                histogram.observe(seconds)
+                if seconds >= self.slow_threshold:
+                    # время записи - момент разбора очереди, не позже DRAIN_SIZE измерений после вызова
+                    self.slow_log.append({"time": time.time(), "kind": kind, "name": name, "seconds": seconds})
+
+    def snapshot(self) -> dict:
+        """Все измерения в виде словаря (основа для JSON и вкладки диагностики)."""
+        self._drain()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "started": self.started,
+                "slow_threshold": self.slow_threshold,
+                "connections_opened": self.connections_opened,
+                "functions": {name: h.as_dict() for name, h in self.functions.items()},
+                "statements": {sql: h.as_dict() for sql, h in self.statements.items()},
+                "slow_log": list(self.slow_log),
+            }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus (гистограммы и счётчики)."""
+        data = self.snapshot()
+        lines: List[str] = []
+        for kind, label, title in (("functions", "function", "функций db.py"),
+                                   ("statements", "statement", "SQL-выражений")):
+            metric = f"{METRIC_PREFIX}_{label}"
+            lines += [f"# HELP {metric}_seconds Время выполнения {title}",
+                      f"# TYPE {metric}_seconds histogram"]
+            for name, stats in data[kind].items():
+                value = _label_value(name)
+                cumulative = 0
+                for bound, count in stats["buckets"].items():
+                    cumulative += count
+                    lines.append(f'{metric}_seconds_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_seconds_sum{{{label}="{value}"}} {stats["sum"]}')
+                lines.append(f'{metric}_seconds_count{{{label}="{value}"}} {stats["count"]}')
+            for counter, help_text in (("rows", "Число строк"), ("errors", "Число ошибок")):
+                lines += [f"# HELP {metric}_{counter}_total {help_text} {title}",
+                          f"# TYPE {metric}_{counter}_total counter"]
+                lines += [f'{metric}_{counter}_total{{{label}="{_label_value(name)}"}} {stats[counter]}'
+                          for name, stats in data[kind].items()]
+        lines += [f"# HELP {METRIC_PREFIX}_connections_opened_total Открыто соединений с БД",
+                  f"# TYPE {METRIC_PREFIX}_connections_opened_total counter",
+                  f"{METRIC_PREFIX}_connections_opened_total {data['connections_opened']}"]
+        return "\n".join(lines) + "\n"
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+profiler = Profiler()
+_events = profiler._events  # очередь не пересоздаётся (reset её очищает), курсоры пишут в неё напрямую
+
+
+def _row_count(result) -> Optional[int]:
+    """Размер результата (список, словарь, ClientTable, DataFrame); None для чисел и прочего."""
+    return len(result) if hasattr(result, "__len__") and not isinstance(result, str) else None
+
+
+def profiled(func):
+    """Декоратор функций db.py: время и число строк результата, пока профилировщик включён."""
+    name = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        start = perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            profiler.record_function(name, perf_counter() - start, error=True)
+            raise
+        profiler.record_function(name, perf_counter() - start, _row_count(result))
+        return result
+
+    return wrapper
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Курсор, замеряющий execute/executemany и считающий строки: rowcount для
+    изменений, fetchmany/fetchall для выборок (fetchone и итерация не считаются -
+    лишний вызов Python на каждую строку стоил бы дороже самого чтения).
+    """
+
+    _sql = ""
+
+    def execute(self, sql, parameters=()):
+        self._sql = sql
+        start = perf_counter()
+        try:
+            sqlite3.Cursor.execute(self, sql, parameters)
+        except BaseException:
+            profiler.record_statement(sql, perf_counter() - start, error=True)
+            raise
+        # без вызова record_statement: на коротких выражениях каждый вызов Python заметен
+        _events.append((STATEMENT, sql, perf_counter() - start, self.rowcount, False))
+        if len(_events) >= Profiler.DRAIN_SIZE:
+            profiler._drain()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql = sql
+        start = perf_counter()
+        try:
+            sqlite3.Cursor.executemany(self, sql, seq_of_parameters)
+        except BaseException:
+            profiler.record_statement(sql, perf_counter() - start, error=True)
+            raise
+        profiler.record_statement(sql, perf_counter() - start, self.rowcount)
+        return self
+
+    def fetchmany(self, size=None):
+        rows = sqlite3.Cursor.fetchmany(self, self.arraysize if size is None else size)
+        profiler.record_statement(self._sql, None, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = sqlite3.Cursor.fetchall(self)
+        profiler.record_statement(self._sql, None, len(rows))
+        return rows
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Соединение, все выражения которого идут через ProfiledCursor."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    def execute(self, sql, parameters=()):
+        return ProfiledCursor.execute(sqlite3.Connection.cursor(self, ProfiledCursor), sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return ProfiledCursor.executemany(sqlite3.Connection.cursor(self, ProfiledCursor), sql, seq_of_parameters)
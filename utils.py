@@ -1,21 +1,124 @@
-
+import heapq
 import re
+from itertools import compress, count
+from operator import attrgetter, itemgetter, methodcaller, not_
+from typing import Dict, List, Optional, Pattern, Sequence, Set, Tuple
+
+# шаблоны компилируются один раз при импорте; fullmatch вместо ^...$ не пропускает завершающий \n
+EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+PHONE_RE = re.compile(r"\+?[0-9]{10,12}")  # Пример: +79123456789 или 89123456789
+
 
 def validate_email(email):
     """Проверяет email на соответствие формату."""
-    pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    return re.match(pattern, email) is not None
+    return EMAIL_RE.fullmatch(email) is not None
 
 def validate_phone(phone):
     """Проверяет номер телефона на соответствие формату."""
-    pattern = r"^\+?[0-9]{10,12}$"  # Пример: +79123456789 или 89123456789
-    return re.match(pattern, phone) is not None
-
-def sort_orders(orders, key="date", reverse=False):
-    """Сортирует список заказов по дате или стоимости."""
-    if key == "date":
-        return sorted(orders, key=lambda order: order.order_date, reverse=reverse)
-    elif key == "amount":
-        return sorted(orders, key=lambda order: order.total_amount, reverse=reverse)
-    else:
-        return orders  # Возвращаем исходный список, если ключ невалиден
+    return PHONE_RE.fullmatch(phone) is not None
+
+def validate_rows(header: Sequence[str], rows: List[list],
+                  rules: Optional[Dict[str, Pattern]] = None,
+                  references: Optional[Dict[str, Set[str]]] = None) -> Tuple[List[list], List[tuple]]:
+    """
+    Пакетная проверка строк CSV: каждая колонка проверяется целиком за один проход
+    (map скомпилированного шаблона по колонке), а не строка за строкой.
+
+    header = имена колонок list
+    rules = колонка -> скомпилированный шаблон, которому должно целиком соответствовать значение dict
+    references = колонка -> множество значений, ссылаться на которые нельзя
+        (например ID уже отклонённых клиентов для колонки orders.client_id) dict
+    Returns (valid, rejected): подходящие строки и список (строка, причина) для остальных.
+    """
+    width = len(header)
+    reasons = {i: f"ожидалось {width} полей, получено {len(row)}"
+               for i, row in enumerate(rows) if len(row) != width}
+    # строки неверной длины в проверку колонок не идут - вместо них пустые заглушки
+    checked = rows if not reasons else [[""] * width if i in reasons else row for i, row in enumerate(rows)]
+
+    for column, pattern in (rules or {}).items():
+        if column in header:
+            values = map(itemgetter(header.index(column)), checked)
+            # номера строк без совпадения; весь проход по колонке - на уровне C
+            for i in compress(count(), map(not_, map(pattern.fullmatch, values))):
+                reasons.setdefault(i, f"{column}: неверный формат")
+
+    for column, banned in (references or {}).items():
+        if banned and column in header:
+            values = list(map(itemgetter(header.index(column)), checked))
+            for i in compress(count(), map(banned.__contains__, values)):
+                reasons.setdefault(i, f"{column}: ссылка на отклонённую строку {values[i]}")
+
+    if not reasons:
+        return rows, []
+    valid = [row for i, row in enumerate(rows) if i not in reasons]
+    rejected = [(rows[i], reasons[i]) for i in sorted(reasons)]
+    return valid, rejected
+
+# ключи сортировки заказов: имя -> функция от Order
+ORDER_SORT_KEYS = {
+    "id": attrgetter("order_id"),
+    "date": attrgetter("order_date"),
+    "status": attrgetter("status"),
+    "amount": methodcaller("calc_total"),
+}
+
+
+def sort_spec(key, reverse: bool, allowed) -> List[Tuple[str, bool]]:
+    """
+    Разбирает описание сортировки в список (имя ключа, по убыванию).
+
+    key = имя ключа или список; элемент списка - имя или (имя, по_убыванию)
+    reverse = направление для ключей, у которых оно не указано
+    allowed = допустимые имена ключей
+    """
+    items = [key] if isinstance(key, str) else list(key)
+    spec = [(item, reverse) if isinstance(item, str) else (item[0], bool(item[1])) for item in items]
+    for name, _ in spec:
+        if name not in allowed:
+            raise ValueError(f"Сортировка по {name!r} не поддерживается, доступны: {sorted(allowed)}")
+    if not spec:
+        raise ValueError("Не указан ключ сортировки")
+    return spec
+
+
+def sort_orders(orders, key="date", reverse=False, limit: Optional[int] = None):
+    """
+    Сортирует список заказов по одному или нескольким ключам (см. ORDER_SORT_KEYS).
+
+    Сортировка стабильная: заказы с равными ключами сохраняют исходный порядок.
+    Каждый ключ (в том числе сумма calc_total) вычисляется один раз на заказ.
+    key = "date", "amount", "id", "status" или список, например [("amount", True), "date"]
+    limit = вернуть только первые limit заказов: heapq за O(n log limit) вместо полной сортировки
+    Для заказов из БД то же самое в SQL делает db.get_orders_sorted.
+    """
+    spec = sort_spec(key, reverse, ORDER_SORT_KEYS)
+    if len(spec) == 1:
+        # sorted, nsmallest и nlargest вызывают key ровно один раз на элемент и стабильны
+        name, desc = spec[0]
+        if limit is None:
+            return sorted(orders, key=ORDER_SORT_KEYS[name], reverse=desc)
+        return (heapq.nlargest if desc else heapq.nsmallest)(limit, orders, key=ORDER_SORT_KEYS[name])
+
+    orders = list(orders)
+    columns = [list(map(ORDER_SORT_KEYS[name], orders)) for name, _ in spec]
+    positions = range(len(orders))
+
+    if limit is not None:
+        # top-k по старшему ключу; младшие ключи нужны только кандидатам,
+        # не уступающим по старшему ключу k-му
+        primary, desc = columns[0], spec[0][1]
+        top = (heapq.nlargest if desc else heapq.nsmallest)(limit, positions, key=primary.__getitem__)
+        if not top:
+            return []
+        threshold = primary[top[-1]]
+        positions = [i for i in positions if (primary[i] >= threshold if desc else primary[i] <= threshold)]
+
+    # несколько ключей: проходы от младшего к старшему, каждый проход стабилен,
+    # поэтому направления ключей могут различаться
+    order = list(positions)
+    for column, (_, desc) in reversed(list(zip(columns, spec))):
+        order.sort(key=column.__getitem__, reverse=desc)
+    if limit is not None:
+        order = order[:limit]
+    return [orders[i] for i in order]
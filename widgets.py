@@ -0,0 +1,297 @@
+"""
+Виджеты для графического интерфейса.
+
+VirtualTreeview - таблица с виртуальной прокруткой: в Treeview всегда
+столько строк, сколько видно на экране, а данные подгружаются страницами
+по мере прокрутки (с JobExecutor - в фоновых потоках, без блокировки окна).
+"""
+
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+from typing import Callable, List, Optional, Sequence
+
+FetchPage = Callable[[int, int], Sequence[tuple]]  # (offset, limit) -> строки значений
+LOADING_ROW = ("…",)  # значения строки, страница которой ещё загружается
+
+
+class VirtualTreeview(ttk.Frame):
+    """
+    Таблица с виртуальной прокруткой.
+
+    Источник данных задаётся через set_source(count, fetch_page) - тогда страницы
+    по page_size строк запрашиваются у fetch_page(offset, limit) по мере прокрутки
+    и хранятся в LRU-кэше на cache_pages страниц; либо через set_rows(rows) для
+    уже загруженного списка. Число элементов в Treeview не зависит от объёма
+    данных: при прокрутке у тех же элементов меняются только значения.
+
+    Если передан jobs (JobExecutor), fetch_page выполняется в его потоках: пока
+    страница не пришла, в её строках показывается LOADING_ROW, а запросы страниц,
+    которые успели уйти с экрана, не выполняются.
+
+    Первая колонка считается ключом строки - по ней сохраняется выделение при прокрутке
+    (ключи хранятся строками, как их возвращает Tk).
+    """
+
+    def __init__(self, master, columns: Sequence[str], height: int = 15, page_size: int = 200,
+                 cache_pages: int = 8, selectmode: str = "extended", **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = tuple(columns)
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show='headings', height=height,
+                                 selectmode=selectmode)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.total = 0          # сколько всего строк в источнике
+        self.first = 0          # индекс строки источника в первом видимом слоте
+        self.visible = height   # сколько слотов (элементов Treeview) сейчас создано
+        self._fetch: Optional[FetchPage] = None
+        self._jobs = None
+        self._on_error: Optional[Callable[[BaseException], None]] = None
+        self._loading = set()   # номера страниц, запрошенных в фоне
+        self._generation = 0    # растёт при смене источника - ответы для старого источника отбрасываются
+        self._rows: Optional[Sequence[tuple]] = None
+        self._pages: "OrderedDict[int, Sequence[tuple]]" = OrderedDict()
+        self._slots: List[str] = []
+        self._slot_values: List[tuple] = []  # что сейчас показано в каждом слоте - для обновления по разнице
+        self._selected_keys = set()
+        self._refreshing = False
+
+        self._resize_slots(height)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_by(3))
+        self.tree.bind("<Prior>", lambda event: self._scroll_by(-self.visible))
+        self.tree.bind("<Next>", lambda event: self._scroll_by(self.visible))
+        self.tree.bind("<Up>", self._on_key_up)
+        self.tree.bind("<Down>", self._on_key_down)
+
+    # --- источники данных ---
+
+    def set_source(self, count: int, fetch_page: FetchPage, jobs=None,
+                   on_error: Optional[Callable[[BaseException], None]] = None):
+        """
+        Показывает count строк, которые подгружаются через fetch_page(offset, limit).
+        jobs - JobExecutor для фоновой подгрузки (None - страницы читаются сразу, в потоке Tk);
+        on_error(e) вызывается в потоке Tk, если страница не загрузилась.
+        """
+        self._fetch = fetch_page
+        self._jobs = jobs
+        self._on_error = on_error
+        self._rows = None
+        self._reset(count)
+
+    def set_rows(self, rows: Sequence[tuple], keep_selection: bool = False):
+        """
+        Показывает уже загруженный список строк.
+        keep_selection=True - выделение сохраняется для ключей, которые остались в rows
+        (при уточнении поиска исчезают только строки, которые больше не подходят).
+        """
+        self._fetch = None
+        self._jobs = None
+        self._rows = rows
+        if keep_selection and self._selected_keys:
+            self._selected_keys &= {str(row[0]) for row in rows}
+            self._reset(len(rows), keep_selection=True)
+        else:
+            self._reset(len(rows))
+
+    def _reset(self, count: int, keep_selection: bool = False):
+        self.total = count
+        self._pages.clear()
+        self._loading.clear()
+        self._generation += 1
+        if not keep_selection:
+            self._selected_keys.clear()
+        self.first = min(self.first, max(0, count - self.visible))
+        self._render()
+
+    def row(self, index: int) -> Optional[tuple]:
+        """
+        Строка источника по индексу (с подгрузкой страницы при необходимости).
+        При фоновой подгрузке - LOADING_ROW, пока страница не пришла.
+        """
+        if not 0 <= index < self.total:
+            return None
+        if self._rows is not None:
+            return self._rows[index]
+
+        page_no = index // self.page_size
+        page = self._pages.get(page_no)
+        if page is None:
+            if self._jobs is not None:
+                self._request_page(page_no)
+                return LOADING_ROW
+            page = self._fetch(page_no * self.page_size, self.page_size)
+            self._store_page(page_no, page)
+        else:
+            self._pages.move_to_end(page_no)
+        offset = index - page_no * self.page_size
+        return page[offset] if offset < len(page) else None
+
+    def _store_page(self, page_no: int, page: Sequence[tuple]):
+        self._pages[page_no] = page
+        while len(self._pages) > self.cache_pages:
+            self._pages.popitem(last=False)
+
+    def _wanted(self, page_no: int, generation: int) -> bool:
+        """Страница ещё нужна: источник тот же и она рядом с видимой областью (с запасом на предзагрузку)."""
+        first = self.first // self.page_size - 1
+        last = (self.first + 2 * self.visible) // self.page_size + 1
+        return generation == self._generation and first <= page_no <= last
+
+    def _request_page(self, page_no: int):
+        """Ставит загрузку страницы в очередь jobs; повторный запрос той же страницы не дублируется."""
+        if page_no in self._loading:
+            return
+        self._loading.add(page_no)
+        fetch, generation = self._fetch, self._generation
+
+        def work(job):
+            # пока задача ждала в очереди, таблицу могли прокрутить дальше - тогда страница не читается
+            if not self._wanted(page_no, generation):
+                return None
+            return fetch(page_no * self.page_size, self.page_size)
+
+        def done(page):
+            if generation != self._generation:
+                return
+            self._loading.discard(page_no)
+            if page is None:
+                # страница была не нужна, но за это время к ней могли вернуться
+                if self._wanted(page_no, generation):
+                    self._render()
+                return
+            self._store_page(page_no, page)
+            if page_no * self.page_size < self.first + self.visible and \
+                    (page_no + 1) * self.page_size > self.first:
+                self._render()
+
+        def failed(e):
+            if generation != self._generation:
+                return
+            self._loading.discard(page_no)
+            if self._on_error is not None:
+                self._on_error(e)
+
+        self._jobs.submit("Загрузка страницы", work, on_done=done, on_error=failed)
+
+    # --- отрисовка ---
+
+    def _resize_slots(self, count: int):
+        count = max(1, count)
+        while len(self._slots) < count:
+            self._slots.append(self.tree.insert("", tk.END, values=()))
+            self._slot_values.append(())
+        while len(self._slots) > count:
+            self.tree.delete(self._slots.pop())
+            self._slot_values.pop()
+        self.visible = count
+
+    def _render(self):
+        self._refreshing = True
+        try:
+            selected = []
+            for slot_no, iid in enumerate(self._slots):
+                values = self.row(self.first + slot_no) or ()
+                # в Tk уходят только слоты, значения которых изменились
+                if values != self._slot_values[slot_no]:
+                    self.tree.item(iid, values=values)
+                    self._slot_values[slot_no] = values
+                if values and values is not LOADING_ROW and str(values[0]) in self._selected_keys:
+                    selected.append(iid)
+            if set(selected) != set(self.tree.selection()):
+                self.tree.selection_set(selected)
+            # заранее подгружаем следующую за видимой областью страницу
+            self.row(min(self.total - 1, self.first + 2 * self.visible))
+        finally:
+            self._refreshing = False
+
+        if self.total > self.visible:
+            self.scrollbar.set(self.first / self.total, (self.first + self.visible) / self.total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # --- прокрутка ---
+
+    def scroll_to(self, index: int):
+        index = max(0, min(index, self.total - self.visible))
+        if index != self.first:
+            self.first = index
+            self._render()
+
+    def _scroll_by(self, rows: int):
+        self.scroll_to(self.first + rows)
+        return "break"
+
+    def yview(self, *args):
+        """Обработчик команды полосы прокрутки."""
+        if not args:
+            return
+        if args[0] == tk.MOVETO:
+            self.scroll_to(int(float(args[1]) * self.total))
+        elif args[0] == tk.SCROLL:
+            step = self.visible if args[2] == tk.PAGES else 1
+            self._scroll_by(int(args[1]) * step)
+
+    def _on_mousewheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_key_up(self, event):
+        if self.tree.focus() == self._slots[0] and self.first > 0:
+            return self._scroll_by(-1)
+
+    def _on_key_down(self, event):
+        if self.tree.focus() == self._slots[-1] and self.first + self.visible < self.total:
+            return self._scroll_by(1)
+
+    def _on_configure(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        rows = max(1, (event.height - rowheight) // rowheight)  # минус строка заголовков
+        if rows != self.visible:
+            self._resize_slots(rows)
+            self.first = max(0, min(self.first, self.total - self.visible))
+            self._render()
+
+    def _on_select(self, event):
+        if self._refreshing:
+            return
+        # ключи видимых строк заменяются текущим выделением, ключи за экраном сохраняются
+        selection = set(self.tree.selection())
+        for iid, values in zip(self._slots, self._slot_values):
+            if not values or values is LOADING_ROW:
+                continue
+            if iid in selection:
+                self._selected_keys.add(str(values[0]))
+            else:
+                self._selected_keys.discard(str(values[0]))
+
+    def selected_keys(self) -> List[str]:
+        """Ключи (первая колонка) всех выделенных строк, включая прокрученные за экран."""
+        return sorted(self._selected_keys)
+
+    # --- совместимость с ttk.Treeview ---
+
+    def heading(self, column, **kwargs):
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    def selection(self):
+        values = dict(zip(self._slots, self._slot_values))
+        return tuple(iid for iid in self.tree.selection() if values.get(iid) and values[iid] is not LOADING_ROW)
+
+    def item(self, iid, option=None, **kwargs):
+        return self.tree.item(iid, option, **kwargs)
+
+    def bind(self, sequence=None, func=None, add=None):
+        # события пользователя вешаются на внутреннюю таблицу
+        return self.tree.bind(sequence, func, add)
@@ -0,0 +1,252 @@
+"""
+Отложенная запись (write-behind) клиентов и товаров.
+
+Каждый вызов db.add_client / db.add_product - отдельная транзакция и отдельный
+fsync. WriteBehindBuffer копит операции и фиксирует их группами: одна транзакция
+на пакет до max_batch операций; пакет уходит в БД, когда набралось max_batch
+операций или самая старая ждёт дольше max_delay секунд. Вызывающий сразу получает Future, который
+завершается после COMMIT (результат - ID строки для вставок, None для остальных
+операций) или получает исключение, если именно эта операция не прошла.
+
+Буфер включается явно (get_write_buffer) - обычные функции db.py пишут сразу.
+Порядок относительно прямых вызовов db.py не гарантируется: чтобы прочитать
+только что записанное, дождитесь Future или вызовите flush().
+"""
+
+import atexit
+import threading
+import time
+from concurrent.futures import Future
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+
+import db
+from models import Client, Product
+
+# операция: (функция db.py, аргументы, ожидающие её Future, функция получения результата)
+Operation = Tuple[Callable, tuple, List[Future], Optional[Callable[[], int]]]
+# удаления не заменяются следующими изменениями той же строки
+_DELETES = (db.delete_client, db.delete_product)
+
+
+class WriteBehindBuffer:
+    """
+    Буфер групповой записи клиентов и товаров.
+
+    max_batch = сколько операций накопить до принудительной записи int
+    max_delay = сколько секунд операция может ждать записи float
+    max_queue = при такой глубине очереди вызывающий поток ждёт, пока пакет запишется int
+
+    Изменения и удаления одной строки внутри пакета склеиваются: выполняется
+    только последнее изменение, а удаление отменяет ожидающие изменения этой строки
+    (их Future завершаются вместе с удалением). Изменение после ожидающего удаления
+    не выполняется: строка всё равно будет удалена, его Future завершается вместе с удалением.
+    """
+
+    def __init__(self, max_batch: int = 500, max_delay: float = 0.05, max_queue: int = 10_000):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max(max_queue, max_batch)
+        self._cond = threading.Condition()
+        self._pending: Dict[object, Operation] = {}  # ключ -> операция, порядок вставки сохраняется
+        self._inserts = 0            # счётчик ключей для вставок (у них ещё нет ID)
+        self._oldest: Optional[float] = None
+        self._committing = False
+        self._flush_requested = False
+        self._closed = False
+
+        self.max_depth = 0
+        self.batches = 0
+        self.operations = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.commit_seconds = 0.0
+        self.last_commit_seconds = 0.0
+        self.max_commit_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # --- операции ---
+
+    def add_client(self, client: Client) -> Future:
+        """Ставит клиента в очередь на вставку; client.client_id заполняется при записи пакета."""
+        return self._put(("insert", self._next_insert()), db.add_client, (client,), lambda: client.client_id)
+
+    def update_client(self, client_id: int, first_name: str, last_name: str, email: str, phone: str,
+                      address: str) -> Future:
+        return self._put(("clients", client_id), db.update_client,
+                         (client_id, first_name, last_name, email, phone, address))
+
+    def delete_client(self, client_id: int) -> Future:
+        return self._put(("clients", client_id), db.delete_client, (client_id,))
+
+    def add_product(self, product: Product) -> Future:
+        """Ставит товар в очередь на вставку; product.product_id заполняется при записи пакета."""
+        return self._put(("insert", self._next_insert()), db.add_product, (product,), lambda: product.product_id)
+
+    def update_product(self, product_id: int, name: str, description: str, price: float) -> Future:
+        return self._put(("products", product_id), db.update_product, (product_id, name, description, price))
+
+    def delete_product(self, product_id: int) -> Future:
+        return self._put(("products", product_id), db.delete_product, (product_id,))
+
+    def _next_insert(self) -> int:
+        with self._cond:
+            self._inserts += 1
+            return self._inserts
+
+    def _put(self, key, func, args: tuple, result: Optional[Callable[[], int]] = None) -> Future:
+        future = Future()
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or len(self._pending) < self.max_queue)
+            if self._closed:
+                raise RuntimeError("Буфер записи уже закрыт")
+            previous = self._pending.get(key)
+            if previous is not None and previous[0] in _DELETES and func not in _DELETES:
+                # строка уже ждёт удаления - изменение после него ничего не меняет (как UPDATE удалённой строки)
+                previous[2].append(future)
+                self.coalesced += 1
+            else:
+                futures = [future]
+                if previous is not None:
+                    del self._pending[key]
+                    futures[:0] = previous[2]
+                    self.coalesced += 1
+                self._pending[key] = (func, args, futures, result)
+            self.max_depth = max(self.max_depth, len(self._pending))
+            if self._oldest is None:
+                # первая операция пакета - поток записи начинает отсчёт max_delay
+                self._oldest = time.monotonic()
+                self._cond.notify_all()
+            elif len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+        return future
+
+    # --- запись пакетов ---
+
+    @property
+    def depth(self) -> int:
+        """Сколько операций ждёт записи."""
+        return len(self._pending)
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        return (self._flush_requested or self._closed or len(self._pending) >= self.max_batch
+                or time.monotonic() - self._oldest >= self.max_delay)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due():
+                    if self._closed:
+                        return
+                    timeout = None if self._oldest is None else self._oldest + self.max_delay - time.monotonic()
+                    self._cond.wait(timeout)
+                keys = list(islice(self._pending, self.max_batch))
+                batch = [self._pending.pop(key) for key in keys]
+                if not self._pending:
+                    self._oldest = None  # иначе оставшиеся операции уже просрочены и уйдут следующим пакетом
+                self._committing = True
+                self._cond.notify_all()  # освобождаем место в очереди
+            try:
+                self._commit(batch)
+            finally:
+                with self._cond:
+                    self._committing = False
+                    if not self._pending:
+                        self._flush_requested = False
+                    self._cond.notify_all()
+
+    def _commit(self, batch: List[Operation]):
+        """Пишет пакет одной транзакцией; каждая операция - в своей точке сохранения."""
+        start = time.perf_counter()
+        errors: Dict[int, BaseException] = {}
+        try:
+            with db.connection() as conn:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                for i, (func, args, _, _) in enumerate(batch):
+                    conn.execute("SAVEPOINT write_behind")
+                    try:
+                        func(*args)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_behind")
+                        errors[i] = e
+                    conn.execute("RELEASE write_behind")
+        except BaseException as e:
+            # COMMIT не прошёл - не записалось ничего
+            for _, _, futures, _ in batch:
+                for future in futures:
+                    future.set_exception(e)
+            self.failed += len(batch)
+            return
+
+        elapsed = time.perf_counter() - start
+        self.batches += 1
+        self.operations += len(batch)
+        self.failed += len(errors)
+        self.commit_seconds += elapsed
+        self.last_commit_seconds = elapsed
+        self.max_commit_seconds = max(self.max_commit_seconds, elapsed)
+
+        for i, (_, _, futures, result) in enumerate(batch):
+            for future in futures:
+                if i in errors:
+                    future.set_exception(errors[i])
+                else:
+                    future.set_result(result() if result is not None else None)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Записывает всё накопленное и ждёт COMMIT. Возвращает False, если не успели за timeout."""
+        with self._cond:
+            if self._pending:
+                self._flush_requested = True
+                self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._committing, timeout)
+
+    def close(self):
+        """Записывает остаток и останавливает поток записи."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def metrics(self) -> Dict[str, float]:
+        """Глубина очереди и задержки фиксации (в миллисекундах)."""
+        with self._cond:
+            return {
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self.max_depth,
+                "batches": self.batches,
+                "operations": self.operations,
+                "coalesced": self.coalesced,
+                "failed": self.failed,
+                "commit_ms_last": self.last_commit_seconds * 1000,
+                "commit_ms_avg": self.commit_seconds * 1000 / self.batches if self.batches else 0.0,
+                "commit_ms_max": self.max_commit_seconds * 1000,
+            }
+
+
+_buffer: Optional[WriteBehindBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_buffer(max_batch: int = 500, max_delay: float = 0.05, max_queue: int = 10_000) -> WriteBehindBuffer:
+    """Общий буфер записи (создаётся при первом вызове, параметры берутся из первого вызова)."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = WriteBehindBuffer(max_batch, max_delay, max_queue)
+        return _buffer
+
+
+@atexit.register
+def close_write_buffer():
+    """Дописывает и закрывает общий буфер (вызывается при выходе и при закрытии окна)."""
+    global _buffer
+    with _buffer_lock:
+        buffer, _buffer = _buffer, None
+    if buffer is not None:
+        buffer.close()